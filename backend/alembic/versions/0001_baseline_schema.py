@@ -0,0 +1,111 @@
+"""Baseline schema
+
+The tables as Base.metadata.create_all used to create them at startup.
+Databases created that way already have them, so existing tables are left
+alone and only the revision is recorded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Offline (--sql) scripts target an empty database
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sa.String(length=255), nullable=False),
+            sa.Column("first_name", sa.String(length=100), nullable=False),
+            sa.Column("last_name", sa.String(length=100), nullable=False),
+            sa.Column("hashed_password", sa.String(length=255), nullable=False),
+            sa.Column("is_admin", sa.Boolean(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_id", "users", ["id"])
+
+    if "docker_images" not in existing:
+        op.create_table(
+            "docker_images",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=255), nullable=False),
+            sa.Column("image_file_path", sa.String(length=500), nullable=False),
+            sa.Column("inner_port", sa.Integer(), nullable=False),
+            sa.Column("scaling_type", sa.String(length=50), nullable=False),
+            sa.Column("min_containers", sa.Integer(), nullable=True),
+            sa.Column("max_containers", sa.Integer(), nullable=True),
+            sa.Column("static_containers", sa.Integer(), nullable=True),
+            sa.Column("items_per_container", sa.Integer(), nullable=False),
+            sa.Column("payment_limit", sa.Float(), nullable=True),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("status", sa.String(length=50), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_docker_images_id", "docker_images", ["id"])
+
+    if "jobs" not in existing:
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("kind", sa.String(length=100), nullable=False),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("priority", sa.Integer(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("max_attempts", sa.Integer(), nullable=False),
+            sa.Column("run_at", sa.DateTime(), nullable=False),
+            sa.Column("image_id", sa.Integer(), nullable=True),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("reference", sa.String(length=100), nullable=True),
+            sa.Column("result", sa.Text(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("locked_by", sa.String(length=100), nullable=True),
+            sa.Column("locked_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_jobs_id", "jobs", ["id"])
+        op.create_index("ix_jobs_kind", "jobs", ["kind"])
+        op.create_index("ix_jobs_status", "jobs", ["status"])
+        op.create_index("ix_jobs_run_at", "jobs", ["run_at"])
+        op.create_index("ix_jobs_image_id", "jobs", ["image_id"])
+        op.create_index("ix_jobs_reference", "jobs", ["reference"])
+
+    if "rate_limit_buckets" not in existing:
+        op.create_table(
+            "rate_limit_buckets",
+            sa.Column("key", sa.String(length=200), nullable=False),
+            sa.Column("tokens", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint("key"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_buckets")
+    op.drop_table("jobs")
+    op.drop_table("docker_images")
+    op.drop_table("users")
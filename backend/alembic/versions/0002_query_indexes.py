@@ -0,0 +1,62 @@
+"""Indexes for the hot queries and the docker_images owner foreign key
+
+- docker_images (user_id, id), covering the list columns on PostgreSQL
+  (INCLUDE): the per-user image list and the owner foreign key lookups
+- docker_images.status: autoscaler (running) and lifecycle recovery
+  (starting / stopping)
+- docker_images.created_at: time-ranged scans and retention
+- jobs (status, priority, run_at, id): the worker claim query walks it in
+  order instead of sorting every queued job; replaces ix_jobs_status
+- jobs (user_id, id): GET /jobs for regular users, newest first
+
+Images whose owner no longer exists are deleted before the foreign key is
+created; the downgrade does not bring them back.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+IMAGE_LIST_COLUMNS = ["name", "inner_port", "payment_limit", "items_per_container", "status"]
+
+
+def upgrade() -> None:
+    # The baseline schema had no constraint, so images of deleted users may remain; the
+    # constraint cannot be created over them (user_id is NOT NULL, so they go)
+    op.execute("DELETE FROM docker_images WHERE user_id NOT IN (SELECT id FROM users)")
+    # Batch mode: SQLite recreates the table to add the constraint, other databases ALTER it
+    with op.batch_alter_table("docker_images") as batch_op:
+        batch_op.create_foreign_key("fk_docker_images_user_id_users", "users", ["user_id"], ["id"])
+    op.create_index(
+        "ix_docker_images_user_list", "docker_images", ["user_id", "id"],
+        postgresql_include=IMAGE_LIST_COLUMNS,
+    )
+    op.create_index("ix_docker_images_status", "docker_images", ["status"])
+    op.create_index("ix_docker_images_created_at", "docker_images", ["created_at"])
+
+    op.drop_index("ix_jobs_status", table_name="jobs")
+    op.create_index("ix_jobs_claim", "jobs", ["status", "priority", "run_at", "id"])
+    op.create_index("ix_jobs_user_id", "jobs", ["user_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_user_id", table_name="jobs")
+    op.drop_index("ix_jobs_claim", table_name="jobs")
+    op.create_index("ix_jobs_status", "jobs", ["status"])
+
+    op.drop_index("ix_docker_images_created_at", table_name="docker_images")
+    op.drop_index("ix_docker_images_status", table_name="docker_images")
+    op.drop_index("ix_docker_images_user_list", table_name="docker_images")
+    with op.batch_alter_table("docker_images") as batch_op:
+        batch_op.drop_constraint("fk_docker_images_user_id_users", type_="foreignkey")
@@ -0,0 +1,34 @@
+"""Replication heartbeat table
+
+A single row the primary rewrites every few seconds; read replicas are
+judged by how old their copy of it is (see app.database.ReadReplicas).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "replication_heartbeat",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("written_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("replication_heartbeat")
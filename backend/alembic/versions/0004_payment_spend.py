@@ -0,0 +1,36 @@
+"""Payment spend on docker_images
+
+The running spend of each image and the alert/enforcement flags of its
+payment limit (see app.payment_limits), so every worker and restart sees
+the same state.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("docker_images") as batch_op:
+        batch_op.add_column(sa.Column("spend", sa.Float(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("limit_alerted", sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column("limit_enforced", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("docker_images") as batch_op:
+        batch_op.drop_column("limit_enforced")
+        batch_op.drop_column("limit_alerted")
+        batch_op.drop_column("spend")
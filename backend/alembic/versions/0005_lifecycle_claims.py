@@ -0,0 +1,34 @@
+"""Lifecycle claim owner and time on docker_images
+
+Which instance moved an image into "starting"/"stopping" and when, so
+lifecycle recovery only resets the claims of the restarting instance and
+claims old enough to be abandoned (see app.lifecycle).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("docker_images") as batch_op:
+        batch_op.add_column(sa.Column("lifecycle_owner", sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column("lifecycle_claimed_at", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("docker_images") as batch_op:
+        batch_op.drop_column("lifecycle_claimed_at")
+        batch_op.drop_column("lifecycle_owner")
@@ -0,0 +1,211 @@
+"""
+Admission control and drain mode.
+
+Each expensive route class (auth, list, upload, admin health) gets its own
+limit on concurrently executing requests. Requests over the limit wait in a
+queue until a slot frees up or ADMISSION_QUEUE_TIMEOUT passes, and are then
+shed with 503 + Retry-After instead of piling more work onto a slow backend.
+
+Drain mode (used for deploys and tied to the registry status) sheds every
+new request except the registry/landing endpoints while in-flight requests,
+uploads in particular, run to completion.
+"""
+
+import asyncio
+import json
+import math
+import os
+from typing import Any, Dict, Optional
+
+from app.logger import logger
+
+# Concurrent requests per route class; 0 disables the limit for that class
+ADMISSION_LIMITS = {
+    "auth": int(os.getenv("ADMISSION_AUTH_LIMIT", "32")),
+    "list": int(os.getenv("ADMISSION_LIST_LIMIT", "64")),
+    "upload": int(os.getenv("ADMISSION_UPLOAD_LIMIT", "8")),
+    "admin_health": int(os.getenv("ADMISSION_HEALTH_LIMIT", "8")),
+}
+# How long a request may wait for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+# Waiting requests per class, as a multiple of its limit; beyond that requests are shed at once
+ADMISSION_QUEUE_FACTOR = float(os.getenv("ADMISSION_QUEUE_FACTOR", "4"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Longest shutdown waits for in-flight requests to finish
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
+
+# Still served while draining, so the instance can be inspected and resumed
+DRAIN_EXEMPT_PREFIXES = ("/registry", "/metrics", "/docs", "/openapi.json", "/redoc")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Admission class of a request, or None for routes without a limit"""
+    if path.startswith("/auth/"):
+        return "auth"
+    if path.startswith("/health/"):
+        return "admin_health"
+    if method == "POST" and path in ("/docker/upload", "/docker/blobs", "/docker/images/batch"):
+        return "upload"
+    if method == "GET" and path in ("/docker/images", "/jobs", "/billing/alerts"):
+        return "list"
+    return None
+
+
+class RouteClassGate:
+    __slots__ = ("name", "limit", "max_waiting", "semaphore", "in_flight", "waiting", "admitted", "shed")
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max(1, int(limit * ADMISSION_QUEUE_FACTOR))
+        self.semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.semaphore is None:
+            return True
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+
+class AdmissionController:
+    def __init__(self, limits: Dict[str, int] = None, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.gates = {name: RouteClassGate(name, limit) for name, limit in (limits or ADMISSION_LIMITS).items()}
+        self.queue_timeout = queue_timeout
+        self.draining = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self):
+        """asyncio primitives belong to one loop; rebuild them if the app now runs on another"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.gates = {name: RouteClassGate(name, gate.limit) for name, gate in self.gates.items()}
+            self._idle = asyncio.Event()
+            if self.in_flight == 0:
+                self._idle.set()
+
+    def _begin(self):
+        self.in_flight += 1
+        self._idle.clear()
+
+    def _end(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    def start_draining(self):
+        if not self.draining:
+            self.draining = True
+            logger.info(f"Admission: draining, {self.in_flight} requests in flight")
+
+    def stop_draining(self):
+        if self.draining:
+            self.draining = False
+            logger.info("Admission: accepting new requests again")
+
+    async def wait_idle(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """Wait for in-flight requests (uploads included) to finish; False if the timeout hit first"""
+        uploads = self.gates["upload"].in_flight if "upload" in self.gates else 0
+        if self.in_flight:
+            logger.info(f"Admission: waiting for {self.in_flight} in-flight requests ({uploads} uploads)")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.error(f"Admission: {self.in_flight} requests still in flight after {timeout}s drain")
+            return False
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "classes": {
+                gate.name: {
+                    "limit": gate.limit,
+                    "in_flight": gate.in_flight,
+                    "waiting": gate.waiting,
+                    "admitted": gate.admitted,
+                    "shed": gate.shed,
+                }
+                for gate in self.gates.values()
+            },
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def _reject(self, send, detail: str, retry_after: int):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        controller = self.controller
+        controller.bind_loop()
+        path = scope["path"]
+        if controller.draining and path != "/" and not path.startswith(DRAIN_EXEMPT_PREFIXES):
+            return await self._reject(send, "Server is draining, retry on another instance", ADMISSION_RETRY_AFTER)
+
+        gate = controller.gates.get(route_class(scope["method"], path))
+        if gate is None:
+            controller._begin()
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                controller._end()
+
+        if not await gate.acquire(controller.queue_timeout):
+            gate.shed += 1
+            logger.error(
+                f"{scope['method']} {path} - Shed by admission control ({gate.name}: "
+                f"{gate.in_flight} in flight, {gate.waiting} waiting)"
+            )
+            retry_after = max(ADMISSION_RETRY_AFTER, math.ceil(controller.queue_timeout))
+            return await self._reject(send, "Server busy, retry later", retry_after)
+
+        gate.admitted += 1
+        gate.in_flight += 1
+        controller._begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.in_flight -= 1
+            gate.release()
+            controller._end()
+
+
+# Global instance
+admission = AdmissionController()
@@ -7,7 +7,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import os
 
-from app.database import get_db
+from app.database import SessionLocal, get_read_db
 from app.models import User
 
 # Password hashing
@@ -49,7 +49,7 @@ def verify_token(token: str) -> Optional[str]:
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,9 +63,16 @@ def get_current_user(
         raise credentials_exception
     
     user = db.query(User).filter(User.email == email).first()
+    if user is None and db.info.get("replica"):
+        # Signed up moments ago and not replicated yet
+        primary = SessionLocal()
+        try:
+            user = primary.query(User).filter(User.email == email).first()
+        finally:
+            primary.close()
     if user is None:
         raise credentials_exception
-    
+
     return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -0,0 +1,193 @@
+"""
+Autoscaling decision engine.
+
+Turns the scaling settings stored on DockerImage (scaling_type, min/max/static
+containers and items_per_container) plus live traffic from the load balancer
+into target replica counts, and applies them through the orchestrator.
+
+Scale-ups happen as soon as demand exceeds capacity; scale-downs only once
+demand has dropped below capacity by the hysteresis margin, and each direction
+has its own cooldown so noisy traffic does not make replicas flap.
+
+It changes replica counts on the orchestrator, so it only runs with
+AUTOSCALER_ENABLED=true.
+"""
+
+import asyncio
+import math
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.logger import logger
+from app.database import SessionLocal
+from app.models import DockerImage
+from app.external_services import external_client
+from app.payment_limits import payment_enforcer
+
+AUTOSCALER_ENABLED = os.getenv("AUTOSCALER_ENABLED", "false").lower() in ("1", "true", "yes")
+AUTOSCALER_INTERVAL = float(os.getenv("AUTOSCALER_INTERVAL", "15"))
+AUTOSCALER_SCALE_UP_COOLDOWN = float(os.getenv("AUTOSCALER_SCALE_UP_COOLDOWN", "30"))
+AUTOSCALER_SCALE_DOWN_COOLDOWN = float(os.getenv("AUTOSCALER_SCALE_DOWN_COOLDOWN", "120"))
+# Scale down only when demand fits in fewer replicas running at (1 - hysteresis) of capacity
+AUTOSCALER_HYSTERESIS = float(os.getenv("AUTOSCALER_HYSTERESIS", "0.2"))
+# "maximal" images keep this much spare capacity on top of current demand
+AUTOSCALER_MAXIMAL_HEADROOM = float(os.getenv("AUTOSCALER_MAXIMAL_HEADROOM", "1.5"))
+AUTOSCALER_CONCURRENCY = int(os.getenv("AUTOSCALER_CONCURRENCY", "16"))
+
+# Same fallbacks the start endpoint uses when bounds were left at 0 on upload
+DEFAULT_MIN_REPLICAS = 1
+DEFAULT_MAX_REPLICAS = 5
+
+
+def replica_bounds(image: Any) -> tuple:
+    low = image.min_containers or DEFAULT_MIN_REPLICAS
+    high = max(low, image.max_containers or DEFAULT_MAX_REPLICAS)
+    return low, high
+
+
+class ImageScalingState:
+    """Per-image memory the decision engine needs between evaluations"""
+
+    __slots__ = ("last_scale_up", "last_scale_down", "last_target")
+
+    def __init__(self):
+        self.last_scale_up = float("-inf")
+        self.last_scale_down = float("-inf")
+        self.last_target: Optional[int] = None
+
+
+class Autoscaler:
+    def __init__(
+        self,
+        client=external_client,
+        interval: float = AUTOSCALER_INTERVAL,
+        scale_up_cooldown: float = AUTOSCALER_SCALE_UP_COOLDOWN,
+        scale_down_cooldown: float = AUTOSCALER_SCALE_DOWN_COOLDOWN,
+        hysteresis: float = AUTOSCALER_HYSTERESIS,
+        maximal_headroom: float = AUTOSCALER_MAXIMAL_HEADROOM,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.interval = interval
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+        self.hysteresis = min(max(hysteresis, 0.0), 0.9)
+        self.maximal_headroom = max(1.0, maximal_headroom)
+        self.clock = clock
+        self.states: Dict[int, ImageScalingState] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def desired_replicas(self, image: Any, requests_per_second: float, utilization: float = 1.0) -> int:
+        """Replicas needed for the given traffic, clamped to the image bounds"""
+        if image.scaling_type == "static":
+            return max(0, image.static_containers or DEFAULT_MIN_REPLICAS)
+        low, high = replica_bounds(image)
+        per_container = max(1, image.items_per_container or 1) * utilization
+        demand = max(0.0, requests_per_second)
+        if image.scaling_type == "maximal":
+            demand *= self.maximal_headroom
+        return min(high, max(low, math.ceil(demand / per_container)))
+
+    def decide(self, image: Any, requests_per_second: float, current: int, now: Optional[float] = None) -> Optional[int]:
+        """Return the new replica count for an image, or None to leave it alone"""
+        now = self.clock() if now is None else now
+        state = self.states.setdefault(image.id, ImageScalingState())
+
+        target = self.desired_replicas(image, requests_per_second)
+        if image.scaling_type == "static":
+            return target if target != current else None
+
+        if target > current:
+            if now - state.last_scale_up < self.scale_up_cooldown:
+                return None
+            state.last_scale_up = now
+            state.last_target = target
+            return target
+
+        # Only shrink to what still leaves the hysteresis margin free
+        target = self.desired_replicas(image, requests_per_second, utilization=1.0 - self.hysteresis)
+        if target < current:
+            if now - state.last_scale_down < self.scale_down_cooldown or now - state.last_scale_up < self.scale_down_cooldown:
+                return None
+            state.last_scale_down = now
+            state.last_target = target
+            return target
+        return None
+
+    async def reconcile_image(self, image: DockerImage) -> Optional[int]:
+        image_key = str(image.id)
+        traffic, instances = await asyncio.gather(
+            self.client.get_traffic_stats(image_key),
+            self.client.get_container_instances(image_key),
+        )
+        requests_per_second = float(traffic.get("requests_per_second", 0.0) or 0.0)
+        current = len(instances.get("instances", [])) if isinstance(instances, dict) else 0
+        target = self.decide(image, requests_per_second, current)
+        if target is not None and payment_enforcer.is_throttled(image):
+            # Over its payment limit: never grow past the minimum
+            low, _ = replica_bounds(image)
+            target = min(target, low) if target != current else None
+        if target is None:
+            return None
+        logger.info(
+            f"Autoscaler scaling image {image.id} ({image.scaling_type}) {current} -> {target} "
+            f"replicas at {requests_per_second:.1f} rps"
+        )
+        await self.client.scale_containers(image_key, target)
+        return target
+
+    def _load_images(self):
+        db = SessionLocal()
+        try:
+            images = db.query(DockerImage).filter(DockerImage.status == "running").all()
+            for image in images:
+                db.expunge(image)
+            return images
+        finally:
+            db.close()
+
+    async def run_once(self) -> Dict[int, int]:
+        """Evaluate every running image once; returns the images that were rescaled"""
+        images = await asyncio.to_thread(self._load_images)
+        semaphore = asyncio.Semaphore(AUTOSCALER_CONCURRENCY)
+        scaled: Dict[int, int] = {}
+
+        async def evaluate(image: DockerImage):
+            async with semaphore:
+                try:
+                    target = await self.reconcile_image(image)
+                    if target is not None:
+                        scaled[image.id] = target
+                except Exception as e:
+                    logger.error(f"Autoscaler failed to evaluate image {image.id}: {e}")
+
+        await asyncio.gather(*(evaluate(image) for image in images))
+        known = {image.id for image in images}
+        for image_id in [i for i in self.states if i not in known]:
+            del self.states[image_id]
+        return scaled
+
+    async def _loop(self):
+        logger.info(f"Autoscaler started (interval={self.interval}s)")
+        while True:
+            started = time.perf_counter()
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Autoscaler pass failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def start(self):
+        if self._task is None and AUTOSCALER_ENABLED:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Global instance
+autoscaler = Autoscaler()
@@ -0,0 +1,267 @@
+"""
+Bulk container lifecycle operations.
+
+Fans start/stop/resource updates out over every container instance of an
+image with bounded parallelism, records a per-instance result and supports
+idempotency keys so retried requests do not repeat orchestrator work. A
+request repeating the key of an operation that is still listing its
+instances waits for that setup and joins the same operation.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.external_services import external_client
+from app.jobs import job_queue, PRIORITY_HIGH
+from app.models import Job
+
+BULK_MAX_PARALLELISM = int(os.getenv("BULK_MAX_PARALLELISM", "16"))
+# Operations touching more instances than this run as a background job by default
+BULK_ASYNC_THRESHOLD = int(os.getenv("BULK_ASYNC_THRESHOLD", "50"))
+# How long finished operations (and their idempotency keys) are kept around
+BULK_OPERATION_TTL = float(os.getenv("BULK_OPERATION_TTL", "3600"))
+
+BULK_ACTIONS = ("start", "stop", "resources")
+
+
+class BulkOperation:
+    """State of a single bulk operation across all instances of an image"""
+
+    def __init__(self, image_id: str, action: str, user_id: int, resources: Optional[Dict[str, Any]] = None):
+        self.id = str(uuid.uuid4())
+        self.image_id = image_id
+        self.action = action
+        self.user_id = user_id
+        self.resources = resources
+        self.status = "pending"  # "pending", "running", "completed", "failed"
+        self.instance_ids: List[str] = []
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.job_id: Optional[int] = None
+
+    @property
+    def succeeded(self) -> List[str]:
+        return [r["instance_id"] for r in self.results if r["ok"]]
+
+    @property
+    def failed(self) -> List[str]:
+        return [r["instance_id"] for r in self.results if not r["ok"]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "operation_id": self.id,
+            "image_id": self.image_id,
+            "action": self.action,
+            "status": self.status,
+            "total": len(self.instance_ids),
+            "succeeded": len(self.succeeded),
+            "failed": len(self.failed),
+            "results": list(self.results),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "job_id": self.job_id,
+        }
+
+
+class BulkOperationEngine:
+    """Runs bulk operations and tracks them for polling"""
+
+    def __init__(self, client=external_client, max_parallelism: int = BULK_MAX_PARALLELISM):
+        self.client = client
+        self.max_parallelism = max(1, max_parallelism)
+        self.operations: Dict[str, BulkOperation] = {}
+        self.idempotency_keys: Dict[Tuple[int, str], str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Operations still listing their instances and dispatching the fan-out
+        self._setups: Dict[str, asyncio.Task] = {}
+
+    async def _run_instance(self, op: BulkOperation, instance_id: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                if op.action == "start":
+                    resp = await self.client.start_container_instance(op.image_id, instance_id)
+                    ok = bool(resp.get("started", True))
+                elif op.action == "stop":
+                    resp = await self.client.stop_container(op.image_id, instance_id)
+                    ok = bool(resp.get("stopped", True))
+                else:
+                    resp = await self.client.update_instance_resources(op.image_id, instance_id, op.resources or {})
+                    ok = bool(resp.get("updated", True))
+                return {"instance_id": instance_id, "ok": ok, "error": None if ok else "Orchestrator rejected the request"}
+            except HTTPException as e:
+                return {"instance_id": instance_id, "ok": False, "error": str(e.detail)}
+            except Exception as e:
+                return {"instance_id": instance_id, "ok": False, "error": str(e)}
+
+    async def run(self, op: BulkOperation) -> BulkOperation:
+        """Execute an operation over its instances, bounded by max_parallelism"""
+        op.status = "running"
+        started = time.perf_counter()
+        try:
+            semaphore = asyncio.Semaphore(self.max_parallelism)
+            op.results = list(await asyncio.gather(
+                *(self._run_instance(op, inst_id, semaphore) for inst_id in op.instance_ids)
+            ))
+            op.status = "completed"
+        except Exception as e:
+            logger.error(f"Bulk {op.action} operation {op.id} for image {op.image_id} failed: {e}")
+            op.status = "failed"
+            op.error = str(e)
+        finally:
+            op.finished_at = time.time()
+            self._tasks.pop(op.id, None)
+        logger.info(
+            f"Bulk {op.action} operation {op.id} for image {op.image_id} finished: "
+            f"{len(op.succeeded)} ok, {len(op.failed)} failed in {time.perf_counter() - started:.3f}s"
+        )
+        return op
+
+    def _prune(self):
+        cutoff = time.time() - BULK_OPERATION_TTL
+        expired = [op_id for op_id, op in self.operations.items() if op.finished_at and op.finished_at < cutoff]
+        for op_id in expired:
+            del self.operations[op_id]
+        if expired:
+            self.idempotency_keys = {k: v for k, v in self.idempotency_keys.items() if v in self.operations}
+
+    async def execute(
+        self,
+        image_id: str,
+        action: str,
+        user_id: int,
+        resources: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        run_async: Optional[bool] = None,
+    ) -> BulkOperation:
+        """Start (or join, for a repeated idempotency key) a bulk operation"""
+        if action not in BULK_ACTIONS:
+            raise HTTPException(status_code=400, detail=f"Unsupported bulk action: {action}")
+        self._prune()
+
+        if idempotency_key:
+            existing_id = self.idempotency_keys.get((user_id, idempotency_key))
+            existing = self.operations.get(existing_id) if existing_id else None
+            if existing:
+                if existing.image_id != image_id or existing.action != action:
+                    raise HTTPException(status_code=409, detail="Idempotency key already used for a different operation")
+                logger.info(f"Bulk {action} for image {image_id} replayed from idempotency key {idempotency_key}")
+                setup = self._setups.get(existing.id)
+                if setup is not None:
+                    await asyncio.shield(setup)
+                if run_async is None:
+                    run_async = len(existing.instance_ids) > BULK_ASYNC_THRESHOLD
+                task = self._tasks.get(existing.id)
+                if task and not run_async:
+                    await asyncio.shield(task)
+                return existing
+
+        op = BulkOperation(image_id, action, user_id, resources)
+        self.operations[op.id] = op
+        if idempotency_key:
+            self.idempotency_keys[(user_id, idempotency_key)] = op.id
+
+        # Detached, like the fan-out, so duplicates can wait for it even if this client goes away
+        setup = asyncio.create_task(self._dispatch(op, run_async, idempotency_key))
+        self._setups[op.id] = setup
+        setup.add_done_callback(lambda _: self._setups.pop(op.id, None))
+        run_async = await asyncio.shield(setup)
+        task = self._tasks.get(op.id)
+        if task and not run_async:
+            await asyncio.shield(task)
+        return op
+
+    async def _dispatch(self, op: BulkOperation, run_async: Optional[bool], idempotency_key: Optional[str]) -> bool:
+        """List the image's instances and start the fan-out, in a job or here; returns whether it runs in the background"""
+        try:
+            instances_data = await self.client.get_container_instances(op.image_id)
+        except Exception as e:
+            op.status = "failed"
+            op.error = str(e)
+            op.finished_at = time.time()
+            # Let the client retry with the same key once the orchestrator is reachable again
+            if idempotency_key:
+                self.idempotency_keys.pop((op.user_id, idempotency_key), None)
+            raise
+        instance_list = instances_data.get("instances", []) if isinstance(instances_data, dict) else []
+        op.instance_ids = [inst["id"] for inst in instance_list if inst.get("id")]
+
+        if run_async is None:
+            run_async = len(op.instance_ids) > BULK_ASYNC_THRESHOLD
+        if run_async and job_queue.running:
+            # Durable path: survives restarts and can be polled from any worker process
+            job = await asyncio.to_thread(
+                job_queue.enqueue,
+                "containers.bulk",
+                {
+                    "operation_id": op.id,
+                    "image_id": op.image_id,
+                    "action": op.action,
+                    "user_id": op.user_id,
+                    "resources": op.resources,
+                    "instance_ids": op.instance_ids,
+                    "created_at": op.created_at,
+                },
+                priority=PRIORITY_HIGH,
+                user_id=op.user_id,
+                reference=op.id,
+                max_attempts=3,
+            )
+            op.job_id = job.id
+            return True
+        # Always run detached so a dropped client connection does not cancel half the fan-out
+        self._tasks[op.id] = asyncio.create_task(self.run(op))
+        return run_async
+
+    def get_operation(self, operation_id: str, db: Optional[Session] = None) -> Optional[BulkOperation]:
+        """Look up an operation in memory, falling back to its queued job"""
+        op = self.operations.get(operation_id)
+        if op or db is None:
+            return op
+        job = (
+            db.query(Job)
+            .filter(Job.kind == "containers.bulk", Job.reference == operation_id)
+            .order_by(Job.id.desc())
+            .first()
+        )
+        if job is None:
+            return None
+        op = self.restore_operation(json.loads(job.payload or "{}"))
+        op.job_id = job.id
+        if job.status == "running":
+            op.status = "running"
+        elif job.result:
+            result = json.loads(job.result)
+            op.status = result.get("status", "completed")
+            op.results = result.get("results", [])
+            op.finished_at = result.get("finished_at")
+        elif job.status == "failed":
+            op.status = "failed"
+            op.error = job.last_error
+        return op
+
+    def restore_operation(self, payload: Dict[str, Any], register: bool = False) -> BulkOperation:
+        """Rebuild (or reuse) the in-memory operation described by a job payload"""
+        op = self.operations.get(payload["operation_id"])
+        if op is None:
+            op = BulkOperation(payload["image_id"], payload["action"], payload["user_id"], payload.get("resources"))
+            op.id = payload["operation_id"]
+            op.instance_ids = list(payload.get("instance_ids", []))
+            op.created_at = payload.get("created_at", op.created_at)
+            if register:
+                self.operations[op.id] = op
+        return op
+
+
+# Global instance
+bulk_engine = BulkOperationEngine()
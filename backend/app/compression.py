@@ -0,0 +1,183 @@
+"""
+Response compression.
+
+A pure ASGI middleware that compresses JSON and text responses of at least
+COMPRESSION_MIN_SIZE bytes with brotli (when the `brotli` package is
+installed and the client accepts it) or gzip. Streaming responses and bodies
+that already carry a Content-Encoding pass through untouched.
+
+Responses with an ETag (the conditional dashboard endpoints) keep their
+compressed variants in a small LRU keyed by ETag and encoding, so a cached
+body is compressed once rather than on every request. Their ETag is marked
+weak when the body is encoded, because the compressed bytes differ from the
+identity representation. A 304 has no body to measure, so the endpoint
+leaves the length of the body it stands for in the request state
+(request.state.representation_length); the 304 gets a weak ETag exactly when
+that 200 would have been compressed. Every response of a compressible type
+carries Vary: Accept-Encoding, compressed or not, so shared caches keep the
+variants apart. Large bodies are compressed in a worker thread to keep the
+event loop free.
+"""
+
+import asyncio
+import gzip
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Bodies at least this large are compressed off the event loop
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", "262144"))
+COMPRESSION_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "256"))
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts, preferring brotli; None for identity"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic for identical bodies
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _weaken_etag(headers):
+    return [
+        (k, b"W/" + v if k == b"etag" and not v.startswith(b"W/") else v)
+        for k, v in headers
+    ]
+
+
+def _vary_accept_encoding(headers):
+    for i, (k, v) in enumerate(headers):
+        if k == b"vary":
+            if b"accept-encoding" in v.lower() or v.strip() == b"*":
+                return headers
+            return headers[:i] + [(k, v + b", Accept-Encoding")] + headers[i + 1:]
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+
+class CompressedVariants:
+    """Bounded LRU of compressed bodies keyed by (ETag, encoding)"""
+
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+
+    def get(self, etag: bytes, encoding: str) -> Optional[bytes]:
+        body = self._entries.get((etag, encoding))
+        if body is not None:
+            self._entries.move_to_end((etag, encoding))
+        return body
+
+    def put(self, etag: bytes, encoding: str, body: bytes):
+        self._entries[(etag, encoding)] = body
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+        self.variants = CompressedVariants()
+
+    async def _encode(self, body: bytes, encoding: str, etag: Optional[bytes]) -> bytes:
+        if etag is not None:
+            cached = self.variants.get(etag, encoding)
+            if cached is not None:
+                return cached
+        if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+            encoded = await asyncio.to_thread(compress, body, encoding)
+        else:
+            encoded = compress(body, encoding)
+        if etag is not None:
+            self.variants.put(etag, encoding, encoded)
+        return encoded
+
+    def _not_modified(self, message, encoding: Optional[str], state) -> dict:
+        """A 304 carries the validators of the 200 it stands for: weak only if that 200 was compressed"""
+        headers = _vary_accept_encoding(list(message["headers"]))
+        length = state.get("representation_length")
+        if encoding is not None and length is not None and length >= self.min_size:
+            headers = _weaken_etag(headers)
+        return {**message, "headers": headers}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            return await self.app(scope, receive, send)
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        # Shared with the endpoint's request.state, which reports the length behind a 304
+        state = scope.setdefault("state", {})
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] == 304 and b"etag" in headers:
+                    passthrough = True
+                    return await send(self._not_modified(message, encoding, state))
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    return await send(message)
+                message = {**message, "headers": _vary_accept_encoding(list(message.get("headers", [])))}
+                if encoding is None:
+                    passthrough = True
+                    return await send(message)
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.min_size:
+                # Streaming or small: send as is
+                passthrough = True
+                await send(start_message)
+                return await send(message)
+
+            etag = dict(start_message["headers"]).get(b"etag")
+            encoded = await self._encode(body, encoding, etag)
+            headers = [(k, v) for k, v in _weaken_etag(start_message["headers"]) if k != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(encoded)).encode()),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": encoded})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,183 @@
+"""
+Conditional GET (ETag / If-None-Match) for the dashboard endpoints.
+
+Responses carry a strong ETag (a hash of the serialized body) and a matching
+If-None-Match gets an empty 304. The serialized body is also kept per cache
+key together with a version token built from data version counters: DB
+commits that touch tracked models bump a counter, and the mock services bump
+their own on every change. While the token is unchanged and the entry is
+younger than ETAG_CACHE_MAX_AGE the stored body is reused and the handler does
+no work at all. The age bound covers changes these counters cannot see (other
+workers, the real external services, simulated metric drift).
+"""
+
+import hashlib
+import itertools
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import DockerImage
+
+# Longest a stored body is reused without rebuilding; 0 disables the server-side cache
+ETAG_CACHE_MAX_AGE = float(os.getenv("ETAG_CACHE_MAX_AGE", "10"))
+ETAG_CACHE_MAX_ENTRIES = int(os.getenv("ETAG_CACHE_MAX_ENTRIES", "1024"))
+
+# Models whose committed changes bump a data version, by version name
+TRACKED_MODELS = {DockerImage: "images"}
+_PENDING_KEY = "conditional_pending_versions"
+
+
+class DataVersions:
+    """Monotonic per-dataset change counters"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    def bump(self, name: str):
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+
+def _mark(session: Session, name: str):
+    session.info.setdefault(_PENDING_KEY, set()).add(name)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        name = TRACKED_MODELS.get(type(obj))
+        if name:
+            _mark(session, name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk(orm_execute_state):
+    # query(...).update()/delete() and insert() statements bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        name = TRACKED_MODELS.get(mapper.class_) if mapper is not None else None
+        if name:
+            _mark(orm_execute_state.session, name)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_versions(session):
+    for name in session.info.pop(_PENDING_KEY, ()):
+        data_versions.bump(name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class CachedBody:
+    __slots__ = ("version", "etag", "body", "created")
+
+    def __init__(self, version: Hashable, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.created = time.monotonic()
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses keyed by endpoint + caller"""
+
+    def __init__(self, max_entries: int = ETAG_CACHE_MAX_ENTRIES, max_age: float = ETAG_CACHE_MAX_AGE):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: Hashable) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version or time.monotonic() - entry.created > self.max_age:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedBody):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def conditional_response(
+    request: Request,
+    response: Response,
+    key: str,
+    version: Optional[Hashable],
+    build: Callable[[], Awaitable[Any]],
+    response_model: Type[BaseModel],
+    exclude_unset: bool = False,
+) -> Response:
+    """Serve `build()` with an ETag, reusing the stored body while `version` is unchanged.
+
+    A None version means the data can't be versioned: the body is rebuilt every
+    time and only the 304 short-circuit applies. The returned Response bypasses
+    the route's response_model, so the built value is validated and serialized
+    against `response_model` here, as FastAPI would. `exclude_unset` leaves out
+    fields the builder never set (sparse responses).
+    """
+    entry = response_cache.get(key, version) if version is not None and response_cache.max_age > 0 else None
+    if entry is None:
+        response_cache.misses += 1
+        adapter = _adapter(response_model)
+        value = adapter.validate_python(await build(), from_attributes=True)
+        body = adapter.dump_json(value, by_alias=True, exclude_unset=exclude_unset)
+        entry = CachedBody(version, make_etag(body), body)
+        if version is not None:
+            response_cache.put(key, entry)
+    else:
+        response_cache.hits += 1
+
+    # Keep headers set by dependencies (rate limit counters) on the returned response
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    headers["ETag"] = entry.etag
+    headers["Cache-Control"] = "private, no-cache"
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        # For CompressionMiddleware: whether the 200 this stands for would have been compressed
+        request.state.representation_length = len(entry.body)
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# Global instances
+data_versions = DataVersions()
+response_cache = ResponseCache()
@@ -1,3 +1,4 @@
+import asyncio
 import httpx
 import os
 from typing import List, Optional, Dict, Any
@@ -7,10 +8,8 @@ from app.logger import logger
 # Prefer in-repo mock services unless explicitly disabled
 USE_MOCKS = os.getenv("USE_MOCK_SERVICES", "true").lower() in ("1", "true", "yes")
 if USE_MOCKS:
-    from mock_services import load_balancer as mock_lb  # type: ignore
-    from mock_services import orchestrator as mock_orch  # type: ignore
-    from mock_services import service_discovery as mock_sd  # type: ignore
-    from mock_services import billing as mock_billing  # type: ignore
+    # Cheap import: the mock instances are only built on first attribute access
+    import mock_services  # type: ignore
 
 # External service URLs
 ORCHESTRATOR_API_URL = os.getenv("ORCHESTRATOR_API_URL", "http://localhost:8001")
@@ -18,18 +17,76 @@ LOAD_BALANCER_API_URL = os.getenv("LOAD_BALANCER_API_URL", "http://localhost:800
 SERVICE_DISCOVERY_API_URL = os.getenv("SERVICE_DISCOVERY_API_URL", "http://localhost:8003")
 BILLING_API_URL = os.getenv("BILLING_API_URL", "http://localhost:8004")
 
+# HTTP client tuning for the real (non-mock) path
+EXTERNAL_TIMEOUT = float(os.getenv("EXTERNAL_TIMEOUT", "10"))
+EXTERNAL_CONNECT_TIMEOUT = float(os.getenv("EXTERNAL_CONNECT_TIMEOUT", "3"))
+EXTERNAL_MAX_CONNECTIONS = int(os.getenv("EXTERNAL_MAX_CONNECTIONS", "100"))
+EXTERNAL_MAX_KEEPALIVE = int(os.getenv("EXTERNAL_MAX_KEEPALIVE", "20"))
+
+async def _close_stale_client(client: httpx.AsyncClient):
+    """Close a client whose event loop has stopped; sockets it still held may fail to close cleanly"""
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug(f"Closing stale HTTP client: {e}")
+
 class ExternalServiceClient:
     def __init__(self):
         self.orchestrator_url = ORCHESTRATOR_API_URL
         self.load_balancer_url = LOAD_BALANCER_API_URL
         self.service_discovery_url = SERVICE_DISCOVERY_API_URL
         self.billing_url = BILLING_API_URL
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retiring: set = set()
         logger.info(
             f"ExternalServiceClient initialized | orchestrator={self.orchestrator_url}, "
             f"load_balancer={self.load_balancer_url}, service_discovery={self.service_discovery_url}, "
             f"billing={self.billing_url}, mocks={'on' if USE_MOCKS else 'off'}"
         )
 
+    def get_http_client(self) -> httpx.AsyncClient:
+        """Shared pooled client (also used for registry heartbeats), recreated if the running event loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._retire_client()
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(EXTERNAL_TIMEOUT, connect=EXTERNAL_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=EXTERNAL_MAX_CONNECTIONS,
+                    max_keepalive_connections=EXTERNAL_MAX_KEEPALIVE,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _retire_client(self):
+        """Close the client of a previous event loop instead of leaking its connection pool"""
+        client, loop = self._client, self._client_loop
+        self._client = self._client_loop = None
+        if client is None or client.is_closed:
+            return
+        if loop is not None and loop.is_running():
+            # Its connections belong to that loop, so close them there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        task = asyncio.get_running_loop().create_task(_close_stale_client(client))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    def data_version(self) -> Optional[tuple]:
+        """Token that changes whenever mock service data changes; None when the real services can't tell us"""
+        if USE_MOCKS:
+            mocks = mock_services.get_mocks()
+            return tuple(mocks[name].version for name in mock_services.SERVICE_NAMES)
+        return None
+
     async def _make_request(self, url: str, method: str = "GET", **kwargs) -> Dict[str, Any]:
         """Make HTTP request to external service"""
         try:
@@ -38,11 +95,10 @@ class ExternalServiceClient:
             if "json" in kwargs and isinstance(kwargs["json"], dict):
                 payload_keys = list(kwargs["json"].keys())[:5]
             logger.info(f"External HTTP {method} {url} payload_keys={payload_keys}")
-            async with httpx.AsyncClient() as client:
-                response = await client.request(method, url, **kwargs)
-                logger.info(f"External HTTP {method} {url} -> {response.status_code}")
-                response.raise_for_status()
-                return response.json()
+            response = await self.get_http_client().request(method, url, **kwargs)
+            logger.info(f"External HTTP {method} {url} -> {response.status_code}")
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"External HTTP error {method} {url} -> {e.response.status_code}: {e}")
             raise HTTPException(status_code=e.response.status_code, detail=f"External service error: {e}")
@@ -55,7 +111,7 @@ class ExternalServiceClient:
         """Get all container instances for an image"""
         if USE_MOCKS:
             logger.info(f"Mock Orchestrator get_container_instances image_name={image_name}")
-            instances = mock_orch.get_containers_by_image(image_name)
+            instances = mock_services.orchestrator.get_containers_by_image(image_name)
             return {"instances": instances}  # keep dict with key 'instances'
         url = f"{self.orchestrator_url}/containers/{image_name}/instances"
         return await self._make_request(url)
@@ -79,11 +135,20 @@ class ExternalServiceClient:
         url = f"{self.orchestrator_url}/start/container"
         return await self._make_request(url, method="POST", json=start_body)
 
+    async def start_container_instance(self, image_id: str, instance_id: str) -> Dict[str, Any]:
+        """Start a specific (previously stopped) container instance"""
+        if USE_MOCKS:
+            logger.info(f"Mock Orchestrator start_container_instance image_id={image_id} instance_id={instance_id}")
+            ok = mock_services.orchestrator.start_container(instance_id)
+            return {"started": ok}
+        url = f"{self.orchestrator_url}/containers/{image_id}/start"
+        return await self._make_request(url, method="POST", json={"instanceId": instance_id})
+
     async def stop_container(self, image_id: str, instance_id: str) -> Dict[str, Any]:
         """Stop a specific container instance"""
         if USE_MOCKS:
             logger.info(f"Mock Orchestrator stop_container image_id={image_id} instance_id={instance_id}")
-            ok = mock_orch.stop_container(instance_id)
+            ok = mock_services.orchestrator.stop_container(instance_id)
             return {"stopped": ok}
         url = f"{self.orchestrator_url}/containers/{image_id}/stop"
         return await self._make_request(url, method="POST", json={"instanceId": instance_id})
@@ -92,8 +157,9 @@ class ExternalServiceClient:
         """Get health metrics for containers"""
         if USE_MOCKS:
             logger.info(f"Mock Orchestrator get_container_health image_id={image_id}")
-            containers = mock_orch.get_containers_by_image(image_id)
-            return {"errors": [], "containers": [mock_orch.get_container_health(c["id"]) for c in containers]}
+            orchestrator = mock_services.orchestrator
+            containers = orchestrator.get_containers_by_image(image_id)
+            return {"errors": [], "containers": [orchestrator.get_container_health(c["id"]) for c in containers]}
         url = f"{self.orchestrator_url}/containers/{image_id}/health"
         return await self._make_request(url)
 
@@ -102,19 +168,37 @@ class ExternalServiceClient:
         if USE_MOCKS:
             logger.info(f"Mock Orchestrator update_container_resources image_id={image_id}")
             updated = []
-            for c in mock_orch.get_containers_by_image(image_id):
-                if mock_orch.update_container_resources(c["id"], resources):
+            for c in mock_services.orchestrator.get_containers_by_image(image_id):
+                if mock_services.orchestrator.update_container_resources(c["id"], resources):
                     updated.append(c["id"])
             return {"updated": updated}
         url = f"{self.orchestrator_url}/containers/{image_id}/resources"
         return await self._make_request(url, method="PUT", json=resources)
 
+    async def update_instance_resources(self, image_id: str, instance_id: str, resources: Dict[str, Any]) -> Dict[str, Any]:
+        """Update resource limits for a single container instance"""
+        if USE_MOCKS:
+            logger.info(f"Mock Orchestrator update_instance_resources image_id={image_id} instance_id={instance_id}")
+            ok = mock_services.orchestrator.update_container_resources(instance_id, resources)
+            return {"updated": ok}
+        url = f"{self.orchestrator_url}/containers/{image_id}/instances/{instance_id}/resources"
+        return await self._make_request(url, method="PUT", json=resources)
+
+    async def scale_containers(self, image_id: str, target_count: int) -> Dict[str, Any]:
+        """Scale an image to the given number of container instances"""
+        if USE_MOCKS:
+            logger.info(f"Mock Orchestrator scale_containers image_id={image_id} target_count={target_count}")
+            changed = mock_services.orchestrator.scale_containers(image_id, target_count)
+            return {"replicas": target_count, "changed": changed}
+        url = f"{self.orchestrator_url}/containers/{image_id}/scale"
+        return await self._make_request(url, method="POST", json={"replicas": target_count})
+
     # Load Balancer API calls
     async def get_traffic_stats(self, image_id: str) -> Dict[str, Any]:
         """Get traffic statistics for an image"""
         if USE_MOCKS:
             logger.info(f"Mock LoadBalancer get_traffic_stats image_id={image_id}")
-            return mock_lb.get_traffic_stats(image_id)
+            return mock_services.load_balancer.get_traffic_stats(image_id)
         url = f"{self.load_balancer_url}/traffic/{image_id}"
         return await self._make_request(url)
 
@@ -129,7 +213,8 @@ class ExternalServiceClient:
         """Get all registered services"""
         if USE_MOCKS:
             logger.info("Mock ServiceDiscovery get_services")
-            return [{"id": k, "name": k, **v} for k, v in mock_sd.get_system_services().items()]
+            services = mock_services.service_discovery.get_system_services()
+            return [{"id": k, "name": k, **v} for k, v in services.items()]
         url = f"{self.service_discovery_url}/services"
         return await self._make_request(url)
 
@@ -137,26 +222,27 @@ class ExternalServiceClient:
         """Get health status of a specific service"""
         if USE_MOCKS:
             logger.info(f"Mock ServiceDiscovery get_service_health service_id={service_id}")
-            data = mock_sd.get_system_services().get(service_id, {"status": "unknown"})
+            data = mock_services.service_discovery.get_system_services().get(service_id, {"status": "unknown"})
             return {"status": data.get("status", "unknown"), "response_time": 50, "uptime": "99.9%"}
         url = f"{self.service_discovery_url}/health/{service_id}"
         return await self._make_request(url)
 
     # Billing API calls
-    async def get_image_costs(self, image_id: str) -> Dict[str, Any]:
-        """Get cost breakdown for an image"""
+    async def get_image_costs(self, image_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get cost breakdown for an image (user_id, when known, attributes it to its owner)"""
         if USE_MOCKS:
             logger.info(f"Mock Billing get_image_costs image_id={image_id}")
-            # For mock, assume user_id unknown here
-            return mock_billing.get_image_billing(image_id, "unknown-user")
+            return mock_services.billing.get_image_billing(image_id, user_id or mock_services.UNKNOWN_USER)
         url = f"{self.billing_url}/images/{image_id}/costs"
+        if user_id is not None:
+            return await self._make_request(url, params={"user_id": user_id})
         return await self._make_request(url)
 
     async def get_user_billing_summary(self, user_id: str) -> Dict[str, Any]:
         """Get billing summary for a user"""
         if USE_MOCKS:
             logger.info(f"Mock Billing get_user_billing_summary user_id={user_id}")
-            return mock_billing.get_user_billing_summary(user_id)
+            return mock_services.billing.get_user_billing_summary(user_id)
         url = f"{self.billing_url}/users/{user_id}/summary"
         return await self._make_request(url)
 
@@ -164,7 +250,7 @@ class ExternalServiceClient:
         """Get payment limit status for an image"""
         if USE_MOCKS:
             logger.info(f"Mock Billing get_payment_limit_status image_id={image_id}")
-            return mock_billing.check_payment_limit(image_id)
+            return mock_services.billing.check_payment_limit(image_id)
         url = f"{self.billing_url}/payment-limits/{image_id}"
         return await self._make_request(url)
 
@@ -172,7 +258,7 @@ class ExternalServiceClient:
         """Set payment limit for an image"""
         if USE_MOCKS:
             logger.info(f"Mock Billing set_payment_limit image_id={image_id} limit={limit}")
-            ok = mock_billing.set_payment_limit(image_id, limit)
+            ok = mock_services.billing.set_payment_limit(image_id, limit)
             return {"success": ok}
         url = f"{self.billing_url}/payment-limits/{image_id}"
         return await self._make_request(url, method="PUT", json={"limit": limit})
@@ -188,7 +274,7 @@ class ExternalServiceClient:
         """Get revenue analytics"""
         if USE_MOCKS:
             logger.info("Mock Billing get_revenue_analytics")
-            return mock_billing.get_system_bi_data()
+            return mock_services.billing.get_system_bi_data()
         url = f"{self.billing_url}/bi/revenue"
         return await self._make_request(url)
 
@@ -196,7 +282,7 @@ class ExternalServiceClient:
         """Get usage analytics"""
         if USE_MOCKS:
             logger.info("Mock Billing get_usage_analytics")
-            return mock_billing.get_system_bi_data()
+            return mock_services.billing.get_system_bi_data()
         url = f"{self.billing_url}/bi/usage"
         return await self._make_request(url)
 
@@ -0,0 +1,107 @@
+"""
+Background job handlers for image lifecycle work.
+
+Importing this module registers the handlers on the global job queue.
+"""
+
+import asyncio
+import os
+import tarfile
+from typing import Any, Dict, Optional
+
+from app.logger import logger
+from app.database import SessionLocal
+from app.models import DockerImage
+from app.external_services import external_client
+from app.jobs import job_queue, PermanentJobError, PRIORITY_NORMAL
+from app.bulk_operations import bulk_engine
+from app.payment_limits import payment_enforcer
+
+
+def _set_image_status(image_id: int, status: str):
+    db = SessionLocal()
+    try:
+        db.query(DockerImage).filter(DockerImage.id == image_id).update(
+            {DockerImage.status: status}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _load_image(image_id: int) -> Optional[DockerImage]:
+    db = SessionLocal()
+    try:
+        image = db.query(DockerImage).filter(DockerImage.id == image_id).first()
+        if image:
+            db.expunge(image)
+        return image
+    finally:
+        db.close()
+
+
+def _is_image_archive(path: str) -> bool:
+    """Docker image archives are (optionally gzipped) tarballs"""
+    return os.path.isfile(path) and tarfile.is_tarfile(path)
+
+
+async def _mark_image_error(payload: Dict[str, Any], error: str):
+    await asyncio.to_thread(_set_image_status, payload["image_id"], "error")
+
+
+@job_queue.handler("image.post_process", on_failure=_mark_image_error)
+async def post_process_upload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate an uploaded archive, then hand the image to the orchestrator sync job"""
+    image = await asyncio.to_thread(_load_image, payload["image_id"])
+    if image is None:
+        raise PermanentJobError(f"Image {payload['image_id']} no longer exists")
+
+    if not await asyncio.to_thread(_is_image_archive, image.image_file_path):
+        raise PermanentJobError(f"{image.image_file_path} is not a valid Docker image archive")
+    size = await asyncio.to_thread(os.path.getsize, image.image_file_path)
+
+    job_queue.enqueue(
+        "image.sync",
+        {"image_id": image.id},
+        priority=PRIORITY_NORMAL,
+        image_id=image.id,
+        user_id=image.user_id,
+    )
+    return {"image_id": image.id, "size_bytes": size}
+
+
+@job_queue.handler("image.sync", on_failure=_mark_image_error)
+async def sync_image(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Register the image in the orchestrator's images table"""
+    image = await asyncio.to_thread(_load_image, payload["image_id"])
+    if image is None:
+        raise PermanentJobError(f"Image {payload['image_id']} no longer exists")
+
+    base_url = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+    image_filename = os.path.basename(image.image_file_path)
+    result = await external_client.sync_image_to_orchestrator({
+        "image": f"{image.name}:latest",
+        "image_url": f"{base_url}/docker/images/{image_filename}",
+        "inner_port": image.inner_port,
+        "scaling_type": image.scaling_type,
+        "min_containers": image.min_containers or 0,
+        "max_containers": image.max_containers or 0,
+        "static_containers": image.static_containers or 0,
+        "items_per_container": image.items_per_container,
+        "payment_limit": image.payment_limit,
+        "user_id": image.user_id,
+    })
+    # An image stopped at its payment limit stays stopped
+    status = await asyncio.to_thread(payment_enforcer.settle_status, image.id, "running")
+    logger.info(f"Image {image.id} synced to orchestrator ({status})")
+    return result if isinstance(result, dict) else {"result": result}
+
+
+@job_queue.handler("containers.bulk")
+async def run_bulk_operation(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a queued bulk start/stop/resize operation"""
+    op = bulk_engine.restore_operation(payload, register=True)
+    await bulk_engine.run(op)
+    if op.status == "failed":
+        raise RuntimeError(op.error or "Bulk operation failed")
+    return op.to_dict()
@@ -0,0 +1,372 @@
+"""
+Durable job queue backed by the application database.
+
+Jobs are rows in the ``jobs`` table. Worker tasks claim the highest priority
+eligible job with a conditional UPDATE (safe across processes), run the
+registered handler and either store its result or reschedule it with
+exponential backoff until ``max_attempts`` is reached.
+
+While a job runs its worker refreshes ``locked_at`` every
+JOB_HEARTBEAT_INTERVAL seconds, and every process requeues running jobs
+whose lock is older than JOB_LOCK_TIMEOUT (their worker died or hung) as
+often. A claim is identified by its worker and attempt number: a worker
+that lost its lock in the meantime finds so when it finishes, and its
+result (or failure) is discarded instead of overwriting the new claim.
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.logger import logger
+from app.database import SessionLocal
+from app.models import Job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "2"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+# Running jobs whose worker has been silent for this long are requeued
+JOB_LOCK_TIMEOUT = float(os.getenv("JOB_LOCK_TIMEOUT", "600"))
+# How often running jobs refresh their lock and stale locks are looked for; well below JOB_LOCK_TIMEOUT
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "60"))
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 100
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+FailureHook = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot help"""
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with a little jitter for the given attempt count"""
+    delay = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * (2 ** max(0, attempts - 1)))
+    return delay * (1 + random.uniform(0, 0.1))
+
+
+class JobQueue:
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self.handlers: Dict[str, JobHandler] = {}
+        self.failure_hooks: Dict[str, FailureHook] = {}
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers) and not self._stopping
+
+    def handler(self, kind: str, on_failure: Optional[FailureHook] = None):
+        """Register the coroutine that processes jobs of the given kind"""
+        def decorator(fn: JobHandler) -> JobHandler:
+            self.handlers[kind] = fn
+            if on_failure:
+                self.failure_hooks[kind] = on_failure
+            return fn
+        return decorator
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        db: Optional[Session] = None,
+        priority: int = PRIORITY_NORMAL,
+        image_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        reference: Optional[str] = None,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        delay_seconds: float = 0,
+    ) -> Job:
+        """Persist a new job and wake idle workers"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            job = Job(
+                kind=kind,
+                payload=json.dumps(payload),
+                status="queued",
+                priority=priority,
+                attempts=0,
+                max_attempts=max_attempts,
+                run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+                image_id=image_id,
+                user_id=user_id,
+                reference=reference,
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            if own_session:
+                db.expunge(job)
+        finally:
+            if own_session:
+                db.close()
+        logger.info(f"Job {job.id} enqueued kind={kind} priority={priority} image_id={image_id}")
+        self._notify()
+        return job
+
+    def enqueue_many(
+        self,
+        kind: str,
+        jobs: List[Dict[str, Any]],
+        db: Session,
+        priority: int = PRIORITY_NORMAL,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> int:
+        """Persist many jobs ({"payload", "image_id", "user_id"}) with one commit of the caller's session"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        run_at = datetime.utcnow()
+        db.add_all([
+            Job(
+                kind=kind,
+                payload=json.dumps(job["payload"]),
+                status="queued",
+                priority=priority,
+                attempts=0,
+                max_attempts=max_attempts,
+                run_at=run_at,
+                image_id=job.get("image_id"),
+                user_id=job.get("user_id"),
+            )
+            for job in jobs
+        ])
+        db.commit()
+        logger.info(f"{len(jobs)} jobs enqueued kind={kind} priority={priority}")
+        self._notify()
+        return len(jobs)
+
+    def _notify(self):
+        if self._loop and self._wakeup and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # Database helpers, run in a worker thread so polling never blocks the event loop
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            candidates = (
+                db.query(Job.id)
+                .filter(Job.status == "queued", Job.run_at <= now)
+                .order_by(Job.priority, Job.run_at, Job.id)
+                .limit(5)
+                .all()
+            )
+            for (job_id,) in candidates:
+                claimed = (
+                    db.query(Job)
+                    .filter(Job.id == job_id, Job.status == "queued")
+                    .update(
+                        {
+                            Job.status: "running",
+                            Job.attempts: Job.attempts + 1,
+                            Job.locked_by: self.worker_id,
+                            Job.locked_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed:
+                    job = db.query(Job).filter(Job.id == job_id).first()
+                    return {
+                        "id": job.id,
+                        "kind": job.kind,
+                        "payload": json.loads(job.payload or "{}"),
+                        "attempts": job.attempts,
+                        "max_attempts": job.max_attempts,
+                    }
+            return None
+        finally:
+            db.close()
+
+    def _held(self, db: Session, job: Dict[str, Any]):
+        """Query of the job row, as long as this claim still holds it"""
+        return db.query(Job).filter(
+            Job.id == job["id"], Job.status == "running", Job.locked_by == self.worker_id, Job.attempts == job["attempts"]
+        )
+
+    def _touch(self, job: Dict[str, Any]) -> bool:
+        """Refresh the lock of a running job; False once it was lost"""
+        db = self.session_factory()
+        try:
+            held = self._held(db, job).update({Job.locked_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            return bool(held)
+        finally:
+            db.close()
+
+    def _complete(self, job: Dict[str, Any], result: Optional[Dict[str, Any]]) -> bool:
+        db = self.session_factory()
+        try:
+            held = self._held(db, job).update(
+                {
+                    Job.status: "succeeded",
+                    Job.result: json.dumps(result) if result is not None else None,
+                    Job.last_error: None,
+                    Job.locked_by: None,
+                    Job.locked_at: None,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            return bool(held)
+        finally:
+            db.close()
+
+    def _reschedule(self, job: Dict[str, Any], error: str, retry_in: Optional[float]) -> bool:
+        db = self.session_factory()
+        try:
+            values: Dict[Any, Any] = {Job.last_error: error, Job.locked_by: None, Job.locked_at: None}
+            if retry_in is None:
+                values[Job.status] = "failed"
+            else:
+                values[Job.status] = "queued"
+                values[Job.run_at] = datetime.utcnow() + timedelta(seconds=retry_in)
+            held = self._held(db, job).update(values, synchronize_session=False)
+            db.commit()
+            return bool(held)
+        finally:
+            db.close()
+
+    def recover_stale_jobs(self) -> int:
+        """Requeue jobs left 'running' by a worker that died"""
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=JOB_LOCK_TIMEOUT)
+            count = (
+                db.query(Job)
+                .filter(Job.status == "running", Job.locked_at < cutoff)
+                .update(
+                    {Job.status: "queued", Job.locked_by: None, Job.locked_at: None, Job.run_at: datetime.utcnow()},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if count:
+                logger.info(f"Requeued {count} stale jobs")
+            return count
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                if not await asyncio.to_thread(self._touch, job):
+                    logger.error(f"Job {job['id']} ({job['kind']}) lost its lock; its outcome will be discarded")
+                    return
+            except Exception as e:
+                logger.error(f"Job {job['id']} ({job['kind']}) could not refresh its lock: {e}")
+
+    async def _run_handler(self, job: Dict[str, Any], handler: JobHandler) -> Optional[Dict[str, Any]]:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            return await handler(job["payload"])
+        finally:
+            heartbeat.cancel()
+
+    async def _execute(self, job: Dict[str, Any]):
+        kind = job["kind"]
+        handler = self.handlers.get(kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind '{kind}'")
+            result = await self._run_handler(job, handler)
+            if await asyncio.to_thread(self._complete, job, result):
+                logger.info(f"Job {job['id']} ({kind}) succeeded on attempt {job['attempts']}")
+            else:
+                logger.error(f"Job {job['id']} ({kind}) finished after losing its lock; result discarded")
+            return
+        except asyncio.CancelledError:
+            # Shutting down mid-job: make it eligible again right away
+            await asyncio.to_thread(self._reschedule, job, "Worker shut down", 0)
+            raise
+        except PermanentJobError as e:
+            error, retry_in = str(e), None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            retry_in = backoff_delay(job["attempts"]) if job["attempts"] < job["max_attempts"] else None
+
+        if not await asyncio.to_thread(self._reschedule, job, error, retry_in):
+            logger.error(f"Job {job['id']} ({kind}) failed after losing its lock; failure discarded: {error}")
+            return
+        if retry_in is not None:
+            logger.error(f"Job {job['id']} ({kind}) attempt {job['attempts']} failed, retrying in {retry_in:.1f}s: {error}")
+            return
+        logger.error(f"Job {job['id']} ({kind}) failed permanently after {job['attempts']} attempts: {error}")
+        hook = self.failure_hooks.get(kind)
+        if hook:
+            try:
+                await hook(job["payload"], error)
+            except Exception as e:
+                logger.error(f"Job {job['id']} ({kind}) failure hook raised: {e}")
+
+    async def _worker(self, name: str):
+        logger.info(f"Job worker {name} started")
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.error(f"Job worker {name} could not poll the queue: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._execute(job)
+        logger.info(f"Job worker {name} stopped")
+
+    async def _recover_periodically(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self.recover_stale_jobs)
+            except Exception as e:
+                logger.error(f"Could not requeue stale jobs: {e}")
+
+    async def start(self, workers: int = JOB_WORKERS):
+        if self._workers:
+            return
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self.recover_stale_jobs)
+        self._workers = [
+            asyncio.create_task(self._worker(f"{self.worker_id}/{i}")) for i in range(max(0, workers))
+        ]
+        if self._workers:
+            self._workers.append(asyncio.create_task(self._recover_periodically()))
+
+    async def stop(self):
+        self._stopping = True
+        if self._wakeup:
+            self._wakeup.set()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Global instance
+job_queue = JobQueue()
@@ -0,0 +1,85 @@
+"""
+Leader election between the worker processes of one instance.
+
+serve.py runs several uvicorn workers of main:app. Work that must happen
+once per instance rather than once per worker (the registry heartbeat and
+the autoscaler) runs only in the worker holding an exclusive lock on
+WORKER_LEADER_LOCK. The kernel releases the lock when its holder exits, so
+when the leader is recycled after its request limit or crashes, another
+worker takes over on its next attempt, within LEADER_RETRY_INTERVAL seconds.
+
+Without a lock file (plain `uvicorn main:app`, benchmarks) the process is
+its own leader.
+"""
+
+import asyncio
+import os
+from typing import Callable, Dict, Optional
+
+from app.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: single worker, always the leader
+    fcntl = None
+
+# Set by serve.py for its workers
+WORKER_LEADER_LOCK = os.getenv("WORKER_LEADER_LOCK", "")
+LEADER_RETRY_INTERVAL = float(os.getenv("LEADER_RETRY_INTERVAL", "2"))
+
+
+class WorkerLeader:
+    def __init__(self, lock_path: str = WORKER_LEADER_LOCK):
+        self.lock_path = lock_path
+        self.is_leader = False
+        self._file = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _try_acquire(self) -> bool:
+        if not self.lock_path or fcntl is None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def _elected(self, on_elected: Callable[[], None]):
+        self.is_leader = True
+        if self.lock_path:
+            logger.info(f"Worker {os.getpid()} is the leader: running the registry heartbeat and autoscaler")
+        on_elected()
+
+    async def _campaign(self, on_elected: Callable[[], None]):
+        while not self._try_acquire():
+            await asyncio.sleep(LEADER_RETRY_INTERVAL)
+        self._elected(on_elected)
+
+    def start(self, on_elected: Callable[[], None]):
+        """Call on_elected now if this worker is the leader, or once it becomes the leader"""
+        if self.is_leader or self._task is not None:
+            return
+        if self._try_acquire():
+            self._elected(on_elected)
+        else:
+            self._task = asyncio.create_task(self._campaign(on_elected))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._file is not None:
+            self._file.close()  # releases the lock
+            self._file = None
+        self.is_leader = False
+
+    def state(self) -> Dict:
+        return {"pid": os.getpid(), "leader": self.is_leader, "lock": self.lock_path or None}
+
+
+# Global instance
+worker_leader = WorkerLeader()
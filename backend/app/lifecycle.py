@@ -0,0 +1,196 @@
+"""
+Single-flight image lifecycle operations.
+
+At most one start or stop runs per image. A duplicate request arriving while
+one is pending (repeated clicks, retries, several open dashboards) joins the
+pending operation and gets its result instead of sending more orchestrator
+work, and a request repeating an Idempotency-Key replays the earlier result.
+A conflicting request (start while a stop is pending) gets a 409.
+
+The in-flight state is written to DockerImage.status ("starting" /
+"stopping") with a compare-and-set update, so other workers see it and refuse
+to run a second operation for the same image. On success the image becomes
+"running" / "stopped"; on failure it goes back to its previous status.
+
+The claim records the instance holding it (SERVICE_ID) and when it was taken.
+Instances share the database, so recovery at startup only resets the claims
+the restarting instance left behind, and those of any instance older than
+LIFECYCLE_CLAIM_TIMEOUT (an instance that never came back); operations
+still running on other instances are left alone.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from sqlalchemy import or_
+
+from app.logger import logger
+from app.database import SessionLocal
+from app.models import DockerImage
+from app.registry import SERVICE_ID
+
+# How long finished operations stay replayable by their idempotency key
+LIFECYCLE_RESULT_TTL = float(os.getenv("LIFECYCLE_RESULT_TTL", "600"))
+# Age after which another instance's start/stop claim counts as abandoned; longer than any start or stop
+LIFECYCLE_CLAIM_TIMEOUT = float(os.getenv("LIFECYCLE_CLAIM_TIMEOUT", "900"))
+
+IN_FLIGHT_STATUS = {"start": "starting", "stop": "stopping"}
+DONE_STATUS = {"start": "running", "stop": "stopped"}
+IN_FLIGHT_STATUSES = tuple(IN_FLIGHT_STATUS.values())
+
+
+def _claim_image(image_id: int, status: str) -> Tuple[bool, Optional[str]]:
+    """Move an image into an in-flight status unless another operation holds it; returns (claimed, previous)"""
+    db = SessionLocal()
+    try:
+        row = db.query(DockerImage.status).filter(DockerImage.id == image_id).first()
+        if row is None or row.status in IN_FLIGHT_STATUSES:
+            return False, row.status if row else None
+        claimed = (
+            db.query(DockerImage)
+            .filter(DockerImage.id == image_id, DockerImage.status == row.status)
+            .update(
+                {DockerImage.status: status, DockerImage.lifecycle_owner: SERVICE_ID, DockerImage.lifecycle_claimed_at: time.time()},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(claimed), row.status
+    finally:
+        db.close()
+
+
+def _release_image(image_id: int, status: Optional[str]):
+    db = SessionLocal()
+    try:
+        db.query(DockerImage).filter(DockerImage.id == image_id).update(
+            {DockerImage.status: status, DockerImage.lifecycle_owner: None, DockerImage.lifecycle_claimed_at: None},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+class LifecycleOperation:
+    __slots__ = ("image_id", "action", "task", "finished_at")
+
+    def __init__(self, image_id: int, action: str, task: asyncio.Task):
+        self.image_id = image_id
+        self.action = action
+        self.task = task
+        self.finished_at: Optional[float] = None
+
+
+class ImageLifecycle:
+    """Coalesces concurrent start/stop requests per image"""
+
+    def __init__(self):
+        self.in_flight: Dict[int, LifecycleOperation] = {}
+        self.idempotency_keys: Dict[Tuple[int, str], LifecycleOperation] = {}
+        self.stats = {"executed": 0, "coalesced": 0, "replayed": 0, "conflicts": 0}
+
+    def _prune(self):
+        cutoff = time.time() - LIFECYCLE_RESULT_TTL
+        self.idempotency_keys = {
+            key: op for key, op in self.idempotency_keys.items() if op.finished_at is None or op.finished_at >= cutoff
+        }
+
+    async def _execute(self, image_id: int, action: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        claimed, previous = await asyncio.to_thread(_claim_image, image_id, IN_FLIGHT_STATUS[action])
+        if not claimed:
+            self.stats["conflicts"] += 1
+            raise HTTPException(
+                status_code=409,
+                detail=f"Another operation is in progress for this image (status: {previous})",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            result = await fn()
+        except BaseException:
+            await asyncio.to_thread(_release_image, image_id, previous)
+            raise
+        await asyncio.to_thread(_release_image, image_id, DONE_STATUS[action])
+        return result
+
+    def _finished(self, op: LifecycleOperation, task: asyncio.Task):
+        op.finished_at = time.time()
+        if self.in_flight.get(op.image_id) is op:
+            del self.in_flight[op.image_id]
+        if task.cancelled() or task.exception() is not None:
+            # Let the client retry a failed operation with the same key
+            self.idempotency_keys = {key: o for key, o in self.idempotency_keys.items() if o is not op}
+
+    async def run(
+        self,
+        image_id: int,
+        action: str,
+        user_id: int,
+        fn: Callable[[], Awaitable[Any]],
+        idempotency_key: Optional[str] = None,
+    ) -> Any:
+        """Run `fn` as this image's `action`, or join/replay an equivalent pending or keyed operation"""
+        self._prune()
+        if idempotency_key:
+            op = self.idempotency_keys.get((user_id, idempotency_key))
+            if op is not None:
+                if op.image_id != image_id or op.action != action:
+                    raise HTTPException(status_code=409, detail="Idempotency key already used for a different operation")
+                self.stats["replayed"] += 1
+                logger.info(f"Image {image_id} {action} replayed from idempotency key {idempotency_key}")
+                return await asyncio.shield(op.task)
+
+        op = self.in_flight.get(image_id)
+        if op is not None:
+            if op.action != action:
+                self.stats["conflicts"] += 1
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Image is {IN_FLIGHT_STATUS[op.action]}, retry when that finishes",
+                    headers={"Retry-After": "1"},
+                )
+            self.stats["coalesced"] += 1
+            logger.info(f"Image {image_id} {action} joined the pending operation")
+        else:
+            # Detached, so a dropped client connection does not cancel the operation for everyone else
+            op = LifecycleOperation(image_id, action, asyncio.create_task(self._execute(image_id, action, fn)))
+            op.task.add_done_callback(lambda task: self._finished(op, task))
+            self.in_flight[image_id] = op
+            self.stats["executed"] += 1
+        if idempotency_key:
+            self.idempotency_keys[(user_id, idempotency_key)] = op
+        return await asyncio.shield(op.task)
+
+    def recover(self):
+        """Images this instance left mid-operation, or abandoned by another: their outcome is unknown, so mark them as errors"""
+        db = SessionLocal()
+        try:
+            reset = (
+                db.query(DockerImage)
+                .filter(
+                    DockerImage.status.in_(IN_FLIGHT_STATUSES),
+                    or_(
+                        DockerImage.lifecycle_owner == SERVICE_ID,
+                        # Claimed before claims recorded their owner
+                        DockerImage.lifecycle_claimed_at.is_(None),
+                        DockerImage.lifecycle_claimed_at < time.time() - LIFECYCLE_CLAIM_TIMEOUT,
+                    ),
+                )
+                .update(
+                    {DockerImage.status: "error", DockerImage.lifecycle_owner: None, DockerImage.lifecycle_claimed_at: None},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        if reset:
+            logger.error(f"Image lifecycle: {reset} images were interrupted mid start/stop and marked as error")
+
+
+# Global instance
+image_lifecycle = ImageLifecycle()
@@ -0,0 +1,210 @@
+"""
+Event loop lag and blocking-call monitor.
+
+A probe coroutine sleeps LOOP_LAG_INTERVAL seconds at a time and records how
+late it wakes up: that delay is the event loop lag every other coroutine
+sees. A watchdog thread checks the probe's heartbeat. When the loop has been
+stuck for more than LOOP_BLOCK_THRESHOLD_MS, it captures the loop thread's
+stack while the blocking call is still running, together with the route of
+the request being served. Each block is logged from the watchdog thread, so
+logging never adds to the stall: a one-line summary goes to the main log and
+the full stack to LOOP_BLOCK_LOG.
+
+Lag percentiles, block counts and the latest blocks (when, how long, route
+and app frame) are reported on /metrics; their task names and stacks only on
+GET /health/loop-blocks. Both are admin only. The benchmarks read the same
+counters per scenario.
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from app.logger import logger, log_file
+from app.profiling import short_path
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCK_EVENTS_KEPT = int(os.getenv("LOOP_BLOCK_EVENTS_KEPT", "50"))
+LOOP_BLOCK_LOG = os.getenv("LOOP_BLOCK_LOG", os.path.join(os.path.dirname(log_file), "loop_blocks.log"))
+# Lag samples kept for the percentiles (about a minute at the default interval)
+LOOP_LAG_WINDOW = 1200
+# Block event fields /metrics shows; task names and stacks are left to /health/loop-blocks
+SUMMARY_BLOCK_FIELDS = ("at", "blocked_ms", "duration_ms", "route", "where")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Full stacks of blocking calls, in their own file
+block_logger = logging.getLogger("UI.loop_blocks")
+if LOOP_MONITOR_ENABLED and not block_logger.handlers:
+    _handler = logging.FileHandler(LOOP_BLOCK_LOG, delay=True)
+    _handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+    block_logger.addHandler(_handler)
+    block_logger.propagate = False
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _route(scope: Optional[Dict[str, Any]]) -> Optional[str]:
+    if scope is None:
+        return None
+    path = scope.get("path")
+    template = getattr(scope.get("route"), "path_format", None)
+    params = scope.get("path_params")
+    if template and params:
+        # Report the route template (/docker/images/{image_id}/start), not every concrete path;
+        # the template may or may not include the router prefix
+        try:
+            concrete = template.format(**params)
+        except (KeyError, IndexError, ValueError):
+            concrete = None
+        if concrete and path.endswith(concrete):
+            path = path[: len(path) - len(concrete)] + template
+    return f"{scope.get('method')} {path}"
+
+
+class LoopMonitor:
+    def __init__(self):
+        # Request task -> ASGI scope, kept by MetricsMiddleware so blocks can name their route
+        self.requests: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self.lags: Deque[float] = deque(maxlen=LOOP_LAG_WINDOW)
+        self.max_lag_ms = 0.0
+        self.blocks_total = 0
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=LOOP_BLOCK_EVENTS_KEPT)
+        self._window: Optional[Dict[str, Any]] = None
+        self._beat: Optional[float] = None
+        self._open_event: Optional[Dict[str, Any]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _probe(self):
+        while True:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            now = time.perf_counter()
+            lag_ms = max(0.0, now - expected) * 1000
+            self._beat = now
+            self.lags.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if self._window is not None:
+                self._window["lags"].append(lag_ms)
+            event = self._open_event
+            if event is not None:
+                # The loop is back: this tick's lag is how long the blocked callback ran
+                event["duration_ms"] = round(lag_ms, 1)
+                self._open_event = None
+
+    def _watch(self):
+        threshold = LOOP_BLOCK_THRESHOLD_MS / 1000
+        while not self._stopped.wait(threshold / 4):
+            beat = self._beat
+            if beat is None or self._open_event is not None:
+                continue
+            stalled = time.perf_counter() - beat - LOOP_LAG_INTERVAL
+            if stalled >= threshold:
+                self._capture(stalled)
+
+    def _capture(self, stalled: float):
+        """Runs on the watchdog thread while the loop is still blocked"""
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = traceback.extract_stack(frame)[-30:] if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        app_frames = [f for f in stack if f.filename.startswith(BACKEND_DIR)]
+        where = app_frames[-1] if app_frames else (stack[-1] if stack else None)
+        event = {
+            "at": datetime.utcnow().isoformat(),
+            "blocked_ms": round(stalled * 1000, 1),
+            "duration_ms": None,  # filled in when the loop comes back
+            "route": _route(self.requests.get(task)),
+            "task": task.get_name() if task is not None else None,
+            "where": f"{short_path(where.filename)}:{where.lineno} {where.name}" if where else None,
+            "stack": [f"{f.filename}:{f.lineno} {f.name}" for f in stack],
+        }
+        self.events.append(event)
+        self.blocks_total += 1
+        if self._window is not None:
+            self._window["blocks"] += 1
+        self._open_event = event
+        logger.error(
+            f"Event loop blocked for over {event['blocked_ms']} ms in {event['route'] or 'background task'} at {event['where']}"
+        )
+        block_logger.warning(
+            f"blocked >= {event['blocked_ms']} ms route={event['route']} task={event['task']}\n"
+            + "".join(traceback.format_list(stack))
+        )
+
+    def start(self):
+        if not LOOP_MONITOR_ENABLED or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = None
+        self._task = asyncio.create_task(self._probe())
+        self._stopped.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await asyncio.to_thread(self._watchdog.join)
+        self._watchdog = None
+
+    def start_window(self):
+        """Start counting lag and blocks separately (benchmark scenarios)"""
+        self._window = {"lags": [], "blocks": 0}
+
+    def end_window(self) -> Dict[str, Any]:
+        window, self._window = self._window or {"lags": [], "blocks": 0}, None
+        return {
+            "loop_lag_p99_ms": round(_percentile(window["lags"], 99), 2),
+            "loop_lag_max_ms": round(max(window["lags"], default=0.0), 2),
+            "loop_blocks": window["blocks"],
+        }
+
+    def stats(self, events: int = 10) -> Dict[str, Any]:
+        lags = list(self.lags)
+        return {
+            "enabled": self._task is not None,
+            "threshold_ms": LOOP_BLOCK_THRESHOLD_MS,
+            "lag_ms": {
+                "current": round(lags[-1], 2) if lags else None,
+                "mean": round(statistics.fmean(lags), 2) if lags else None,
+                "p50": round(_percentile(lags, 50), 2),
+                "p99": round(_percentile(lags, 99), 2),
+                "max": round(self.max_lag_ms, 2),
+            },
+            "blocks_total": self.blocks_total,
+            "recent_blocks": [
+                {field: event[field] for field in SUMMARY_BLOCK_FIELDS} for event in self.recent_blocks(events)
+            ],
+        }
+
+    def recent_blocks(self, events: int = LOOP_BLOCK_EVENTS_KEPT) -> List[Dict[str, Any]]:
+        """The latest block events in full, stacks included"""
+        return list(self.events)[-events:]
+
+
+# Global instance
+loop_monitor = LoopMonitor()
@@ -0,0 +1,84 @@
+"""
+In-process request load metrics.
+
+A pure ASGI middleware counts in-flight requests and keeps exponentially
+weighted averages of latency and error rate. The registry heartbeat uses them
+to report this instance as UP or DEGRADED.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+from app.loop_monitor import loop_monitor
+
+# Weight of the newest request in the moving averages
+METRICS_EWMA_ALPHA = float(os.getenv("METRICS_EWMA_ALPHA", "0.05"))
+
+
+class RequestMetrics:
+    def __init__(self, alpha: float = METRICS_EWMA_ALPHA):
+        self.alpha = alpha
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.total = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.error_rate = 0.0
+
+    def begin(self):
+        self.in_flight += 1
+
+    def end(self, duration: float, failed: bool):
+        self.in_flight -= 1
+        self.total += 1
+        if failed:
+            self.errors += 1
+        self.latency_ms += self.alpha * (duration * 1000 - self.latency_ms)
+        self.error_rate += self.alpha * ((1.0 if failed else 0.0) - self.error_rate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "requests_total": self.total,
+            "errors_total": self.errors,
+            "latency_ms_avg": round(self.latency_ms, 2),
+            "error_rate_avg": round(self.error_rate, 4),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+
+class MetricsMiddleware:
+    """Counts every HTTP request; 5xx responses and unhandled exceptions count as errors"""
+
+    def __init__(self, app, metrics: RequestMetrics = None):
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # Lets the loop monitor name the route of a request that blocks the event loop
+        task = asyncio.current_task()
+        loop_monitor.requests[task] = scope
+        self.metrics.begin()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.end(time.perf_counter() - started, status_code >= 500)
+            loop_monitor.requests.pop(task, None)
+
+
+# Global instance
+request_metrics = RequestMetrics()
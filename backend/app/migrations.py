@@ -0,0 +1,78 @@
+"""
+Database schema migrations.
+
+The schema is owned by the Alembic revisions in alembic/versions. Deployments
+run ``alembic upgrade head`` (from the backend directory) before starting the
+API, and the API itself no longer runs DDL: at startup it only checks that
+the database is at the head revision and refuses to start when it is behind.
+A database already migrated past head by a newer release (a rolling deploy,
+or a worker of the old release recycled after the upgrade) is accepted, so
+revisions must stay compatible with the release before them: add columns and
+tables, and drop them only a release after the code stopped using them.
+
+Scripts that build a scratch database (benchmarks, the fleet generator) call
+upgrade() to migrate it in-process.
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
+
+from app.logger import logger
+from app.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the head migration"""
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    # Absolute, so it works from any working directory
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+
+def head_revision() -> Optional[str]:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(bind: Optional[Engine] = None) -> Optional[str]:
+    with (bind or engine).connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade(revision: str = "head", bind: Optional[Engine] = None):
+    """Migrate the configured database (or `bind`) up to `revision`"""
+    config = alembic_config()
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+    logger.info(f"Database migrated to {revision}")
+
+
+def check_schema(bind: Optional[Engine] = None):
+    """Raise SchemaOutOfDate when the database is behind the head revision"""
+    current, head = current_revision(bind), head_revision()
+    if current == head:
+        return
+    if current is not None:
+        try:
+            ScriptDirectory.from_config(alembic_config()).get_revision(current)
+        except CommandError:
+            # Not one of ours: written by a newer release, which migrated past our head
+            logger.warning(f"Database schema is at revision {current}, newer than this release's head {head}")
+            return
+    raise SchemaOutOfDate(
+        f"Database schema is at revision {current or 'none'}, expected {head}; "
+        f"run 'alembic upgrade head' in the backend directory"
+    )
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Index
+from sqlalchemy.sql import func, false
 from app.database import Base
 
 class User(Base):
@@ -15,11 +15,20 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+# Schema changes go through Alembic migrations (alembic/versions); keep these models in step with them
+
 class DockerImage(Base):
     __tablename__ = "docker_images"
+    __table_args__ = (
+        # Per-user image list; INCLUDE makes it covering on PostgreSQL
+        Index(
+            "ix_docker_images_user_list", "user_id", "id",
+            postgresql_include=["name", "inner_port", "payment_limit", "items_per_container", "status"],
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", name="fk_docker_images_user_id_users"), nullable=False)
     name = Column(String(255), nullable=False)
     image_file_path = Column(String(500), nullable=False)
     inner_port = Column(Integer, nullable=False)
@@ -29,7 +38,53 @@ class DockerImage(Base):
     static_containers = Column(Integer, default=0)
     items_per_container = Column(Integer, nullable=False)
     payment_limit = Column(Float, default=0.0)
+    # Payment limit state, kept by app.payment_limits
+    spend = Column(Float, nullable=False, default=0.0, server_default="0")
+    limit_alerted = Column(Boolean, nullable=False, default=False, server_default=false())
+    limit_enforced = Column(Boolean, nullable=False, default=False, server_default=false())
     description = Column(Text)
-    status = Column(String(50), default="processing")  # "processing", "running", "stopped", "error"
+    status = Column(String(50), default="processing", index=True)  # "processing", "starting", "running", "stopping", "stopped", "error"
+    # Instance (SERVICE_ID) holding a "starting"/"stopping" status and since when, kept by app.lifecycle
+    lifecycle_owner = Column(String(100))
+    lifecycle_claimed_at = Column(Float)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Worker claim query: WHERE status = 'queued' AND run_at <= now ORDER BY priority, run_at, id
+        Index("ix_jobs_claim", "status", "priority", "run_at", "id"),
+        Index("ix_jobs_user_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(100), nullable=False, index=True)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String(20), nullable=False, default="queued")  # "queued", "running", "succeeded", "failed"
+    priority = Column(Integer, nullable=False, default=50)  # lower runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, index=True)  # naive UTC, next time the job is eligible
+    image_id = Column(Integer, index=True)
+    user_id = Column(Integer)
+    reference = Column(String(100), index=True)  # external id, e.g. a bulk operation id
+    result = Column(Text)  # JSON
+    last_error = Column(Text)
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(200), primary_key=True)  # "<budget>:<user id>"
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # epoch seconds of the last refill
+
+class ReplicationHeartbeat(Base):
+    __tablename__ = "replication_heartbeat"
+
+    id = Column(Integer, primary_key=True)  # single row, id 1
+    written_at = Column(Float, nullable=False)  # epoch seconds, rewritten by the primary (see app.database.ReadReplicas)
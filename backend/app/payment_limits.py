@@ -0,0 +1,260 @@
+"""
+Payment-limit enforcement.
+
+Keeps a running spend total per image and applies billing/usage deltas as
+they arrive, so each delta costs O(1) regardless of fleet size. Crossing
+PAYMENT_ALERT_THRESHOLD of an image's payment_limit raises an alert;
+reaching the limit stops the image (or throttles it to its minimum replica
+count, depending on PAYMENT_LIMIT_ACTION). Enforcement is sticky: starts are
+refused and the orchestrator sync leaves a stopped image stopped until its
+limit is raised.
+
+The spend and both flags live on the image row (docker_images.spend,
+limit_alerted, limit_enforced), so they survive restarts and every worker
+sees the same state. Deltas are added with UPDATE ... SET spend = spend +
+:delta, and a flag is only flipped by a conditional UPDATE, so exactly one
+worker raises each alert and carries out each enforcement. The alert
+history itself is per process.
+
+With mock services the mock billing service generates its records anew in
+every process; their totals are stored as the image's spend rather than
+added to it, so a restart does not count them twice.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, not_, update
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.database import SessionLocal
+from app.models import DockerImage
+from app.external_services import external_client, USE_MOCKS
+from app.bulk_operations import bulk_engine
+
+# Fraction of the payment limit at which an alert is raised
+PAYMENT_ALERT_THRESHOLD = float(os.getenv("PAYMENT_ALERT_THRESHOLD", "0.8"))
+# What happens when an image reaches its limit: "stop" or "throttle"
+PAYMENT_LIMIT_ACTION = os.getenv("PAYMENT_LIMIT_ACTION", "stop").lower()
+PAYMENT_ALERT_HISTORY = int(os.getenv("PAYMENT_ALERT_HISTORY", "1000"))
+
+images = DockerImage.__table__
+# Columns an alert and the enforcement need
+ALERT_COLUMNS = (images.c.id, images.c.user_id, images.c.spend, images.c.payment_limit, images.c.min_containers)
+
+
+class PaymentLimitEnforcer:
+    def __init__(self, alert_threshold: float = PAYMENT_ALERT_THRESHOLD, action: str = PAYMENT_LIMIT_ACTION):
+        self.alert_threshold = alert_threshold
+        self.action = action if action in ("stop", "throttle") else "stop"
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=PAYMENT_ALERT_HISTORY)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _over(self, fraction: float):
+        limit = func.coalesce(images.c.payment_limit, 0.0)
+        return and_(limit > 0, images.c.spend >= limit * fraction)
+
+    def _needs_settling(self, spend: float, limit: Optional[float], alerted: bool, enforced: bool) -> bool:
+        limit = limit or 0.0
+        over_limit = limit > 0 and spend >= limit
+        over_threshold = limit > 0 and spend >= limit * self.alert_threshold
+        return over_limit != enforced or over_threshold != alerted
+
+    def _settle(self, db: Session, image_id: int) -> List[Tuple[str, Any]]:
+        """Bring the stored flags in line with spend and limit; returns the (kind, row) alerts this call raised"""
+        over_limit, over_threshold = self._over(1.0), self._over(self.alert_threshold)
+        # Limit raised (or spend lowered): re-arm both triggers
+        db.execute(
+            update(images).where(images.c.id == image_id, images.c.limit_enforced, not_(over_limit))
+            .values(limit_enforced=False)
+        )
+        db.execute(
+            update(images).where(images.c.id == image_id, images.c.limit_alerted, not_(over_threshold))
+            .values(limit_alerted=False)
+        )
+        # Only the UPDATE that flips a flag matches, whichever worker runs it
+        row = db.execute(
+            update(images).where(images.c.id == image_id, not_(images.c.limit_enforced), over_limit)
+            .values(limit_enforced=True, limit_alerted=True).returning(*ALERT_COLUMNS)
+        ).first()
+        if row is not None:
+            return [("limit_reached", row)]
+        row = db.execute(
+            update(images).where(images.c.id == image_id, not_(images.c.limit_alerted), over_threshold)
+            .values(limit_alerted=True).returning(*ALERT_COLUMNS)
+        ).first()
+        return [("threshold_crossed", row)] if row is not None else []
+
+    def _store(self, values: Dict[int, float], absolute: bool = False) -> Tuple[List[str], List[Tuple[str, Any]]]:
+        """Add (or with absolute=True, set) the spend of each image; returns the enforced images and raised alerts (blocking)"""
+        enforced, raised = [], []
+        db = SessionLocal()
+        try:
+            for image_id, amount in values.items():
+                spend = images.c.spend + amount if not absolute else amount
+                row = db.execute(
+                    update(images).where(images.c.id == image_id).values(spend=spend)
+                    .returning(images.c.spend, images.c.payment_limit, images.c.limit_alerted, images.c.limit_enforced)
+                ).first()
+                if row is None:
+                    continue
+                spend, limit, alerted, was_enforced = row
+                if self._needs_settling(spend, limit, alerted, was_enforced):
+                    raised.extend(self._settle(db, image_id))
+                # The row stays locked until the commit, so the flags now follow spend and limit
+                if (limit or 0.0) > 0 and spend >= limit:
+                    enforced.append(str(image_id))
+            db.commit()
+        finally:
+            db.close()
+        return enforced, raised
+
+    async def apply_deltas(self, deltas: Dict[Any, float]) -> List[str]:
+        """Add incremental spend per image; only those images are re-evaluated. Returns the ones at their limit"""
+        enforced, raised = await asyncio.to_thread(self._store, _database_keys(deltas))
+        self._raise(raised)
+        return enforced
+
+    def limit_changed(self, db: Session, image_id: int):
+        """Re-evaluate an image after its payment limit was updated through `db`"""
+        raised = self._settle(db, image_id)
+        db.commit()
+        self._raise(raised)
+
+    def is_throttled(self, image: DockerImage) -> bool:
+        return bool(image.limit_enforced)
+
+    def blocks_start(self, image: DockerImage) -> bool:
+        """At its limit: the image stays stopped (or throttled) until the limit is raised"""
+        return bool(image.limit_enforced)
+
+    def settle_status(self, image_id: int, status: str) -> str:
+        """Set the status an image settles in after `status` was requested, e.g. by the orchestrator sync (blocking)"""
+        value = status
+        if status == "running" and self.action == "stop":
+            # Read the flag in the same UPDATE, so an enforcement landing meanwhile is not undone
+            value = case((DockerImage.limit_enforced, "stopped"), else_=status)
+        db = SessionLocal()
+        try:
+            # An ORM update, so the cached image lists see the new status; spend and flag updates skip the ORM and leave them cached
+            row = db.execute(
+                update(DockerImage).where(DockerImage.id == image_id).values(status=value).returning(DockerImage.status)
+            ).first()
+            db.commit()
+        finally:
+            db.close()
+        return row.status if row is not None else status
+
+    def _raise(self, raised: List[Tuple[str, Any]]):
+        for kind, row in raised:
+            self._alert(kind, row)
+            if kind == "limit_reached":
+                self._schedule(self._enforce(row))
+
+    def _alert(self, kind: str, row):
+        alert = {
+            "image_id": str(row.id),
+            "user_id": row.user_id,
+            "type": kind,
+            "spend": round(row.spend, 4),
+            "limit": row.payment_limit,
+            "action": self.action if kind == "limit_reached" else None,
+            "timestamp": time.time(),
+        }
+        self.alerts.append(alert)
+        logger.error(
+            f"Payment limit alert [{kind}] image {row.id}: spend {row.spend:.2f} of limit {row.payment_limit:.2f}"
+        )
+
+    def _schedule(self, coro):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None and self._loop is not None and not self._loop.is_closed():
+            # Called from a worker thread (e.g. a mock service in asyncio.to_thread)
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
+            return
+        if loop is None:
+            # No running loop (e.g. a script): only the alert is recorded
+            coro.close()
+            return
+        task = loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _enforce(self, row):
+        image_id = str(row.id)
+        try:
+            if self.action == "throttle":
+                min_replicas = row.min_containers or 1
+                await external_client.scale_containers(image_id, min_replicas)
+                logger.info(f"Payment limit: image {image_id} throttled to {min_replicas} replicas")
+                return
+            await asyncio.to_thread(_set_image_status, image_id, "stopped")
+            await bulk_engine.execute(image_id, "stop", row.user_id or 0, run_async=True)
+            logger.info(f"Payment limit: image {image_id} stopped")
+        except Exception as e:
+            logger.error(f"Payment limit: failed to {self.action} image {image_id}: {e}")
+
+    def get_alerts(self, user_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        alerts = [a for a in reversed(self.alerts) if user_id is None or a["user_id"] == user_id]
+        return alerts[:limit]
+
+    def _on_mock_usage(self, image_id: str, user_id: Any, amount: float):
+        import mock_services
+
+        record = mock_services.billing.billing_data.get(image_id)
+        if record is not None:
+            self._schedule(self._store_totals({image_id: record.total_cost}))
+
+    async def _store_totals(self, totals: Dict[Any, float]):
+        _, raised = await asyncio.to_thread(self._store, _database_keys(totals), True)
+        self._raise(raised)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if USE_MOCKS:
+            import mock_services
+
+            mock_billing = mock_services.billing
+            if self._on_mock_usage not in mock_billing.usage_listeners:
+                mock_billing.subscribe(self._on_mock_usage)
+                # Records generated before we subscribed
+                await self._store_totals({
+                    image_id: record.total_cost for image_id, record in list(mock_billing.billing_data.items())
+                })
+
+
+def _database_keys(values: Dict[Any, float]) -> Dict[int, float]:
+    """Sum the values per database image id; billing keys of mock-only images have no row and no limit"""
+    summed: Dict[int, float] = {}
+    for key, amount in values.items():
+        key = str(key)
+        if key.isdigit():
+            summed[int(key)] = summed.get(int(key), 0.0) + amount
+    return summed
+
+
+def _set_image_status(image_id: str, status: str) -> bool:
+    """Update the image row; False for keys that are not database ids (billing records of mock-only images)"""
+    if not image_id.isdigit():
+        return False
+    db = SessionLocal()
+    try:
+        updated = db.query(DockerImage).filter(DockerImage.id == int(image_id)).update(
+            {DockerImage.status: status}, synchronize_session=False
+        )
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+# Global instance
+payment_enforcer = PaymentLimitEnforcer()
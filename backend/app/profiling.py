@@ -0,0 +1,230 @@
+"""
+On-demand profiling of a running worker (admin only).
+
+- Sampling: a background thread snapshots the Python stacks of the event
+  loop thread (optionally every thread, including the threadpool that runs
+  sync dependencies and to_thread work) every few milliseconds for N seconds.
+  The result comes back as collapsed stacks ("frame;frame;frame count"),
+  which flamegraph.pl, speedscope and most flamegraph viewers read directly,
+  or as a JSON summary of the hottest frames and how busy the loop was.
+- Per request: an admin sending ``X-Profile: cprofile`` (or ``pyinstrument``
+  when that package is installed) on GET /docker/images gets that single
+  call profiled. The report is kept in memory and linked from the
+  ``X-Profile-Report`` response header.
+
+cProfile traces the event loop thread, so other requests interleaving with
+the profiled one at its awaits are counted too; pyinstrument's async mode
+attributes await time to the awaiting coroutine instead.
+
+All of it is off unless PROFILING_ENABLED is set: the endpoints answer 404
+and the X-Profile header is ignored.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Response
+
+from app.logger import logger
+from app.startup import PROFILING_ENABLED
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # optional: cProfile only
+    PyinstrumentProfiler = None
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_REPORTS_KEPT = int(os.getenv("PROFILE_REPORTS_KEPT", "20"))
+PROFILE_HEADER = "x-profile"
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Innermost frames of an idle event loop besides the selector call: with uvloop the loop is C
+# code, so an idle loop thread shows the Python frame that entered it
+LOOP_ENTRY_FRAMES = {"runners.py:Runner.run", "base_events.py:BaseEventLoop.run_until_complete"}
+
+
+def short_path(filename: str) -> str:
+    """Path relative to the backend or site-packages, for readable frame labels"""
+    if filename.startswith(BACKEND_DIR):
+        return os.path.relpath(filename, BACKEND_DIR)
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        return filename[marker + len("site-packages") + 1:]
+    return os.path.basename(filename)
+
+
+def collapse_stack(frame, limit: int = 128) -> str:
+    """'outer;...;inner' frame labels of one stack"""
+    labels = []
+    while frame is not None and len(labels) < limit:
+        code = frame.f_code
+        labels.append(f"{short_path(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def _ensure_enabled():
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+class StackSampler:
+    """Statistical profiler over sys._current_frames(); one capture at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, seconds: float, interval: float, loop_thread: int, all_threads: bool) -> Dict[str, Any]:
+        """Sample for `seconds` (blocking, run it in a worker thread)"""
+        if not self._lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A profile is already being captured")
+        try:
+            me = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == me or (not all_threads and thread_id != loop_thread):
+                        continue
+                    thread = "event-loop" if thread_id == loop_thread else names.get(thread_id, str(thread_id))
+                    stacks[f"{thread};{collapse_stack(frame)}"] += 1
+                samples += 1
+                time.sleep(interval)
+            return {"seconds": seconds, "interval_ms": interval * 1000, "samples": samples, "stacks": stacks}
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(capture: Dict[str, Any]) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in capture["stacks"].most_common())
+
+    @staticmethod
+    def summary(capture: Dict[str, Any], top: int = 25) -> Dict[str, Any]:
+        """Hottest frames by self and total samples, and how busy the event loop was"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        loop_samples = loop_idle = 0
+        for stack, count in capture["stacks"].items():
+            frames = stack.split(";")
+            if frames[0] == "event-loop":
+                loop_samples += count
+                if frames[-1].startswith("selectors.py:") or frames[-1] in LOOP_ENTRY_FRAMES:
+                    loop_idle += count
+            self_counts[frames[-1]] += count
+            for frame in set(frames[1:]):
+                total_counts[frame] += count
+        weight = max(1, sum(capture["stacks"].values()))
+        return {
+            "seconds": capture["seconds"],
+            "interval_ms": capture["interval_ms"],
+            "samples": capture["samples"],
+            "loop_busy_pct": round(100 * (loop_samples - loop_idle) / loop_samples, 1) if loop_samples else None,
+            "top_self": [
+                {"frame": f, "samples": c, "pct": round(100 * c / weight, 1)} for f, c in self_counts.most_common(top)
+            ],
+            "top_total": [
+                {"frame": f, "samples": c, "pct": round(100 * c / weight, 1)} for f, c in total_counts.most_common(top)
+            ],
+        }
+
+    async def capture(self, seconds: float, interval_ms: float, all_threads: bool) -> Dict[str, Any]:
+        _ensure_enabled()
+        seconds = min(seconds, PROFILE_MAX_SECONDS)
+        # Called on the event loop, so this is the thread to watch
+        loop_thread = threading.get_ident()
+        logger.info(f"Profiling: sampling for {seconds}s every {interval_ms}ms (all threads: {all_threads})")
+        return await asyncio.to_thread(self.sample, seconds, interval_ms / 1000, loop_thread, all_threads)
+
+
+class RequestProfiles:
+    """Profiles single requests on demand and keeps the latest reports"""
+
+    def __init__(self):
+        self.reports: "OrderedDict[str, str]" = OrderedDict()
+        self._active = False
+
+    def mode(self, request, user) -> Optional[str]:
+        """Profiler requested with the X-Profile header, or None; only admins may ask"""
+        if not PROFILING_ENABLED:
+            return None
+        requested = request.headers.get(PROFILE_HEADER, "").strip().lower()
+        if not requested or requested in ("0", "false", "off"):
+            return None
+        if not user.is_admin:
+            raise HTTPException(status_code=403, detail="Request profiling is admin only")
+        if requested == "pyinstrument":
+            if PyinstrumentProfiler is None:
+                raise HTTPException(status_code=400, detail="pyinstrument is not installed; use X-Profile: cprofile")
+            return "pyinstrument"
+        if requested in ("1", "true", "on", "cprofile"):
+            return "cprofile"
+        raise HTTPException(status_code=400, detail="X-Profile must be 'cprofile' or 'pyinstrument'")
+
+    def _store(self, report: str) -> str:
+        report_id = uuid.uuid4().hex[:12]
+        self.reports[report_id] = report
+        while len(self.reports) > PROFILE_REPORTS_KEPT:
+            self.reports.popitem(last=False)
+        return report_id
+
+    async def run(self, mode: str, label: str, fn: Callable[[], Awaitable[Response]]) -> Response:
+        """Run `fn` under the profiler and link the report from the response"""
+        # Profilers hook the interpreter globally, so only one runs at a time
+        if self._active:
+            raise HTTPException(status_code=409, detail="Another request is being profiled")
+        self._active = True
+        started = time.perf_counter()
+        try:
+            if mode == "pyinstrument":
+                profiler = PyinstrumentProfiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    response = await fn()
+                finally:
+                    profiler.stop()
+                report = profiler.output_text(unicode=False, color=False)
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = await fn()
+                finally:
+                    profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+                report = out.getvalue()
+        finally:
+            self._active = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        report_id = self._store(f"{label} ({mode}, {elapsed_ms:.1f} ms)\n\n{report}")
+        response.headers["X-Profile-Report"] = f"/health/profile/reports/{report_id}"
+        logger.info(f"Profiling: {label} profiled with {mode} in {elapsed_ms:.1f} ms, report {report_id}")
+        return response
+
+    def get(self, report_id: str) -> Optional[str]:
+        _ensure_enabled()
+        return self.reports.get(report_id)
+
+    def report_ids(self) -> List[str]:
+        return list(self.reports)
+
+
+# Global instances
+stack_sampler = StackSampler()
+request_profiles = RequestProfiles()
@@ -0,0 +1,203 @@
+"""
+Per-user token-bucket rate limiting.
+
+Every authenticated route declares a budget: "expensive" for routes that fan
+out to the downstream services or do heavy work (image list, BI, uploads) and
+"cheap" for everything else. Each (budget, user id) pair gets a bucket that
+refills at RATE tokens per second up to BURST; a request takes one token or
+is rejected with 429 and Retry-After.
+
+Buckets live in process memory by default. With several workers set
+RATE_LIMIT_BACKEND=database so all of them share the rate_limit_buckets
+table (each check is a single conditional UPDATE).
+"""
+
+import asyncio
+import math
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Response, status
+from sqlalchemy import case, insert
+from sqlalchemy.exc import IntegrityError
+
+from app.logger import logger
+from app.auth import get_current_user
+from app.database import SessionLocal
+from app.models import User, RateLimitBucket
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+# Budget name -> (tokens per second, bucket size)
+RATE_LIMIT_BUDGETS = {
+    "expensive": (
+        float(os.getenv("RATE_LIMIT_EXPENSIVE_RATE", "2")),
+        float(os.getenv("RATE_LIMIT_EXPENSIVE_BURST", "20")),
+    ),
+    "cheap": (
+        float(os.getenv("RATE_LIMIT_CHEAP_RATE", "20")),
+        float(os.getenv("RATE_LIMIT_CHEAP_BURST", "100")),
+    ),
+}
+# Idle buckets are swept from memory once there are more than this many
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+# (allowed, tokens left, seconds until a token is available)
+TakeResult = Tuple[bool, float, float]
+
+
+def _refilled(tokens: float, elapsed: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(0.0, elapsed) * rate)
+
+
+class MemoryBucketStore:
+    """Buckets in a dict; exact within one process, independent per worker"""
+
+    name = "memory"
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.buckets: Dict[str, list] = {}
+        self.max_buckets = max_buckets
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> TakeResult:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        tokens = burst if bucket is None else _refilled(bucket[0], now - bucket[1], rate, burst)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        if bucket is None:
+            self.buckets[key] = [tokens, now]
+            if len(self.buckets) > self.max_buckets:
+                self._sweep(now)
+        else:
+            bucket[0], bucket[1] = tokens, now
+        return allowed, tokens, 0.0 if allowed else (cost - tokens) / rate
+
+    def _sweep(self, now: float):
+        # A bucket that has been idle long enough to refill completely is equivalent to no bucket.
+        # Budgets differ per key, so use the slowest refill to stay on the safe side.
+        slowest = min(rate / burst for rate, burst in RATE_LIMIT_BUDGETS.values())
+        full_after = 1.0 / slowest
+        for key in [k for k, (_, updated) in self.buckets.items() if now - updated > full_after]:
+            del self.buckets[key]
+
+    def size(self) -> int:
+        return len(self.buckets)
+
+
+class DatabaseBucketStore:
+    """Buckets in the rate_limit_buckets table, shared by every worker using the database"""
+
+    name = "database"
+
+    def _take(self, key: str, rate: float, burst: float, cost: float) -> TakeResult:
+        db = SessionLocal()
+        try:
+            for _ in range(2):
+                now = time.time()
+                refilled = RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * rate
+                refilled = case((refilled > burst, burst), else_=refilled)
+                taken = (
+                    db.query(RateLimitBucket)
+                    .filter(RateLimitBucket.key == key, refilled >= cost)
+                    .update(
+                        {RateLimitBucket.tokens: refilled - cost, RateLimitBucket.updated_at: now},
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if taken:
+                    row = db.query(RateLimitBucket.tokens).filter(RateLimitBucket.key == key).first()
+                    return True, row.tokens if row else 0.0, 0.0
+
+                row = db.query(RateLimitBucket.tokens, RateLimitBucket.updated_at).filter(RateLimitBucket.key == key).first()
+                if row is not None:
+                    tokens = _refilled(row.tokens, now - row.updated_at, rate, burst)
+                    return False, tokens, (cost - tokens) / rate
+                try:
+                    db.execute(insert(RateLimitBucket).values(key=key, tokens=burst - cost, updated_at=now))
+                    db.commit()
+                    return True, burst - cost, 0.0
+                except IntegrityError:
+                    # Another worker created the bucket first; take from it instead
+                    db.rollback()
+            return False, 0.0, 1.0 / rate
+        finally:
+            db.close()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> TakeResult:
+        return await asyncio.to_thread(self._take, key, rate, burst, cost)
+
+    def size(self) -> Optional[int]:
+        # Not tracked: counting rows would cost a query per metrics scrape
+        return None
+
+
+class RateLimiter:
+    def __init__(self, store=None, budgets: Dict[str, Tuple[float, float]] = None):
+        self.store = store or (DatabaseBucketStore() if RATE_LIMIT_BACKEND == "database" else MemoryBucketStore())
+        self.budgets = budgets or RATE_LIMIT_BUDGETS
+        self.allowed: Dict[str, int] = {name: 0 for name in self.budgets}
+        self.limited: Dict[str, int] = {name: 0 for name in self.budgets}
+        self.store_errors = 0
+
+    async def check(self, user_id: Any, budget: str) -> TakeResult:
+        rate, burst = self.budgets[budget]
+        try:
+            result = await self.store.take(f"{budget}:{user_id}", rate, burst)
+        except Exception as e:
+            # A broken shared store must not take the API down with it: fail open
+            self.store_errors += 1
+            logger.error(f"Rate limit store error ({self.store.name}): {e}")
+            return True, burst, 0.0
+        if result[0]:
+            self.allowed[budget] += 1
+        else:
+            self.limited[budget] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "backend": self.store.name,
+            "buckets": self.store.size(),
+            "store_errors": self.store_errors,
+            "budgets": {
+                name: {
+                    "rate": rate,
+                    "burst": burst,
+                    "allowed": self.allowed[name],
+                    "limited": self.limited[name],
+                }
+                for name, (rate, burst) in self.budgets.items()
+            },
+        }
+
+
+# Global instance
+rate_limiter = RateLimiter()
+
+
+def rate_limit(budget: str):
+    """Route dependency charging one token from the current user's bucket for `budget`"""
+    if budget not in RATE_LIMIT_BUDGETS:
+        raise ValueError(f"Unknown rate limit budget: {budget}")
+
+    async def dependency(response: Response, current_user: User = Depends(get_current_user)):
+        if not RATE_LIMIT_ENABLED:
+            return
+        rate, burst = rate_limiter.budgets[budget]
+        allowed, remaining, retry_after = await rate_limiter.check(current_user.id, budget)
+        headers = {"X-RateLimit-Limit": str(int(burst)), "X-RateLimit-Remaining": str(max(0, int(remaining)))}
+        if not allowed:
+            logger.info(f"Rate limit exceeded: user {current_user.id} budget={budget}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={**headers, "Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+        response.headers.update(headers)
+
+    return dependency
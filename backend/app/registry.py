@@ -0,0 +1,179 @@
+"""
+Service registry heartbeat.
+
+Registers this backend with the platform registry and keeps re-registering it
+every REGISTRY_HEARTBEAT_INTERVAL seconds as a lease renewal, so a registry
+that restarts (or expires us after REGISTRY_LEASE_TTL) picks us up again on
+the next beat. Failures back off exponentially with jitter. Every beat
+carries the current status (UP, DEGRADED or DRAINING) and the load of all
+workers of the instance (app/worker_board.py). The instance deregisters
+itself when it shuts down, but not when serve.py recycles a single worker.
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+from app.logger import logger
+from app.external_services import external_client
+from app.metrics import request_metrics
+from app.admission import admission
+from app.worker_board import worker_board
+
+REGISTRY_ENABLED = os.getenv("REGISTRY_ENABLED", "true").lower() in ("1", "true", "yes")
+REGISTRY_BASE_URL = os.getenv("REGISTRY_BASE_URL", "http://localhost:7000")
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+SERVICE_ID = os.getenv("SERVICE_ID", "ui-1")
+REGISTRY_HEARTBEAT_INTERVAL = float(os.getenv("REGISTRY_HEARTBEAT_INTERVAL", "10"))
+REGISTRY_LEASE_TTL = float(os.getenv("REGISTRY_LEASE_TTL", "30"))
+REGISTRY_REQUEST_TIMEOUT = float(os.getenv("REGISTRY_REQUEST_TIMEOUT", "5"))
+# Backoff after failed beats: REGISTRY_RETRY_DELAY doubling up to REGISTRY_RETRY_MAX_DELAY
+REGISTRY_RETRY_DELAY = float(os.getenv("REGISTRY_RETRY_DELAY", "2"))
+REGISTRY_RETRY_MAX_DELAY = float(os.getenv("REGISTRY_RETRY_MAX_DELAY", "60"))
+# Load above any of these reports the instance as DEGRADED
+REGISTRY_DEGRADED_IN_FLIGHT = int(os.getenv("REGISTRY_DEGRADED_IN_FLIGHT", "200"))
+REGISTRY_DEGRADED_LATENCY_MS = float(os.getenv("REGISTRY_DEGRADED_LATENCY_MS", "2000"))
+REGISTRY_DEGRADED_ERROR_RATE = float(os.getenv("REGISTRY_DEGRADED_ERROR_RATE", "0.2"))
+
+STATUS_UP = "UP"
+STATUS_DEGRADED = "DEGRADED"
+STATUS_DRAINING = "DRAINING"
+
+
+def retry_delay(failures: int) -> float:
+    """Exponential backoff with equal jitter: somewhere between half and all of the capped delay"""
+    delay = min(REGISTRY_RETRY_MAX_DELAY, REGISTRY_RETRY_DELAY * (2 ** max(0, failures - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+class RegistryHeartbeat:
+    def __init__(self, metrics=request_metrics):
+        self.metrics = metrics
+        self.registered = False
+        self.failures = 0
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def draining(self) -> bool:
+        # Drain mode lives in admission control, which is what actually sheds the traffic
+        return admission.draining
+
+    @property
+    def status(self) -> str:
+        if self.draining:
+            return STATUS_DRAINING
+        load = self.metrics
+        if (
+            load.in_flight > REGISTRY_DEGRADED_IN_FLIGHT
+            or load.latency_ms > REGISTRY_DEGRADED_LATENCY_MS
+            or load.error_rate > REGISTRY_DEGRADED_ERROR_RATE
+        ):
+            return STATUS_DEGRADED
+        return STATUS_UP
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "id": SERVICE_ID,
+            "kind": "ui",
+            "url": f"{PUBLIC_BASE_URL}/health",
+            "status": self.status,
+            "lease_ttl": REGISTRY_LEASE_TTL,
+            "load": self.metrics.snapshot(),
+        }
+
+    async def beat(self):
+        """Register (or renew the lease) once; raises on failure"""
+        payload = self.payload()
+        resp = await external_client.get_http_client().post(
+            f"{REGISTRY_BASE_URL}/registry/parts", json=payload, timeout=REGISTRY_REQUEST_TIMEOUT
+        )
+        resp.raise_for_status()
+        if not self.registered or self.failures:
+            logger.info(f"Registered UI service with registry: id={SERVICE_ID} status={payload['status']}")
+        self.registered = True
+        self.failures = 0
+        self.last_success = time.time()
+        self.last_error = None
+
+    async def _loop(self):
+        logger.info(f"Registry heartbeat started (interval={REGISTRY_HEARTBEAT_INTERVAL}s, registry={REGISTRY_BASE_URL})")
+        while True:
+            try:
+                await self.beat()
+                delay = REGISTRY_HEARTBEAT_INTERVAL
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                delay = retry_delay(self.failures)
+                logger.error(f"Registry heartbeat failed (attempt {self.failures}): {e}. Retrying in {delay:.1f}s")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def trigger(self):
+        """Send the next heartbeat now instead of waiting for the interval"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def set_draining(self, draining: bool = True):
+        """Enter or leave drain mode and tell the registry right away"""
+        if self.draining != draining:
+            if draining:
+                admission.start_draining()
+            else:
+                admission.stop_draining()
+            logger.info(f"Registry status changed to {self.status}")
+            self.trigger()
+
+    def start(self):
+        if self._task is None and REGISTRY_ENABLED:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self, deregister: bool = True):
+        """Stop beating and deregister, so the registry stops routing to us immediately"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if not deregister:
+            # The next leader worker renews the lease well within its TTL
+            logger.info(f"Registry heartbeat handed over, staying registered: id={SERVICE_ID}")
+            self.registered = False
+            return
+        if not self.registered:
+            return
+        try:
+            resp = await external_client.get_http_client().delete(
+                f"{REGISTRY_BASE_URL}/registry/parts/{SERVICE_ID}", timeout=REGISTRY_REQUEST_TIMEOUT
+            )
+            resp.raise_for_status()
+            logger.info(f"Deregistered UI service from registry: id={SERVICE_ID}")
+        except Exception as e:
+            logger.error(f"Registry deregistration failed: {e}")
+        self.registered = False
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "id": SERVICE_ID,
+            "enabled": REGISTRY_ENABLED,
+            "status": self.status,
+            "registered": self.registered,
+            "failures": self.failures,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "load": self.metrics.snapshot(),
+            "admission": admission.state(),
+        }
+
+
+# Global instance
+registry_heartbeat = RegistryHeartbeat(metrics=worker_board.load)
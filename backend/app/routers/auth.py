@@ -14,6 +14,7 @@ from app.auth import (
     get_current_active_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from app.rate_limit import rate_limit
 
 router = APIRouter()
 
@@ -105,7 +106,7 @@ async def signin(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
     }
 
-@router.get("/me", response_model=UserResponse)
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(rate_limit("cheap"))])
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
     logger.info(f"GET /auth/me - User info requested for: {current_user.email}")
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+from typing import Dict
+
+from app.logger import logger
+
+from app.models import User
+from app.schemas import UsageDeltaBatch, UsageDeltaResponse, PaymentAlert, PaymentAlertsResponse
+from app.auth import get_current_active_user, get_current_admin_user
+from app.rate_limit import rate_limit
+from app.payment_limits import payment_enforcer
+
+router = APIRouter()
+
+@router.post("/usage", response_model=UsageDeltaResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def ingest_usage(
+    body: UsageDeltaBatch,
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Apply incremental cost deltas reported by the billing service (admin only)"""
+    logger.info(f"POST /billing/usage - {len(body.events)} usage events from admin: {current_user.email}")
+    deltas: Dict[int, float] = {}
+    for event in body.events:
+        deltas[event.image_id] = deltas.get(event.image_id, 0.0) + event.amount
+    enforced = await payment_enforcer.apply_deltas(deltas)
+    return UsageDeltaResponse(applied=len(body.events), enforced_images=sorted(enforced))
+
+@router.get("/alerts", response_model=PaymentAlertsResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def get_payment_alerts(
+    limit: int = Query(100, gt=0, le=1000),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Payment limit alerts (own images, or all images for admins)"""
+    logger.info(f"GET /billing/alerts - Payment alerts requested by user: {current_user.email}")
+    alerts = payment_enforcer.get_alerts(None if current_user.is_admin else current_user.id, limit)
+    return PaymentAlertsResponse(alerts=[
+        PaymentAlert(**{**alert, "timestamp": datetime.fromtimestamp(alert["timestamp"])}) for alert in alerts
+    ])
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Header, Query, Request, Response
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, load_only
+from typing import Any, Dict, List, Optional
 import os
 import shutil
 from datetime import datetime
@@ -9,10 +10,11 @@ from pathlib import Path
 
 from app.logger import logger
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import User, DockerImage
 from app.schemas import (
     DockerImagesResponse, 
+    UserSummaryResponse,
     DockerImageUpdate, 
     DockerUploadResponse, 
     ScalingType,
@@ -24,9 +26,23 @@ from app.schemas import (
     StopAllContainersResponse,
     UpdateResourcesRequest,
     UpdateResourcesResponse,
+    BulkOperationRequest,
+    BulkOperationResponse,
+    IMAGE_FIELD_GROUPS,
+    BlobUploadResponse,
+    ImageManifest,
+    ImageManifestResult,
+    ImageManifestResponse,
 )
 from app.auth import get_current_active_user, get_current_admin_user
+from app.rate_limit import rate_limit
 from app.external_services import external_client
+from app.conditional import conditional_response, data_versions
+from app.bulk_operations import bulk_engine, BulkOperation
+from app.lifecycle import image_lifecycle
+from app.profiling import request_profiles
+from app.jobs import job_queue
+from app.payment_limits import payment_enforcer
 
 router = APIRouter()
 
@@ -34,7 +50,27 @@ router = APIRouter()
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.post("/upload", response_model=DockerUploadResponse, status_code=status.HTTP_201_CREATED)
+IMAGE_ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz')
+# Largest manifest POST /docker/images/batch accepts
+IMAGE_MANIFEST_MAX_ITEMS = int(os.getenv("IMAGE_MANIFEST_MAX_ITEMS", "1000"))
+
+def _save_upload(upload: UploadFile, user_id: int) -> str:
+    """Store an uploaded archive as uploads/<user id>_<filename>; returns its path"""
+    file_path = os.path.join(UPLOAD_DIR, f"{user_id}_{upload.filename}")
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+    return file_path
+
+def _image_url(file_path: str) -> str:
+    base_url = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+    return f"{base_url}/docker/images/{os.path.basename(file_path)}"
+
+@router.post(
+    "/upload",
+    response_model=DockerUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("expensive"))],
+)
 async def upload_docker_image(
     image: UploadFile = File(...),
     image_name: str = Form(..., alias="imageName"),
@@ -54,7 +90,7 @@ async def upload_docker_image(
     
     # Validate file type (case-insensitive)
     filename_lower = (image.filename or "").lower()
-    if not filename_lower.endswith(('.tar', '.tar.gz', '.tgz')):
+    if not filename_lower.endswith(IMAGE_ARCHIVE_EXTENSIONS):
         logger.error(f"POST /docker/upload - Invalid file type: {image.filename}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -62,9 +98,7 @@ async def upload_docker_image(
         )
     
     # Save file
-    file_path = os.path.join(UPLOAD_DIR, f"{current_user.id}_{image.filename}")
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    file_path = _save_upload(image, current_user.id)
     
     # Create database record
     db_image = DockerImage(
@@ -89,12 +123,17 @@ async def upload_docker_image(
     logger.info(f"POST /docker/upload - Docker image uploaded successfully: {image_name}, ID: {db_image.id}")
     
     # Generate URL for the uploaded image
-    image_filename = os.path.basename(db_image.image_file_path)
-    base_url = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
-    image_url = f"{base_url}/docker/images/{image_filename}"
-    
-    # Do not communicate with orchestrator on upload. Orchestrator integration happens on start/stop.
+    image_url = _image_url(db_image.image_file_path)
     
+    # Archive validation and orchestrator sync run in the background; status moves on from "processing" there
+    job_queue.enqueue(
+        "image.post_process",
+        {"image_id": db_image.id},
+        db=db,
+        image_id=db_image.id,
+        user_id=current_user.id,
+    )
+
     return DockerUploadResponse(
         image_name=db_image.name,
         file_path=db_image.image_file_path,
@@ -109,97 +148,306 @@ async def upload_docker_image(
         description=db_image.description,
     )
 
-@router.get("/images", response_model=DockerImagesResponse)
-async def get_docker_images(
+@router.post(
+    "/blobs",
+    response_model=BlobUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("expensive"))],
+)
+async def upload_image_blob(
+    image: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Upload an image archive without registering it; reference it later from a manifest"""
+    logger.info(f"POST /docker/blobs - Blob upload by user: {current_user.email}, filename: {image.filename}")
+    if not (image.filename or "").lower().endswith(IMAGE_ARCHIVE_EXTENSIONS):
+        logger.error(f"POST /docker/blobs - Invalid file type: {image.filename}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only Docker image files (.tar, .tar.gz, .tgz) are allowed"
+        )
+    file_path = _save_upload(image, current_user.id)
+    return BlobUploadResponse(blob=os.path.basename(file_path), size=os.path.getsize(file_path))
+
+def _validate_manifest(manifest: ImageManifest, current_user: User) -> List[Optional[str]]:
+    """Error message per manifest item (None when the item is valid)"""
+    errors: List[Optional[str]] = []
+    seen_names = set()
+    for item in manifest.images:
+        error = None
+        blob = item.blob
+        if os.path.basename(blob) != blob or blob.startswith("."):
+            error = "Invalid blob reference"
+        elif not blob.lower().endswith(IMAGE_ARCHIVE_EXTENSIONS):
+            error = "Only Docker image files (.tar, .tar.gz, .tgz) are allowed"
+        elif not current_user.is_admin and not blob.startswith(f"{current_user.id}_"):
+            error = "Blob belongs to another user"
+        elif not os.path.isfile(os.path.join(UPLOAD_DIR, blob)):
+            error = "Blob not found; upload it with POST /docker/blobs first"
+        elif item.max_containers and item.min_containers > item.max_containers:
+            error = "minContainers is greater than maxContainers"
+        elif item.image_name in seen_names:
+            error = "Duplicate imageName in manifest"
+        seen_names.add(item.image_name)
+        errors.append(error)
+    return errors
+
+@router.post(
+    "/images/batch",
+    response_model=ImageManifestResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("expensive"))],
+)
+async def register_images(
+    manifest: ImageManifest,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
+):
+    """Register many already-uploaded images in one transaction, with a result per manifest item"""
+    count = len(manifest.images)
+    logger.info(f"POST /docker/images/batch - Registering {count} images for user: {current_user.email}")
+    if count > IMAGE_MANIFEST_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Manifest has {count} items; the limit is {IMAGE_MANIFEST_MAX_ITEMS}")
+
+    errors = _validate_manifest(manifest, current_user)
+    invalid = sum(1 for error in errors if error)
+    if invalid and manifest.atomic:
+        logger.error(f"POST /docker/images/batch - {invalid} of {count} manifest items invalid, nothing registered")
+        results = [
+            ImageManifestResult(index=i, image_name=item.image_name, status="invalid" if error else "skipped", error=error)
+            for i, (item, error) in enumerate(zip(manifest.images, errors))
+        ]
+        raise HTTPException(
+            status_code=422,
+            detail={"message": f"{invalid} manifest items are invalid", "results": [r.model_dump() for r in results]},
+        )
+
+    valid = [(i, item) for i, (item, error) in enumerate(zip(manifest.images, errors)) if not error]
+    rows = [
+        {
+            "user_id": current_user.id,
+            "name": item.image_name,
+            "image_file_path": os.path.join(UPLOAD_DIR, item.blob),
+            "inner_port": item.inner_port,
+            "scaling_type": item.scaling_type,
+            "min_containers": item.min_containers,
+            "max_containers": item.max_containers,
+            "static_containers": item.static_containers,
+            "items_per_container": item.items_per_container,
+            "payment_limit": item.payment_limit,
+            "description": item.description,
+            "status": "processing",
+        }
+        for _, item in valid
+    ]
+    ids: List[int] = []
+    if rows:
+        # One multi-row INSERT ... RETURNING; the post-processing jobs commit in the same transaction
+        ids = list(db.scalars(insert(DockerImage).returning(DockerImage.id, sort_by_parameter_order=True), rows))
+        job_queue.enqueue_many(
+            "image.post_process",
+            [{"payload": {"image_id": image_id}, "image_id": image_id, "user_id": current_user.id} for image_id in ids],
+            db=db,
+        )
+
+    results = [
+        ImageManifestResult(index=i, image_name=item.image_name, status="invalid", error=error)
+        for i, (item, error) in enumerate(zip(manifest.images, errors)) if error
+    ]
+    results += [
+        ImageManifestResult(
+            index=i, image_name=item.image_name, status="created", id=image_id, image_url=_image_url(item.blob),
+        )
+        for (i, item), image_id in zip(valid, ids)
+    ]
+    results.sort(key=lambda r: r.index)
+    logger.info(f"POST /docker/images/batch - Registered {len(ids)} images, {invalid} invalid")
+    return ImageManifestResponse(created=len(ids), failed=invalid, results=results)
+
+# Reported for the selected external columns of an image when a downstream call fails
+EXTERNAL_FALLBACKS = {
+    "containers": {"running_containers": 0, "total_containers": 0},
+    "health": {"healthy_containers": 0, "total_errors": 0},
+    "traffic": {"requests_per_second": 0.0, "total_requests": 0},
+    "billing": {"total_cost": 0.0, "cost_breakdown": {}},
+}
+
+async def _containers_columns(image: DockerImage) -> Dict[str, Any]:
+    instances_data = await external_client.get_container_instances(image.name)
+    instance_list = instances_data.get("instances", [])
+    return {
+        "total_containers": len(instance_list),
+        "running_containers": sum(1 for inst in instance_list if inst.get("status") == "running"),
+    }
+
+async def _health_columns(image: DockerImage) -> Dict[str, Any]:
+    # Fetch health once per image and aggregate
+    health_data = await external_client.get_container_health(str(image.id))
+    containers_health = health_data.get("containers", []) if isinstance(health_data, dict) else []
+    return {
+        "healthy_containers": sum(1 for c in containers_health if isinstance(c, dict) and c.get("status") == "healthy"),
+        "total_errors": len(health_data.get("errors", [])) if isinstance(health_data, dict) else 0,
+    }
+
+async def _traffic_columns(image: DockerImage) -> Dict[str, Any]:
+    traffic_data = await external_client.get_traffic_stats(str(image.id))
+    return {
+        "requests_per_second": traffic_data.get("requests_per_second", 0.0),
+        "total_requests": traffic_data.get("total_requests", 0),
+    }
+
+async def _billing_columns(image: DockerImage) -> Dict[str, Any]:
+    billing_data = await external_client.get_image_costs(str(image.id), str(image.user_id))
+    return {
+        "total_cost": billing_data.get("total_cost", 0.0),
+        "cost_breakdown": billing_data.get("cost_breakdown", {}),
+    }
+
+# The downstream call behind each external column group
+EXTERNAL_COLUMNS = {
+    "containers": _containers_columns,
+    "health": _health_columns,
+    "traffic": _traffic_columns,
+    "billing": _billing_columns,
+}
+
+def parse_field_groups(fields: Optional[str]) -> List[str]:
+    """Selected column groups in canonical order; all of them when `fields` is not given"""
+    if fields is None:
+        return list(IMAGE_FIELD_GROUPS)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - IMAGE_FIELD_GROUPS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field groups: {', '.join(sorted(unknown))}. Valid groups: {', '.join(IMAGE_FIELD_GROUPS)}",
+        )
+    return [name for name in IMAGE_FIELD_GROUPS if name == "core" or name in requested]
+
+@router.get("/images", response_model=DockerImagesResponse, dependencies=[Depends(rate_limit("expensive"))])
+async def get_docker_images(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated column groups: core, containers, health, traffic, billing, owner (default: all)"
+    ),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
 ):
     logger.info(f"GET /docker/images - Docker images requested by user: {current_user.email}")
-    
+    groups = parse_field_groups(fields)
+    profile = request_profiles.mode(request, current_user)
+    # A profiled call always rebuilds, so the report shows the real work rather than a cache hit
+    version = None if profile else _images_version(groups)
+
+    def respond():
+        return conditional_response(
+            request, response, f"images:{current_user.id}:{','.join(groups)}", version,
+            lambda: _build_docker_images(current_user, db, groups),
+            DockerImagesResponse,
+            exclude_unset=True,
+        )
+
+    if profile:
+        return await request_profiles.run(profile, "GET /docker/images", respond)
+    return await respond()
+
+def _images_version(groups: List[str]):
+    """Version token of an image list; None, so it is rebuilt every time, when part of it is unversioned"""
+    if not any(group in EXTERNAL_FALLBACKS for group in groups):
+        return data_versions.get("images")
+    external_version = external_client.data_version()
+    if external_version is None:
+        return None
+    return data_versions.get("images"), external_version
+
+async def _build_docker_images(current_user: User, db: Session, groups: List[str]) -> DockerImagesResponse:
+    # Only the listed columns, which ix_docker_images_user_list covers for the per-user list
+    query = db.query(DockerImage).options(load_only(
+        DockerImage.id, DockerImage.user_id, DockerImage.name, DockerImage.inner_port,
+        DockerImage.payment_limit, DockerImage.items_per_container, DockerImage.status,
+    ))
     if current_user.is_admin:
-        images = db.query(DockerImage).all()
+        images = query.order_by(DockerImage.id).all()
         logger.info(f"GET /docker/images - Admin user requested all images, count: {len(images)}")
     else:
         images = (
-            db.query(DockerImage)
+            query
             .filter(DockerImage.user_id == current_user.id)
+            .order_by(DockerImage.id)
             .all()
         )
         logger.info(f"GET /docker/images - Regular user requested their images, count: {len(images)}")
 
+    # Owner emails in one query instead of one per image
+    emails = {}
+    if "owner" in groups and images:
+        try:
+            owner_ids = {image.user_id for image in images}
+            emails = dict(db.query(User.id, User.email).filter(User.id.in_(owner_ids)).all())
+        except Exception as e:
+            logger.error(f"GET /docker/images - Error fetching owner emails: {e}")
+
     items: List[DockerImageListItem] = []
 
     for image in images:
-        try:
-            instances_data = await external_client.get_container_instances(image.name)
-            instance_list = instances_data.get("instances", [])
-            total_containers = len(instance_list)
-            running_containers = sum(1 for inst in instance_list if inst.get("status") == "running")
-
-            # Fetch health once per image and aggregate
-            health_data = await external_client.get_container_health(str(image.id))
-            containers_health = health_data.get("containers", []) if isinstance(health_data, dict) else []
-            healthy_containers = sum(
-                1 for c in containers_health if isinstance(c, dict) and c.get("status") == "healthy"
-            )
-            total_errors = len(health_data.get("errors", [])) if isinstance(health_data, dict) else 0
-
-            traffic_data = await external_client.get_traffic_stats(str(image.id))
-            requests_per_second = traffic_data.get("requests_per_second", 0.0)
-            total_requests = traffic_data.get("total_requests", 0)
-
-            billing_data = await external_client.get_image_costs(str(image.id))
-            total_cost = billing_data.get("total_cost", 0.0)
-            cost_breakdown = billing_data.get("cost_breakdown", {})
-            current_payment = billing_data.get("current_payment", total_cost)  # if needed
-        except Exception as e:
-            logger.error(f"GET /docker/images - Error fetching external data for image {image.id}: {e}")
-            running_containers = 0
-            total_containers = 0
-            healthy_containers = 0
-            total_errors = 0
-            requests_per_second = 0.0
-            total_requests = 0
-            total_cost = 0.0
-            current_payment = 0.0
-            cost_breakdown = {}
-
-        # User email (for admin)
-        user_email = None
-        try:
-            u = db.query(User).filter(User.id == image.user_id).first()
-            user_email = u.email if u else None
-        except Exception as e:
-            logger.error(f"GET /docker/images - Error fetching user email for image {image.id}: {e}")
-            pass
-
-        items.append(DockerImageListItem(
-            id=image.id,
-            user_id=image.user_id,
-            user_email=user_email,
-            image_name=image.name,
-            image_tag="latest",
-            internal_port=image.inner_port,              # mapping from inner_port
-            running_containers=running_containers,
-            total_containers=total_containers,
-            requests_per_second=requests_per_second,
-            total_requests=total_requests,
-            total_cost=total_cost,
-            cost_breakdown=cost_breakdown,
-            healthy_containers=healthy_containers,
-            total_errors=total_errors,
-            payment_limit=image.payment_limit,
-            items_per_container=image.items_per_container,
-            status=image.status,
-        ))
+        values = {
+            "id": image.id,
+            "user_id": image.user_id,
+            "image_name": image.name,
+            "image_tag": "latest",
+            "internal_port": image.inner_port,              # mapping from inner_port
+            "payment_limit": image.payment_limit,
+            "items_per_container": image.items_per_container,
+            "status": image.status,
+        }
+        if "owner" in groups:
+            values["user_email"] = emails.get(image.user_id)
+
+        # Only call the services whose data was asked for; a failing one only blanks its own columns
+        for group in groups:
+            fetch = EXTERNAL_COLUMNS.get(group)
+            if fetch is None:
+                continue
+            try:
+                values.update(await fetch(image))
+            except Exception as e:
+                logger.error(f"GET /docker/images - Error fetching {group} data for image {image.id}: {e}")
+                values.update(EXTERNAL_FALLBACKS[group])
+
+        items.append(DockerImageListItem(**values))
 
     logger.info(f"GET /docker/images - Successfully returned {len(items)} images")
     return DockerImagesResponse(images=items)
 
+@router.get("/summary", response_model=UserSummaryResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def get_user_summary(
+    user_id: Optional[int] = Query(None, description="Another user's totals (admin only)"),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Billing totals over all of a user's images, without loading the image list"""
+    logger.info(f"GET /docker/summary - Summary requested by user: {current_user.email}")
+    target_id = current_user.id if user_id is None else user_id
+    if target_id != current_user.id and not current_user.is_admin:
+        logger.error(f"GET /docker/summary - Unauthorized summary request for user {target_id} by: {current_user.email}")
+        raise HTTPException(status_code=403, detail="Not authorized to view this user's summary")
+
+    summary = await external_client.get_user_billing_summary(str(target_id))
+    return UserSummaryResponse(
+        user_id=target_id,
+        total_cost=summary.get("total_cost", 0.0),
+        total_containers=summary.get("total_containers", 0),
+        total_requests=summary.get("total_requests", 0),
+        images_count=summary.get("images_count", 0),
+        billing_period=summary.get("billing_period", "monthly"),
+        last_updated=summary.get("last_updated"),
+    )
+
 @router.put(
     "/images/{image_id}/restrictions",
     response_model=ImageRestrictionsResponse,
     status_code=status.HTTP_200_OK,
+    dependencies=[Depends(rate_limit("cheap"))],
 )
 async def update_image_restrictions(
     image_id: int,
@@ -236,6 +484,7 @@ async def update_image_restrictions(
     db.refresh(image)
 
     logger.info(f"PUT /docker/images/{image_id}/restrictions - Image restrictions updated successfully")
+    payment_enforcer.limit_changed(db, image.id)
 
     # Return response according to the contract you requested (camelCase in JSON)
     return ImageRestrictionsResponse(
@@ -247,10 +496,23 @@ async def update_image_restrictions(
         updated_at=image.updated_at,  # if exists in column; otherwise will leave None
     )
 
-@router.post("/images/{image_id}/start", response_model=StartContainersResponse)
+def _ensure_within_payment_limit(image: DockerImage):
+    if payment_enforcer.blocks_start(image):
+        logger.error(f"Image {image.id} start refused: payment limit of {image.payment_limit} reached")
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Payment limit reached; raise the image's payment limit to start it again",
+        )
+
+@router.post(
+    "/images/{image_id}/start",
+    response_model=StartContainersResponse,
+    dependencies=[Depends(rate_limit("cheap"))],
+)
 async def start_image_containers(
     image_id: int,
     body: StartContainersRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -259,6 +521,16 @@ async def start_image_containers(
         raise HTTPException(status_code=404, detail="Image not found")
     if not current_user.is_admin and image.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to start containers for this image")
+    _ensure_within_payment_limit(image)
+    # Repeated or concurrent starts for this image join the pending one instead of reaching the orchestrator again
+    return await image_lifecycle.run(
+        image_id, "start", current_user.id,
+        lambda: _start_containers(image, body),
+        idempotency_key=idempotency_key,
+    )
+
+async def _start_containers(image: DockerImage, body: StartContainersRequest) -> StartContainersResponse:
+    image_id = image.id
     try:
         # Build orchestrator StartBody payload based on our stored upload metadata
         base_url = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
@@ -295,9 +567,14 @@ async def start_image_containers(
         logger.error(f"Failed to start containers for image {image_id}: {e}")
         raise
 
-@router.post("/images/{image_id}/stop", response_model=StopAllContainersResponse)
+@router.post(
+    "/images/{image_id}/stop",
+    response_model=StopAllContainersResponse,
+    dependencies=[Depends(rate_limit("cheap"))],
+)
 async def stop_all_image_containers(
     image_id: int,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -306,27 +583,26 @@ async def stop_all_image_containers(
         raise HTTPException(status_code=404, detail="Image not found")
     if not current_user.is_admin and image.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to stop containers for this image")
-    try:
-        # In mocks we don't have a single call to stop all; iterate instances
-        instances_data = await external_client.get_container_instances(str(image_id))
-        instance_list = instances_data.get("instances", []) if isinstance(instances_data, dict) else []
-        stopped: list[str] = []
-        for inst in instance_list:
-            inst_id = inst.get("id")
-            if not inst_id:
-                continue
-            resp = await external_client.stop_container(str(image_id), inst_id)
-            if resp.get("stopped"):
-                stopped.append(inst_id)
+    return await image_lifecycle.run(
+        image_id, "stop", current_user.id,
+        lambda: _stop_containers(image_id, current_user.id),
+        idempotency_key=idempotency_key,
+    )
 
-        # Optionally notify orchestrator of desired state stop using the same body with count=0 if needed
-        # (depends on orchestrator API semantics; keeping instance-level stops for now)
-        return StopAllContainersResponse(stopped=stopped)
+async def _stop_containers(image_id: int, user_id: int) -> StopAllContainersResponse:
+    try:
+        # No single orchestrator call stops everything; fan out over instances in parallel
+        op = await bulk_engine.execute(str(image_id), "stop", user_id, run_async=False)
+        return StopAllContainersResponse(stopped=op.succeeded)
     except Exception as e:
         logger.error(f"Failed to stop containers for image {image_id}: {e}")
         raise
 
-@router.put("/images/{image_id}/resources", response_model=UpdateResourcesResponse)
+@router.put(
+    "/images/{image_id}/resources",
+    response_model=UpdateResourcesResponse,
+    dependencies=[Depends(rate_limit("cheap"))],
+)
 async def update_image_resources(
     image_id: int,
     body: UpdateResourcesRequest,
@@ -352,6 +628,65 @@ async def update_image_resources(
         logger.error(f"Failed to update resources for image {image_id}: {e}")
         raise
 
+def _bulk_operation_response(op: BulkOperation) -> BulkOperationResponse:
+    data = op.to_dict()
+    data["created_at"] = datetime.fromtimestamp(op.created_at)
+    data["finished_at"] = datetime.fromtimestamp(op.finished_at) if op.finished_at else None
+    return BulkOperationResponse(**data)
+
+@router.post(
+    "/images/{image_id}/bulk",
+    response_model=BulkOperationResponse,
+    dependencies=[Depends(rate_limit("cheap"))],
+)
+async def bulk_image_operation(
+    image_id: int,
+    body: BulkOperationRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Start, stop or resize every container instance of an image"""
+    logger.info(f"POST /docker/images/{image_id}/bulk - {body.action} requested by user: {current_user.email}")
+    image: DockerImage | None = db.query(DockerImage).filter(DockerImage.id == image_id).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not current_user.is_admin and image.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to manage containers for this image")
+    if body.action == "start":
+        _ensure_within_payment_limit(image)
+
+    resources: dict | None = None
+    if body.action == "resources":
+        resources = body.resources.model_dump(exclude_none=True) if body.resources else {}
+        if not resources:
+            raise HTTPException(status_code=400, detail="Nothing to update")
+
+    op = await bulk_engine.execute(
+        str(image_id), body.action, current_user.id,
+        resources=resources, idempotency_key=idempotency_key, run_async=body.run_async,
+    )
+    if op.status in ("pending", "running"):
+        response.status_code = status.HTTP_202_ACCEPTED
+    return _bulk_operation_response(op)
+
+@router.get(
+    "/operations/{operation_id}",
+    response_model=BulkOperationResponse,
+    dependencies=[Depends(rate_limit("cheap"))],
+)
+async def get_bulk_operation(
+    operation_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """Poll the progress of a bulk operation"""
+    op = bulk_engine.get_operation(operation_id, db)
+    if not op or (not current_user.is_admin and op.user_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return _bulk_operation_response(op)
+
 @router.get("/images/{filename}")
 async def get_image_file(filename: str):
     """Serve uploaded Docker image files with basic path traversal protection"""
@@ -1,25 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse
+from typing import List, Literal
 from sqlalchemy.orm import Session
 
 from app.logger import logger
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models import User
-from app.schemas import SystemHealth, BIMetrics, SystemComponent
+from app.schemas import SystemHealth, BIMetrics, SystemComponent, StartupProfileResponse
 from app.auth import get_current_admin_user
+from app.rate_limit import rate_limit
 from app.external_services import external_client
+from app.conditional import conditional_response
+from app.startup import startup_profiler
+from app.profiling import stack_sampler, request_profiles
+from app.loop_monitor import loop_monitor, LOOP_BLOCK_EVENTS_KEPT
 
 router = APIRouter()
 
-@router.get("/system", response_model=SystemHealth)
+@router.get("/system", response_model=SystemHealth, dependencies=[Depends(rate_limit("expensive"))])
 async def get_system_health(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get system health status (admin only)"""
     logger.info(f"GET /health/system - System health requested by admin: {current_user.email}")
-    
+    return await conditional_response(
+        request, response, "health:system", external_client.data_version(), _build_system_health, SystemHealth
+    )
+
+async def _build_system_health() -> SystemHealth:
     components = []
     
     try:
@@ -59,14 +71,20 @@ async def get_system_health(
     logger.info(f"GET /health/system - Successfully returned system health with {len(components)} components")
     return SystemHealth(components=components)
 
-@router.get("/bi", response_model=BIMetrics)
+@router.get("/bi", response_model=BIMetrics, dependencies=[Depends(rate_limit("expensive"))])
 async def get_bi_metrics(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get business intelligence metrics (admin only)"""
     logger.info(f"GET /health/bi - BI metrics requested by admin: {current_user.email}")
-    
+    return await conditional_response(
+        request, response, "health:bi", external_client.data_version(), _build_bi_metrics, BIMetrics
+    )
+
+async def _build_bi_metrics() -> BIMetrics:
     try:
         # Get revenue analytics from billing service
         revenue_data = await external_client.get_revenue_analytics()
@@ -94,3 +112,48 @@ async def get_bi_metrics(
             total_containers=28,
             average_load=67.3
         )
+
+@router.get("/startup", response_model=StartupProfileResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def get_startup_profile(current_user: User = Depends(get_current_admin_user)):
+    """Get how long each startup step of this worker took (admin only)"""
+    logger.info(f"GET /health/startup - Startup profile requested by admin: {current_user.email}")
+    if not startup_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return startup_profiler.report()
+
+@router.get("/loop-blocks", dependencies=[Depends(rate_limit("cheap"))])
+async def get_loop_blocks(
+    limit: int = Query(10, gt=0, le=LOOP_BLOCK_EVENTS_KEPT),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Latest event loop blocks of this worker with their task names and stacks (admin only)"""
+    logger.info(f"GET /health/loop-blocks - Loop blocks requested by admin: {current_user.email}")
+    return {"blocks": loop_monitor.recent_blocks(limit)}
+
+@router.get("/profile", dependencies=[Depends(rate_limit("expensive"))])
+async def sample_profile(
+    seconds: float = Query(10, gt=0, description="How long to sample (capped by PROFILE_MAX_SECONDS)"),
+    interval_ms: float = Query(5, ge=1, le=1000, description="Time between samples"),
+    threads: Literal["loop", "all"] = Query("loop", description="Event loop thread only, or every thread"),
+    format: Literal["collapsed", "json"] = Query("collapsed", description="Collapsed stacks for flamegraph tools, or a summary"),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Sample this worker's stacks for a while and return collapsed stacks or the hottest frames (admin only)"""
+    logger.info(f"GET /health/profile - {seconds}s profile requested by admin: {current_user.email}")
+    capture = await stack_sampler.capture(seconds, interval_ms, all_threads=threads == "all")
+    if format == "json":
+        return stack_sampler.summary(capture)
+    return PlainTextResponse(stack_sampler.collapsed(capture))
+
+@router.get("/profile/reports", dependencies=[Depends(rate_limit("cheap"))])
+async def list_profile_reports(current_user: User = Depends(get_current_admin_user)):
+    """Ids of the kept per-request profile reports, oldest first (admin only)"""
+    return {"reports": request_profiles.report_ids()}
+
+@router.get("/profile/reports/{report_id}", response_class=PlainTextResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def get_profile_report(report_id: str, current_user: User = Depends(get_current_admin_user)):
+    """A per-request profile report (X-Profile header) as text (admin only)"""
+    report = request_profiles.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile report not found")
+    return PlainTextResponse(report)
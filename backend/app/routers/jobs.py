@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import json
+
+from app.logger import logger
+
+from app.database import get_read_db
+from app.models import User, Job
+from app.schemas import JobResponse, JobListResponse
+from app.auth import get_current_active_user
+from app.rate_limit import rate_limit
+
+router = APIRouter()
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        priority=job.priority,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        image_id=job.image_id,
+        reference=job.reference,
+        result=json.loads(job.result) if job.result else None,
+        last_error=job.last_error,
+        run_at=job.run_at,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+@router.get("", response_model=JobListResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def list_jobs(
+    status: Optional[str] = Query(None, description="Filter by job status"),
+    image_id: Optional[int] = Query(None, description="Filter by image"),
+    limit: int = Query(50, gt=0, le=500),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """List background jobs (own jobs, or all jobs for admins)"""
+    logger.info(f"GET /jobs - Jobs requested by user: {current_user.email}")
+    query = db.query(Job)
+    if not current_user.is_admin:
+        query = query.filter(Job.user_id == current_user.id)
+    if status:
+        query = query.filter(Job.status == status)
+    if image_id is not None:
+        query = query.filter(Job.image_id == image_id)
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return JobListResponse(jobs=[_job_response(job) for job in jobs])
+
+@router.get("/{job_id}", response_model=JobResponse, dependencies=[Depends(rate_limit("cheap"))])
+async def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """Get the status of a background job"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job or (not current_user.is_admin and job.user_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
@@ -1,8 +1,9 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List, Literal, Dict
+from typing import Optional, List, Literal, Dict, Any, Tuple
 from datetime import datetime
 
 ScalingType = Literal["minimal", "maximal", "static"]
+ImageStatus = Literal["processing", "ready", "failed", "starting", "running", "stopping", "stopped", "error"]
 
 # User schemas
 class UserBase(BaseModel):
@@ -86,6 +87,17 @@ class DockerImageUpdate(BaseModel):
 
     model_config = ConfigDict(populate_by_name=True)
 
+# Column groups of DockerImageListItem selectable with GET /docker/images?fields=...
+# ("core" is always included; every other group costs one external call per image)
+IMAGE_FIELD_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "core": ("id", "user_id", "image_name", "image_tag", "internal_port", "payment_limit", "items_per_container", "status"),
+    "containers": ("running_containers", "total_containers"),
+    "health": ("healthy_containers", "total_errors"),
+    "traffic": ("requests_per_second", "total_requests"),
+    "billing": ("total_cost", "cost_breakdown"),
+    "owner": ("user_email",),
+}
+
 class DockerImageListItem(BaseModel):
     id: int
     user_id: int
@@ -93,21 +105,31 @@ class DockerImageListItem(BaseModel):
     image_name: str
     image_tag: str = Field(default="latest")
     internal_port: int               # Note: internal_port (mapping from inner_port)
-    running_containers: int
-    total_containers: int
-    requests_per_second: float
-    total_requests: int
-    total_cost: float
-    cost_breakdown: Dict[str, float]
-    healthy_containers: int
-    total_errors: int
+    # Optional so sparse responses can leave out unselected groups
+    running_containers: Optional[int] = None
+    total_containers: Optional[int] = None
+    requests_per_second: Optional[float] = None
+    total_requests: Optional[int] = None
+    total_cost: Optional[float] = None
+    cost_breakdown: Optional[Dict[str, float]] = None
+    healthy_containers: Optional[int] = None
+    total_errors: Optional[int] = None
     payment_limit: float
     items_per_container: int
-    status: Literal["processing", "ready", "failed"]
+    status: ImageStatus
 
 class DockerImagesResponse(BaseModel):
     images: List[DockerImageListItem]
 
+class UserSummaryResponse(BaseModel):
+    user_id: int
+    total_cost: float
+    total_containers: int
+    total_requests: int
+    images_count: int
+    billing_period: str = "monthly"
+    last_updated: Optional[datetime] = None
+
 class ImageRestrictionsUpdate(BaseModel):
     # Accepts both camelCase from UI
     items_per_container: Optional[int] = Field(
@@ -125,7 +147,7 @@ class ImageRestrictionsResponse(BaseModel):
     # Return camelCase in JSON, keep snake_case in code/DB
     items_per_container: int = Field(..., serialization_alias="itemRestrictions")
     payment_limit: float = Field(..., serialization_alias="paymentLimit")
-    status: Literal["processing", "ready", "failed"]
+    status: ImageStatus
     updated_at: Optional[datetime] = Field(None, serialization_alias="updatedAt")
 
     # To allow returning from ORM object if you want
@@ -184,4 +206,127 @@ class UpdateResourcesRequest(BaseModel):
     memory_limit: Optional[str] = Field(None, description="Memory limit (e.g., '512Mi', '1Gi')")
 
 class UpdateResourcesResponse(BaseModel):
-    updated: List[str] = Field(description="List of updated container IDs")
\ No newline at end of file
+    updated: List[str] = Field(description="List of updated container IDs")
+
+# Bulk operation schemas
+class BulkOperationRequest(BaseModel):
+    action: Literal["start", "stop", "resources"]
+    resources: Optional[UpdateResourcesRequest] = Field(None, description="Required for the 'resources' action")
+    run_async: Optional[bool] = Field(
+        None, alias="async",
+        description="Run as a background operation to poll; defaults to async for large fleets",
+    )
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class InstanceOperationResult(BaseModel):
+    instance_id: str
+    ok: bool
+    error: Optional[str] = None
+
+class BulkOperationResponse(BaseModel):
+    operation_id: str
+    image_id: str
+    action: str
+    status: Literal["pending", "running", "completed", "failed"]
+    total: int
+    succeeded: int
+    failed: int
+    results: List[InstanceOperationResult]
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    job_id: Optional[int] = Field(None, description="Background job running this operation, poll /jobs/{job_id}")
+
+# Bulk image registration schemas
+class BlobUploadResponse(BaseModel):
+    blob: str = Field(..., description="Reference to use as `blob` in a registration manifest")
+    size: int
+
+class ImageManifestItem(BaseModel):
+    # Same camelCase names as the multipart upload form
+    image_name: str = Field(..., alias="imageName", min_length=1, max_length=255)
+    blob: str = Field(..., description="Blob returned by POST /docker/blobs")
+    inner_port: int = Field(..., alias="innerPort", gt=0, le=65535)
+    scaling_type: ScalingType = Field(..., alias="scalingType")
+    min_containers: int = Field(0, alias="minContainers", ge=0)
+    max_containers: int = Field(0, alias="maxContainers", ge=0)
+    static_containers: int = Field(0, alias="staticContainers", ge=0)
+    items_per_container: int = Field(..., alias="itemsPerContainer", gt=0)
+    payment_limit: float = Field(..., alias="paymentLimit", ge=0)
+    description: Optional[str] = None
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class ImageManifest(BaseModel):
+    images: List[ImageManifestItem] = Field(..., min_length=1)
+    atomic: bool = Field(True, description="Register nothing unless every item is valid")
+
+class ImageManifestResult(BaseModel):
+    index: int
+    image_name: str
+    status: Literal["created", "invalid", "skipped"]
+    id: Optional[int] = None
+    image_url: Optional[str] = None
+    error: Optional[str] = None
+
+class ImageManifestResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[ImageManifestResult]
+
+# Job queue schemas
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    priority: int
+    attempts: int
+    max_attempts: int
+    image_id: Optional[int] = None
+    reference: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    last_error: Optional[str] = None
+    run_at: datetime
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class JobListResponse(BaseModel):
+    jobs: List[JobResponse]
+
+# Payment limit schemas
+class UsageDelta(BaseModel):
+    image_id: int
+    amount: float = Field(description="Incremental cost since the previous event")
+
+class UsageDeltaBatch(BaseModel):
+    events: List[UsageDelta]
+
+class UsageDeltaResponse(BaseModel):
+    applied: int
+    enforced_images: List[str]
+
+class PaymentAlert(BaseModel):
+    image_id: str
+    user_id: Optional[int] = None
+    type: Literal["threshold_crossed", "limit_reached"]
+    spend: float
+    limit: float
+    action: Optional[str] = None
+    timestamp: datetime
+
+class PaymentAlertsResponse(BaseModel):
+    alerts: List[PaymentAlert]
+
+# Startup profile schemas
+class StartupStep(BaseModel):
+    name: str
+    start_ms: float
+    duration_ms: float
+    ok: bool
+    error: Optional[str] = None
+
+class StartupProfileResponse(BaseModel):
+    started_at: datetime
+    ready_ms: Optional[float] = None
+    steps: List[StartupStep]
@@ -0,0 +1,92 @@
+"""
+Graceful shutdown: drain before the listener closes.
+
+On SIGTERM or SIGINT uvicorn closes its listening socket first, waits for
+the open connections and only then runs the lifespan shutdown, so draining
+there comes too late: by then the registry and the load balancer only see
+refused connections. install() (called from the lifespan startup) wraps
+uvicorn's signal handler instead. The first signal enters drain mode at once
+(new requests get 503 + Retry-After and the registry is told DRAINING right
+away), waits up to DRAIN_TIMEOUT for in-flight requests, uploads included,
+and then hands the signal on to uvicorn. Another signal is handed on at once.
+
+Under serve.py the supervisor passes SIGTERM on to every worker, so each
+worker drains itself. A worker recycled after WEB_MAX_REQUESTS exits without
+a signal and does not drain.
+
+Servers that are not stopped by a signal to a uvicorn process (the test
+client, embedded servers) keep the old order; call POST /registry/drain and
+wait for it before stopping them.
+"""
+
+import asyncio
+import signal
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from uvicorn import Server
+
+from app.logger import logger
+from app.admission import admission
+from app.registry import registry_heartbeat
+
+EXIT_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class GracefulShutdown:
+    def __init__(self, controller=admission, heartbeat=registry_heartbeat):
+        self.controller = controller
+        self.heartbeat = heartbeat
+        # First exit signal received: the instance is stopping, not just this worker being recycled
+        self.exit_signal: Optional[int] = None
+        self._exit_handlers: Dict[int, Callable[[int, Any], None]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stopping(self) -> bool:
+        return self.exit_signal is not None
+
+    def install(self):
+        """Take over the exit signals of the uvicorn server running this loop, if any"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self._loop = asyncio.get_running_loop()
+        self.exit_signal = None
+        for sig in EXIT_SIGNALS:
+            handler = signal.getsignal(sig)
+            if isinstance(getattr(handler, "__self__", None), Server):
+                self._exit_handlers[sig] = handler
+                signal.signal(sig, self._handle)
+        if not self._exit_handlers:
+            logger.info("Shutdown: not running under a uvicorn server, drain with POST /registry/drain before stopping")
+
+    def uninstall(self):
+        for sig, handler in self._exit_handlers.items():
+            if signal.getsignal(sig) == self._handle:
+                signal.signal(sig, handler)
+        self._exit_handlers = {}
+
+    def _handle(self, sig: int, frame):
+        exit_handler = self._exit_handlers[sig]
+        if self.stopping or self._loop is None or self._loop.is_closed():
+            exit_handler(sig, frame)
+            return
+        self.exit_signal = sig
+        # Signal handlers run between bytecodes of the loop thread; start the drain as a task
+        self._loop.call_soon_threadsafe(self._start_drain, exit_handler, sig, frame)
+
+    def _start_drain(self, exit_handler: Callable[[int, Any], None], sig: int, frame):
+        self._task = asyncio.create_task(self._drain_then_exit(exit_handler, sig, frame))
+
+    async def _drain_then_exit(self, exit_handler: Callable[[int, Any], None], sig: int, frame):
+        logger.info(f"Shutdown: {signal.Signals(sig).name} received, draining before the listener closes")
+        try:
+            self.heartbeat.set_draining(True)
+            await self.controller.wait_idle()
+        finally:
+            exit_handler(sig, frame)
+
+
+# Global instance
+graceful_shutdown = GracefulShutdown()
@@ -0,0 +1,82 @@
+"""
+Startup profiling.
+
+Records how long each part of application startup takes (module imports,
+schema creation, admin bootstrap, mock services, background workers) so cold
+start and reload regressions show up in the log and on GET /health/startup.
+Like the rest of the profiling surface (app/profiling.py) it only runs with
+PROFILING_ENABLED; otherwise every step just runs and nothing is recorded.
+"""
+
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, List, Optional
+
+from app.logger import logger
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # Created by the first import in main.py, so "imports" covers everything after it
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.steps: List[Dict[str, Any]] = []
+        self.ready_ms: Optional[float] = None
+
+    def _elapsed_ms(self, at: float) -> float:
+        return round((at - self._origin) * 1000, 2)
+
+    def record(self, name: str, started: float, finished: float, error: Optional[str] = None):
+        if not self.enabled:
+            return
+        self.steps.append({
+            "name": name,
+            "start_ms": self._elapsed_ms(started),
+            "duration_ms": round((finished - started) * 1000, 2),
+            "ok": error is None,
+            "error": error,
+        })
+
+    def checkpoint(self, name: str):
+        """Record a step spanning from profiler creation until now"""
+        self.record(name, self._origin, time.perf_counter())
+
+    @asynccontextmanager
+    async def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(name, started, time.perf_counter(), error=str(e))
+            raise
+        self.record(name, started, time.perf_counter())
+
+    async def run(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        if not self.enabled:
+            return await awaitable
+        async with self.step(name):
+            return await awaitable
+
+    def mark_ready(self):
+        if not self.enabled:
+            return
+        self.ready_ms = self._elapsed_ms(time.perf_counter())
+        logger.info(
+            f"Startup complete in {self.ready_ms:.0f} ms: "
+            + ", ".join(f"{s['name']}={s['duration_ms']:.0f}ms{'' if s['ok'] else ' (failed)'}" for s in self.steps)
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "ready_ms": self.ready_ms,
+            "steps": sorted(self.steps, key=lambda s: s["start_ms"]),
+        }
+
+
+# Global instance
+startup_profiler = StartupProfiler(PROFILING_ENABLED)
@@ -0,0 +1,172 @@
+"""
+State shared between the worker processes of one instance.
+
+serve.py runs several uvicorn workers of main:app that otherwise share only
+the listening socket. Through WORKER_STATE_DIR (set by serve.py and emptied
+before the workers start) every worker, each WORKER_SYNC_INTERVAL seconds:
+
+- writes its request load to <pid>.json and reads the others', so the
+  leader's registry heartbeat reports the load of the whole instance rather
+  than its own share of it;
+- follows the instance drain flag: POST /registry/drain and /registry/resume
+  reach a single worker, which sets or clears the flag, and the other
+  workers follow within one interval.
+
+Files of workers that stopped syncing (recycled or crashed) are ignored
+after WORKER_STALE_INTERVALS intervals. Without WORKER_STATE_DIR (plain
+`uvicorn main:app`, tests) the process is the whole instance.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.logger import logger
+from app.metrics import RequestMetrics, request_metrics
+
+# Set by serve.py for its workers
+WORKER_STATE_DIR = os.getenv("WORKER_STATE_DIR", "")
+WORKER_SYNC_INTERVAL = float(os.getenv("WORKER_SYNC_INTERVAL", "1"))
+WORKER_STALE_INTERVALS = 5
+
+DRAIN_FLAG = "draining"
+
+
+class InstanceLoad:
+    """Request load of every worker of the instance, read like RequestMetrics"""
+
+    def __init__(self, metrics: RequestMetrics = request_metrics):
+        self.metrics = metrics
+        # Latest snapshots of the other workers
+        self.others: List[Dict[str, Any]] = []
+
+    @property
+    def in_flight(self) -> int:
+        return self.metrics.in_flight + sum(s["in_flight"] for s in self.others)
+
+    def _mean(self, own: float, field: str) -> float:
+        """Per-worker moving averages, weighted by each worker's request count"""
+        pairs = [(own, self.metrics.total)] + [(s[field], s["requests_total"]) for s in self.others]
+        weight = sum(count for _, count in pairs)
+        if not weight:
+            return own
+        return sum(value * count for value, count in pairs) / weight
+
+    @property
+    def latency_ms(self) -> float:
+        return self._mean(self.metrics.latency_ms, "latency_ms_avg")
+
+    @property
+    def error_rate(self) -> float:
+        return self._mean(self.metrics.error_rate, "error_rate_avg")
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshots = [self.metrics.snapshot()] + self.others
+        return {
+            "in_flight": self.in_flight,
+            "requests_total": sum(s["requests_total"] for s in snapshots),
+            "errors_total": sum(s["errors_total"] for s in snapshots),
+            "latency_ms_avg": round(self.latency_ms, 2),
+            "error_rate_avg": round(self.error_rate, 4),
+            "uptime_seconds": max(s["uptime_seconds"] for s in snapshots),
+            "workers": len(snapshots),
+        }
+
+
+class WorkerBoard:
+    def __init__(self, directory: str = WORKER_STATE_DIR, interval: float = WORKER_SYNC_INTERVAL,
+                 metrics: RequestMetrics = request_metrics, worker_id: Optional[str] = None):
+        self.directory = directory
+        self.worker_id = worker_id or str(os.getpid())
+        self.interval = interval
+        self.load = InstanceLoad(metrics)
+        # The instance drain flag as this worker last saw it
+        self.drain_flag = False
+        self._on_drain: Optional[Callable[[bool], None]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def shared(self) -> bool:
+        """Whether other workers serve the same instance"""
+        return bool(self.directory)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def publish_drain(self, draining: bool):
+        """Set or clear the drain flag the other workers follow"""
+        if not self.shared:
+            return
+        if draining:
+            open(self._path(DRAIN_FLAG), "a").close()
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._path(DRAIN_FLAG))
+        self.drain_flag = draining
+
+    def sync(self) -> bool:
+        """Write this worker's load and read the others'; returns the drain flag (blocking)"""
+        own = f"{self.worker_id}.json"
+        partial = self._path(f".{own}.tmp")
+        with open(partial, "w") as f:
+            json.dump(self.load.metrics.snapshot(), f)
+        os.replace(partial, self._path(own))
+
+        cutoff = time.time() - WORKER_STALE_INTERVALS * self.interval
+        others = []
+        for entry in os.scandir(self.directory):
+            if entry.name == own or not entry.name.endswith(".json"):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    continue
+                with open(entry.path) as f:
+                    others.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed by its worker in the meantime
+                continue
+        self.load.others = others
+        return os.path.exists(self._path(DRAIN_FLAG))
+
+    async def _loop(self):
+        while True:
+            try:
+                drain_flag = await asyncio.to_thread(self.sync)
+                if drain_flag != self.drain_flag:
+                    self.drain_flag = drain_flag
+                    logger.info(f"Worker {self.worker_id}: instance {'draining' if drain_flag else 'resumed'}")
+                    self._on_drain(drain_flag)
+            except Exception as e:
+                logger.error(f"Worker state sync failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, on_drain: Callable[[bool], None]):
+        """Sync with the other workers; on_drain(flag) is called when the drain flag changes"""
+        if self._task is None and self.shared:
+            self._on_drain = on_drain
+            self.drain_flag = False
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self.load.others = []
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(f"{self.worker_id}.json"))
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "shared": self.shared,
+            "workers": 1 + len(self.load.others),
+            "drain_flag": self.drain_flag,
+        }
+
+
+# Global instance
+worker_board = WorkerBoard()
@@ -0,0 +1 @@
+# Benchmarks and simulation harnesses (run from backend/, e.g. python -m benchmarks.autoscaler_simulation)
@@ -0,0 +1,382 @@
+"""
+Backend API load/benchmark suite.
+
+Boots main:app in-process (through httpx's ASGI transport, lifespan included)
+against SQLite or a local Postgres and the mock services, seeds a
+deterministic fleet (fleet_generator.py), and drives scenarios at a
+controlled concurrency. Reports throughput, p50/p95/p99 latency, error counts,
+Python allocations and event loop lag and blocks, and can save the results as
+a baseline to compare later runs against.
+
+    python -m benchmarks.api_bench --images 500 --concurrency 32 --requests 2000
+    python -m benchmarks.api_bench --scenarios image_list signin_burst --save-baseline
+    python -m benchmarks.api_bench --compare            # exits 1 on regressions
+    python -m benchmarks.api_bench --mocks http          # mocks served by mock_server.py
+    python -m benchmarks.api_bench --url http://localhost:8000   # an already running server
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fleet_generator import FLEET_PASSWORD, fleet_prefix, generate_fleet
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "baselines")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Requests replayed (concurrently) under tracemalloc to measure allocations
+ALLOCATION_SAMPLES = 20
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def tiny_image_archive() -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        info = tarfile.TarInfo("manifest.json")
+        data = b"[]"
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class BenchContext:
+    """Shared state the scenarios draw from"""
+
+    def __init__(self, client, admin_token: str, user_tokens: List[str], user_emails: List[str],
+                 image_ids: List[int], seed: int):
+        self.client = client
+        self.admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        self.user_headers = [{"Authorization": f"Bearer {t}"} for t in user_tokens]
+        self.user_emails = user_emails
+        self.image_ids = image_ids
+        self.rng = random.Random(seed)
+        self.archive = tiny_image_archive()
+        self.upload_seq = 0
+
+
+async def scenario_image_list(ctx: BenchContext):
+    return await ctx.client.get("/docker/images", headers=ctx.admin_headers)
+
+
+async def scenario_image_list_core(ctx: BenchContext):
+    # Names-and-status view: DB only, no external calls
+    return await ctx.client.get("/docker/images", headers=ctx.admin_headers, params={"fields": "core"})
+
+
+async def scenario_signin_burst(ctx: BenchContext):
+    email = ctx.rng.choice(ctx.user_emails)
+    return await ctx.client.post("/auth/signin", json={"email": email, "password": FLEET_PASSWORD})
+
+
+async def scenario_upload(ctx: BenchContext):
+    ctx.upload_seq += 1
+    return await ctx.client.post(
+        "/docker/upload",
+        headers=ctx.rng.choice(ctx.user_headers),
+        files={"image": (f"bench-{ctx.upload_seq}.tar", ctx.archive, "application/x-tar")},
+        data={
+            "imageName": f"bench-upload-{ctx.upload_seq}",
+            "innerPort": "8080",
+            "scalingType": "minimal",
+            "minContainers": "1",
+            "maxContainers": "3",
+            "itemsPerContainer": "100",
+            "paymentLimit": "1000000",
+        },
+    )
+
+
+async def scenario_health_poll(ctx: BenchContext):
+    path = "/health/system" if ctx.rng.random() < 0.5 else "/health/bi"
+    return await ctx.client.get(path, headers=ctx.admin_headers)
+
+
+async def scenario_start_stop_storm(ctx: BenchContext):
+    image_id = ctx.rng.choice(ctx.image_ids)
+    if ctx.rng.random() < 0.5:
+        return await ctx.client.post(f"/docker/images/{image_id}/start", headers=ctx.admin_headers, json={"count": 1})
+    return await ctx.client.post(f"/docker/images/{image_id}/stop", headers=ctx.admin_headers)
+
+
+SCENARIOS: Dict[str, Callable[[BenchContext], Awaitable[Any]]] = {
+    "image_list": scenario_image_list,
+    "image_list_core": scenario_image_list_core,
+    "signin_burst": scenario_signin_burst,
+    "upload": scenario_upload,
+    "health_poll": scenario_health_poll,
+    "start_stop_storm": scenario_start_stop_storm,
+}
+
+
+async def run_scenario(name: str, ctx: BenchContext, concurrency: int, total: int, warmup: int,
+                       track_allocations: bool) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    for _ in range(warmup):
+        await scenario(ctx)
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await scenario(ctx)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+            except Exception as e:
+                latencies.append(time.perf_counter() - started)
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+
+    # tracemalloc slows everything down, so allocations get their own short pass
+    alloc_current = alloc_peak = 0
+    alloc_samples = min(ALLOCATION_SAMPLES, total) if track_allocations else 0
+    if alloc_samples:
+        tracemalloc.start()
+        await asyncio.gather(*(scenario(ctx) for _ in range(alloc_samples)), return_exceptions=True)
+        alloc_current, alloc_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "alloc_peak_kb": round(alloc_peak / 1024, 1),
+        "alloc_retained_kb": round(alloc_current / 1024, 1),
+        "alloc_peak_kb_per_request": round(alloc_peak / 1024 / alloc_samples, 1) if alloc_samples else 0.0,
+    }
+
+
+async def run_suite(args) -> Dict[str, Any]:
+    import httpx
+
+    mock_proc = None
+    seeded = None
+    if args.mocks == "http" and not args.url:
+        from app.migrations import upgrade
+
+        await asyncio.to_thread(upgrade)
+        # The mock server process rebuilds its side of the fleet from these rows
+        seeded = await asyncio.to_thread(
+            generate_fleet, args.seed, args.users, args.images, args.containers, with_mocks=False
+        )
+        mock_proc = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, "mock_server.py"),
+             "--fleet-seed", str(args.seed), "--fleet-containers", str(args.containers)],
+            cwd=BACKEND_DIR,
+        )
+        await asyncio.sleep(2.0)
+
+    try:
+        if args.url:
+            transport = None
+            base_url = args.url
+            app = None
+        else:
+            import main  # noqa: E402  (env must be configured first)
+
+            from app.loop_monitor import loop_monitor
+
+            app = main.app
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://bench"
+
+        if seeded is None:
+            if app is not None:
+                from app.migrations import upgrade
+
+                await asyncio.to_thread(upgrade)
+            seeded = await asyncio.to_thread(
+                generate_fleet, args.seed, args.users, args.images, args.containers, with_mocks=app is not None
+            )
+        seeded["emails"] = [f"{fleet_prefix(args.seed)}user-{i}@example.com" for i in range(args.users)]
+
+        async def body(client):
+            r = await client.post("/auth/signin", json={"email": args.admin_email, "password": args.admin_password})
+            r.raise_for_status()
+            admin_token = r.json()["access_token"]
+            user_tokens = []
+            for email in seeded["emails"][: min(10, len(seeded["emails"]))]:
+                r = await client.post("/auth/signin", json={"email": email, "password": FLEET_PASSWORD})
+                r.raise_for_status()
+                user_tokens.append(r.json()["access_token"])
+            ctx = BenchContext(client, admin_token, user_tokens, seeded["emails"], seeded["image_ids"], args.seed)
+            results = []
+            for name in args.scenarios:
+                if app is not None:
+                    loop_monitor.start_window()
+                result = await run_scenario(
+                    name, ctx, args.concurrency, args.requests, args.warmup, track_allocations=app is not None
+                )
+                if app is not None:
+                    result.update(loop_monitor.end_window())
+                results.append(result)
+                print(format_row(result), flush=True)
+            return results
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+            if app is not None:
+                async with app.router.lifespan_context(app):
+                    results = await body(client)
+            else:
+                results = await body(client)
+    finally:
+        if mock_proc:
+            mock_proc.terminate()
+            mock_proc.wait(timeout=10)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "external" if args.url else os.environ.get("DATABASE_URL"),
+            "mocks": args.mocks,
+            "images": args.images,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+HEADER = (
+    f"{'scenario':<18} {'reqs':>6} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+    f"{'alloc peak KB':>13} {'errors':>8} {'lag p99 ms':>10} {'blocks':>7}"
+)
+
+
+def format_row(r: Dict[str, Any]) -> str:
+    errors = sum(r["errors"].values())
+    # Event loop columns are only known when main:app runs in-process
+    lag = f"{r['loop_lag_p99_ms']:>10.2f}" if "loop_lag_p99_ms" in r else f"{'-':>10}"
+    blocks = f"{r['loop_blocks']:>7}" if "loop_blocks" in r else f"{'-':>7}"
+    return (
+        f"{r['scenario']:<18} {r['requests']:>6} {r['concurrency']:>5} {r['throughput_rps']:>9.1f} "
+        f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['alloc_peak_kb']:>13.1f} {errors:>8} "
+        f"{lag} {blocks}"
+    )
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenarios whose p95 or throughput regressed by more than the tolerance"""
+    regressions = []
+    base = {r["scenario"]: r for r in baseline.get("results", [])}
+    for r in current["results"]:
+        b = base.get(r["scenario"])
+        if not b:
+            continue
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}: p95 {b['p95_ms']:.2f} -> {r['p95_ms']:.2f} ms")
+        if b["throughput_rps"] and r["throughput_rps"] < b["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}: throughput {b['throughput_rps']:.1f} -> {r['throughput_rps']:.1f} rps")
+        if r.get("loop_blocks", 0) > b.get("loop_blocks", 0):
+            regressions.append(f"{r['scenario']}: event loop blocks {b.get('loop_blocks', 0)} -> {r['loop_blocks']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--images", type=int, default=200, help="Images to seed")
+    parser.add_argument("--users", type=int, default=20, help="Users to seed")
+    parser.add_argument("--containers", type=int, default=600, help="Mock containers to seed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh SQLite file in a temp dir")
+    parser.add_argument("--mocks", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", default=None, help="Benchmark an already running server instead of booting main:app")
+    parser.add_argument("--admin-email", default="admin@gmail.com")
+    parser.add_argument("--admin-password", default="admin")
+    parser.add_argument("--name", default="baseline", help="Baseline name to save/compare")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    # Run inside a scratch directory so uploads/ and logs/ do not land in the source tree
+    workdir = tempfile.mkdtemp(prefix="api-bench-")
+    os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ["USE_MOCK_SERVICES"] = "false" if args.mocks == "http" else "true"
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "bench.log"))
+    os.environ.setdefault("AUTOSCALER_ENABLED", "false")
+    os.environ.setdefault("REGISTRY_ENABLED", "false")
+    # The suite drives far more traffic per user than the per-user budgets allow
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+
+    print(HEADER)
+    print("-" * len(HEADER))
+    report = asyncio.run(run_suite(args))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(result_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {result_path}")
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.name}.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+    if args.compare:
+        if not os.path.exists(baseline_path):
+            print(f"No baseline at {baseline_path}; run with --save-baseline first")
+            sys.exit(2)
+        with open(baseline_path) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
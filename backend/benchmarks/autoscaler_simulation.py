@@ -0,0 +1,198 @@
+"""
+Autoscaler simulation harness.
+
+Drives app.autoscaler.Autoscaler against in-process MockOrchestrator and
+MockLoadBalancer instances on a simulated clock, feeding synthetic traffic
+profiles, and reports how quickly replicas converge on the ideal count and
+how much they oscillate.
+
+    python -m benchmarks.autoscaler_simulation --duration 3600 --seed 7
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from mock_services import MockLoadBalancer, MockOrchestrator  # noqa: E402
+from app.autoscaler import Autoscaler  # noqa: E402
+
+
+class SimImage:
+    def __init__(self, image_id: int, scaling_type: str, min_containers: int, max_containers: int,
+                 items_per_container: int, static_containers: int = 0):
+        self.id = image_id
+        self.scaling_type = scaling_type
+        self.min_containers = min_containers
+        self.max_containers = max_containers
+        self.static_containers = static_containers
+        self.items_per_container = items_per_container
+
+
+class MockClient:
+    """Adapter exposing the ExternalServiceClient calls the autoscaler uses over local mocks"""
+
+    def __init__(self, orchestrator: MockOrchestrator, load_balancer: MockLoadBalancer):
+        self.orchestrator = orchestrator
+        self.load_balancer = load_balancer
+        self.scale_calls = 0
+
+    async def get_traffic_stats(self, image_id: str) -> Dict[str, Any]:
+        return self.load_balancer.traffic_data.get(image_id, {"requests_per_second": 0.0})
+
+    async def get_container_instances(self, image_id: str) -> Dict[str, Any]:
+        return {"instances": self.orchestrator.get_containers_by_image(image_id)}
+
+    async def scale_containers(self, image_id: str, target_count: int) -> Dict[str, Any]:
+        self.scale_calls += 1
+        return {"changed": self.orchestrator.scale_containers(image_id, target_count)}
+
+
+def step_profile(t: float) -> float:
+    if t < 600:
+        return 100
+    if t < 1800:
+        return 800
+    return 200
+
+
+def ramp_profile(t: float) -> float:
+    return 50 + min(t, 1800) / 1800 * 950
+
+
+def sine_profile(t: float) -> float:
+    return 450 + 350 * math.sin(2 * math.pi * t / 1200)
+
+
+def spike_profile(t: float) -> float:
+    return 1200 if 900 <= t < 1020 else 150
+
+
+PROFILES: Dict[str, Callable[[float], float]] = {
+    "step": step_profile,
+    "ramp": ramp_profile,
+    "sine": sine_profile,
+    "spike": spike_profile,
+}
+
+
+def simulate(profile_name: str, image: SimImage, duration: float, tick: float, noise: float, seed: int,
+             autoscaler_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    profile = PROFILES[profile_name]
+    orchestrator = MockOrchestrator()
+    load_balancer = MockLoadBalancer()
+    client = MockClient(orchestrator, load_balancer)
+    clock = {"now": 0.0}
+    scaler = Autoscaler(client=client, clock=lambda: clock["now"], **autoscaler_kwargs)
+    key = str(image.id)
+    orchestrator.scale_containers(key, image.min_containers or 1)
+
+    replicas: List[int] = []
+    ideals: List[int] = []
+    directions: List[int] = []
+    under_provisioned = 0.0
+
+    async def run():
+        nonlocal under_provisioned
+        t = 0.0
+        while t < duration:
+            clock["now"] = t
+            base = profile(t)
+            rps = max(0.0, base * (1 + rng.uniform(-noise, noise)))
+            load_balancer.traffic_data[key] = {"requests_per_second": rps}
+            before = len(orchestrator.get_containers_by_image(key))
+            await scaler.reconcile_image(image)
+            after = len(orchestrator.get_containers_by_image(key))
+            if after != before:
+                directions.append(1 if after > before else -1)
+            if after * image.items_per_container < rps:
+                under_provisioned += tick
+            replicas.append(after)
+            ideals.append(scaler.desired_replicas(image, base))
+            t += tick
+
+    asyncio.run(run())
+
+    # Convergence: after each change of the ideal count, time until replicas settle within
+    # the hysteresis band [ideal_down, ideal] and stay there until the next change
+    convergence: List[float] = []
+    change_points = [0] + [i for i in range(1, len(ideals)) if ideals[i] != ideals[i - 1]]
+    for n, start in enumerate(change_points):
+        end = change_points[n + 1] if n + 1 < len(change_points) else len(ideals)
+        settled_at = None
+        for i in range(start, end):
+            low = scaler.desired_replicas(image, profile(i * tick), utilization=1.0 - scaler.hysteresis)
+            in_band = min(low, ideals[i]) <= replicas[i] <= max(low, ideals[i])
+            if in_band and settled_at is None:
+                settled_at = i
+            elif not in_band:
+                settled_at = None
+        if settled_at is not None:
+            convergence.append((settled_at - start) * tick)
+
+    reversals = sum(1 for a, b in zip(directions, directions[1:]) if a != b)
+    return {
+        "profile": profile_name,
+        "scaling_type": image.scaling_type,
+        "scale_events": client.scale_calls,
+        "direction_reversals": reversals,
+        "mean_convergence_s": round(sum(convergence) / len(convergence), 1) if convergence else None,
+        "max_convergence_s": max(convergence) if convergence else None,
+        "unsettled_segments": len(change_points) - len(convergence),
+        "under_provisioned_s": under_provisioned,
+        "final_replicas": replicas[-1] if replicas else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3600)
+    parser.add_argument("--tick", type=float, default=15, help="Autoscaler interval in simulated seconds")
+    parser.add_argument("--noise", type=float, default=0.15, help="Relative traffic noise (0.15 = +/-15%%)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--hysteresis", type=float, default=None)
+    parser.add_argument("--scale-up-cooldown", type=float, default=None)
+    parser.add_argument("--scale-down-cooldown", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    autoscaler_kwargs = {"interval": args.tick}
+    if args.hysteresis is not None:
+        autoscaler_kwargs["hysteresis"] = args.hysteresis
+    if args.scale_up_cooldown is not None:
+        autoscaler_kwargs["scale_up_cooldown"] = args.scale_up_cooldown
+    if args.scale_down_cooldown is not None:
+        autoscaler_kwargs["scale_down_cooldown"] = args.scale_down_cooldown
+
+    images = [
+        SimImage(1001, "minimal", 1, 20, 100),
+        SimImage(1002, "maximal", 2, 30, 100),
+    ]
+    results = [
+        simulate(name, image, args.duration, args.tick, args.noise, args.seed, autoscaler_kwargs)
+        for name in PROFILES
+        for image in images
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    header = f"{'profile':<8} {'type':<8} {'events':>6} {'reversals':>9} {'conv mean':>9} {'conv max':>8} {'unsettled':>9} {'under s':>8} {'final':>5}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['profile']:<8} {r['scaling_type']:<8} {r['scale_events']:>6} {r['direction_reversals']:>9} "
+            f"{str(r['mean_convergence_s']):>9} {str(r['max_convergence_s']):>8} {r['unsettled_segments']:>9} "
+            f"{r['under_provisioned_s']:>8.0f} {r['final_replicas']:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
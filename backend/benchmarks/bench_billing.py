@@ -0,0 +1,61 @@
+"""
+Benchmark: scalar vs vectorized MockBilling cost calculation.
+
+    python -m benchmarks.bench_billing --sizes 1000 10000 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from mock_services import MockBilling
+
+
+def make_columns(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return {
+        "duration_hours": rng.uniform(1, 720, n),
+        "cpu_usage": rng.uniform(0, 100, n),
+        "memory_gb": rng.choice([0.25, 0.5, 1.0, 2.0, 4.0], n),
+        "storage_gb": rng.choice([5.0, 10.0, 20.0, 50.0], n),
+        "requests": rng.integers(0, 1_000_000, n),
+    }
+
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    billing = MockBilling()
+    print(f"{'containers':>10} {'scalar ms':>10} {'batch ms':>9} {'speedup':>8} {'max abs diff':>12}")
+    for n in args.sizes:
+        cols = make_columns(n, args.seed)
+        rows = list(zip(*(cols[k].tolist() for k in ("duration_hours", "cpu_usage", "memory_gb", "storage_gb", "requests"))))
+
+        scalar_s, scalar = best_of(args.repeat, lambda: [
+            billing.calculate_container_cost("c", d, c, m, s, r) for d, c, m, s, r in rows
+        ])
+        batch_s, batch = best_of(args.repeat, lambda: billing.calculate_container_costs_batch(
+            cols["duration_hours"], cols["cpu_usage"], cols["memory_gb"], cols["storage_gb"], cols["requests"]
+        ))
+        # Both paths round to 4 decimals; allow one unit of rounding disagreement
+        diff = float(np.max(np.abs(np.asarray(scalar) - batch))) if n else 0.0
+        print(f"{n:>10} {scalar_s * 1000:>10.2f} {batch_s * 1000:>9.2f} {scalar_s / batch_s:>7.1f}x {diff:>12.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: registering N images one multipart upload at a time vs. blob
+uploads plus a single manifest (POST /docker/images/batch).
+
+Boots main:app in-process against a scratch SQLite database and reports
+wall time, images per second and database commits for each path. Background
+job workers are off so only the registration work is measured.
+
+    python -m benchmarks.bench_bulk_register --sizes 100 500 1000 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tiny_archive() -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        info = tarfile.TarInfo("manifest.json")
+        info.size = 2
+        tar.addfile(info, io.BytesIO(b"[]"))
+    return buf.getvalue()
+
+
+FORM = {
+    "innerPort": "8080",
+    "scalingType": "minimal",
+    "minContainers": "1",
+    "maxContainers": "3",
+    "itemsPerContainer": "100",
+    "paymentLimit": "1000",
+}
+
+
+async def gather_bounded(concurrency: int, coros):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(bounded(c) for c in coros))
+
+
+async def timed(engine, fn):
+    from sqlalchemy import event
+
+    commits = 0
+
+    def on_commit(conn):
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine, "commit", on_commit)
+    started = time.perf_counter()
+    try:
+        await fn()
+    finally:
+        event.remove(engine, "commit", on_commit)
+    return time.perf_counter() - started, commits
+
+
+async def run(args):
+    import httpx
+    import main
+    from app.database import engine
+
+    archive = tiny_archive()
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            r = await client.post("/auth/signin", json={"email": "admin@gmail.com", "password": "admin"})
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            print(f"{'images':>7} {'path':<18} {'seconds':>8} {'images/s':>9} {'commits':>8}")
+            for run_no, n in enumerate(args.sizes):
+                prefix = f"r{run_no}"
+
+                async def one_by_one():
+                    async def upload(i):
+                        resp = await client.post(
+                            "/docker/upload", headers=headers,
+                            files={"image": (f"{prefix}-single-{i}.tar", archive, "application/x-tar")},
+                            data={**FORM, "imageName": f"{prefix}-single-{i}"},
+                        )
+                        resp.raise_for_status()
+                    await gather_bounded(args.concurrency, (upload(i) for i in range(n)))
+
+                blobs = []
+
+                async def upload_blobs():
+                    async def upload(i):
+                        resp = await client.post(
+                            "/docker/blobs", headers=headers,
+                            files={"image": (f"{prefix}-batch-{i}.tar", archive, "application/x-tar")},
+                        )
+                        resp.raise_for_status()
+                        return resp.json()["blob"]
+                    blobs.extend(await gather_bounded(args.concurrency, (upload(i) for i in range(n))))
+
+                async def register_manifest():
+                    manifest = {"images": [
+                        {**FORM, "imageName": f"{prefix}-batch-{i}", "blob": blob} for i, blob in enumerate(blobs)
+                    ]}
+                    resp = await client.post("/docker/images/batch", headers=headers, json=manifest)
+                    resp.raise_for_status()
+                    assert resp.json()["created"] == n
+
+                for label, fn in (("upload x N", one_by_one), ("blobs x N", upload_blobs), ("manifest x 1", register_manifest)):
+                    seconds, commits = await timed(engine, fn)
+                    print(f"{n:>7} {label:<18} {seconds:>8.3f} {n / seconds:>9.0f} {commits:>8}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    # Scratch directory, so uploads/ and logs/ stay out of the source tree
+    workdir = tempfile.mkdtemp(prefix="bulk-register-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "bench.log"))
+    os.environ.setdefault("JOB_WORKERS", "0")
+    os.environ.setdefault("AUTOSCALER_ENABLED", "false")
+    os.environ.setdefault("REGISTRY_ENABLED", "false")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("IMAGE_MANIFEST_MAX_ITEMS", str(max(args.sizes)))
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
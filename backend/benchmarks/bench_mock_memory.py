@@ -0,0 +1,251 @@
+"""
+Benchmark: memory per record of the mock orchestrator, service discovery and
+billing state at load-test scale.
+
+Builds the records through the mocks' public methods under tracemalloc and
+reports bytes per container (orchestrator record with its health and
+resources, and the indexes), per service discovery entry and per billing
+record, plus the time to build them and to read them back.
+
+The same records are built first with the dict-based representation the
+mocks used before (a dict per container health, resources and billing
+record, ISO timestamp strings, parallel health/resource dicts, no interning),
+kept below as the Dict* classes, so every run compares the two.
+
+    python -m benchmarks.bench_mock_memory --containers 100000 --images 10000
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from mock_services import MockBilling, MockOrchestrator, MockServiceDiscovery, _index_add
+
+
+# Baseline: the dict-based representation, reduced to what this benchmark calls
+
+@dataclass(slots=True)
+class DictRegisteredContainer:
+    image_id: str
+    endpoint: str
+    status: str
+    registered_at: str
+    last_updated: Optional[str] = None
+
+
+class DictServiceDiscovery:
+    def __init__(self, seed: Optional[int] = None):
+        self.customer_containers: Dict[str, DictRegisteredContainer] = {}
+        self.containers_by_image: Dict[str, Dict[str, None]] = {}
+        self.containers_by_status: Dict[str, Dict[str, None]] = {}
+
+    def register_container(self, container_id: str, image_id: str, endpoint: str, status: str = "healthy"):
+        self.customer_containers[container_id] = DictRegisteredContainer(
+            image_id=image_id, endpoint=endpoint, status=status, registered_at=datetime.now().isoformat(),
+        )
+        _index_add(self.containers_by_image, image_id, container_id)
+        _index_add(self.containers_by_status, status, container_id)
+
+
+@dataclass(slots=True)
+class DictContainerRecord:
+    id: str
+    image_id: str
+    status: str
+    resources: Dict[str, Any]
+    health: Dict[str, Any]
+    created_at: str
+    endpoint: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "image_id": self.image_id, "status": self.status, "resources": self.resources,
+            "health": self.health, "created_at": self.created_at, "endpoint": self.endpoint,
+        }
+
+
+class DictOrchestrator:
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.containers: Dict[str, DictContainerRecord] = {}
+        self.container_health: Dict[str, Dict[str, Any]] = {}
+        self.resource_limits: Dict[str, Dict[str, Any]] = {}
+        self.containers_by_image: Dict[str, Dict[str, None]] = {}
+        self.containers_by_status: Dict[str, Dict[str, None]] = {}
+
+    def create_container(self, image_id: str, resources: Dict[str, Any] = None) -> Dict[str, Any]:
+        container_id = str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+        default_resources = {"cpu_limit": "1.0", "memory_limit": "512MB", "disk_limit": "10GB"}
+        if resources:
+            default_resources.update(resources)
+        record = DictContainerRecord(
+            id=container_id,
+            image_id=image_id,
+            status="running",
+            resources=default_resources,
+            health={
+                "cpu_usage": self.rng.uniform(10, 80),
+                "memory_usage": self.rng.uniform(20, 90),
+                "disk_usage": self.rng.uniform(5, 60),
+                "status": "healthy",
+            },
+            created_at=datetime.now().isoformat(),
+            endpoint=f"http://localhost:{self.rng.randint(9000, 9999)}",
+        )
+        self.containers[record.id] = record
+        self.container_health[record.id] = record.health
+        self.resource_limits[record.id] = record.resources
+        _index_add(self.containers_by_image, record.image_id, record.id)
+        _index_add(self.containers_by_status, record.status, record.id)
+        return record.to_dict()
+
+    def get_container_health(self, container_id: str) -> Dict[str, Any]:
+        health = self.container_health[container_id]
+        health["cpu_usage"] = max(0, min(100, health["cpu_usage"] + self.rng.uniform(-5, 5)))
+        health["memory_usage"] = max(0, min(100, health["memory_usage"] + self.rng.uniform(-3, 3)))
+        health["disk_usage"] = max(0, min(100, health["disk_usage"] + self.rng.uniform(-1, 1)))
+        if health["cpu_usage"] > 90 or health["memory_usage"] > 95:
+            health["status"] = "critical"
+        elif health["cpu_usage"] > 80 or health["memory_usage"] > 85:
+            health["status"] = "warning"
+        else:
+            health["status"] = "healthy"
+        return health
+
+    def get_containers_by_image(self, image_id: str) -> List[Dict[str, Any]]:
+        return [self.containers[container_id].to_dict() for container_id in self.containers_by_image.get(image_id, {})]
+
+
+class DictBilling:
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.billing_data: Dict[str, Dict[str, Any]] = {}
+
+    def get_image_billing(self, image_id: str, user_id: str) -> Dict[str, Any]:
+        if image_id not in self.billing_data:
+            self.billing_data[image_id] = {
+                "image_id": image_id,
+                "user_id": user_id,
+                "total_cost": round(self.rng.uniform(5, 500), 2),
+                "containers_count": self.rng.randint(1, 5),
+                "total_hours": self.rng.uniform(10, 720),
+                "total_requests": self.rng.randint(1000, 100000),
+                "cost_breakdown": {
+                    "cpu": round(self.rng.uniform(1, 100), 2),
+                    "memory": round(self.rng.uniform(1, 50), 2),
+                    "storage": round(self.rng.uniform(1, 25), 2),
+                    "requests": round(self.rng.uniform(0.1, 10), 2),
+                },
+                "billing_period": "monthly",
+                "avg_cpu_usage": round(self.rng.uniform(10, 80), 2),
+                "memory_gb": self.rng.choice([0.25, 0.5, 1.0, 2.0]),
+                "storage_gb": self.rng.choice([5.0, 10.0, 20.0]),
+                "last_updated": datetime.now().isoformat(),
+            }
+        return self.billing_data[image_id]
+
+
+BASELINE = ("dict", DictOrchestrator, DictServiceDiscovery, DictBilling)
+CURRENT = ("slots", MockOrchestrator, MockServiceDiscovery, MockBilling)
+
+
+def measure(build):
+    """(result, bytes allocated and still held, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, held, elapsed
+
+
+def run(representation, image_of: List[str], owner_of: Dict[str, str], seed: int):
+    """Build and read back the three mocks in one representation; prints one block of results"""
+    label, orchestrator_cls, discovery_cls, billing_cls = representation
+
+    def build_orchestrator():
+        orchestrator = orchestrator_cls(seed=seed)
+        for image_id in image_of:
+            orchestrator.create_container(image_id)
+        return orchestrator
+
+    orchestrator, orch_bytes, orch_s = measure(build_orchestrator)
+    rows = [
+        (c["id"], c["image_id"], c["endpoint"])
+        for image_id in owner_of for c in orchestrator.get_containers_by_image(image_id)
+    ]
+
+    def build_discovery():
+        discovery = discovery_cls(seed=seed)
+        for container_id, image_id, endpoint in rows:
+            discovery.register_container(container_id, image_id, endpoint)
+        return discovery
+
+    discovery, sd_bytes, sd_s = measure(build_discovery)
+
+    def build_billing():
+        billing = billing_cls(seed=seed)
+        for image_id, user_id in owner_of.items():
+            billing.get_image_billing(image_id, user_id)
+        return billing
+
+    billing, billing_bytes, billing_s = measure(build_billing)
+
+    started = time.perf_counter()
+    for container_id, _, _ in rows[:10_000]:
+        orchestrator.get_container_health(container_id)
+    health_s = time.perf_counter() - started
+    started = time.perf_counter()
+    listed = sum(len(orchestrator.get_containers_by_image(image_id)) for image_id in list(owner_of)[:1_000])
+    list_s = time.perf_counter() - started
+
+    containers = len(image_of)
+    print(f"[{label}]")
+    print(f"orchestrator: {containers} containers, {orch_bytes / containers:.0f} B/container, "
+          f"{orch_bytes / 2**20:.1f} MiB, built in {orch_s:.2f}s")
+    print(f"discovery:    {containers} entries, {sd_bytes / containers:.0f} B/entry, "
+          f"{sd_bytes / 2**20:.1f} MiB, built in {sd_s:.2f}s")
+    print(f"billing:      {len(owner_of)} records, {billing_bytes / len(owner_of):.0f} B/record, "
+          f"{billing_bytes / 2**20:.1f} MiB, built in {billing_s:.2f}s")
+    reads = f"reads: 10000 health checks {health_s * 1000:.1f} ms, 1000 image listings ({listed} rows) {list_s * 1000:.1f} ms"
+    if hasattr(billing, "get_system_bi_data"):
+        started = time.perf_counter()
+        billing.get_system_bi_data()
+        reads += f", BI summary {(time.perf_counter() - started) * 1000:.1f} ms"
+    print(reads)
+    return {"orchestrator": orch_bytes / containers, "discovery": sd_bytes / containers,
+            "billing": billing_bytes / len(owner_of)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--containers", type=int, default=100_000)
+    parser.add_argument("--images", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # A separate string per container, as ids parsed from requests and JSON payloads are
+    image_of = [str(rng.randrange(args.images)) for _ in range(args.containers)]
+    owner_of = {str(i): str(rng.randrange(args.users)) for i in range(args.images)}
+
+    baseline = run(BASELINE, image_of, owner_of, args.seed)
+    current = run(CURRENT, image_of, owner_of, args.seed)
+    print("bytes per record, dict -> slots: " + ", ".join(
+        f"{name} {baseline[name]:.0f} -> {current[name]:.0f} ({current[name] / baseline[name]:.0%})" for name in current
+    ))
+
+
+if __name__ == "__main__":
+    main()
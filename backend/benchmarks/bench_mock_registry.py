@@ -0,0 +1,57 @@
+"""
+Benchmark: per-image lookups in MockOrchestrator / MockServiceDiscovery at fleet scale.
+
+    python -m benchmarks.bench_mock_registry --containers 50000 --images 5000
+"""
+
+import argparse
+import random
+import time
+
+from mock_services import MockOrchestrator, MockServiceDiscovery
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--containers", type=int, default=50_000)
+    parser.add_argument("--images", type=int, default=5_000)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    orchestrator = MockOrchestrator()
+    discovery = MockServiceDiscovery()
+    image_ids = [f"image-{i}" for i in range(args.images)]
+
+    started = time.perf_counter()
+    for _ in range(args.containers):
+        container = orchestrator.create_container(rng.choice(image_ids))
+        discovery.register_container(container["id"], container["image_id"], container["endpoint"])
+    build_s = time.perf_counter() - started
+
+    targets = [rng.choice(image_ids) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    found = sum(len(orchestrator.get_containers_by_image(image_id)) for image_id in targets)
+    orch_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    found_sd = sum(len(discovery.get_customer_containers(image_id)) for image_id in targets)
+    sd_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for image_id in targets[:1000]:
+        for container in orchestrator.get_containers_by_image(image_id):
+            orchestrator.stop_container(container["id"])
+            discovery.update_container_status(container["id"], "stopped")
+    stop_s = time.perf_counter() - started
+
+    print(f"fleet: {args.containers} containers over {args.images} images (built in {build_s:.2f}s)")
+    print(f"orchestrator get_containers_by_image: {args.lookups} lookups, {found} rows, {orch_s * 1000:.1f} ms")
+    print(f"discovery get_customer_containers:    {args.lookups} lookups, {found_sd} rows, {sd_s * 1000:.1f} ms")
+    print(f"stop loop over 1000 images:           {stop_s * 1000:.1f} ms, "
+          f"{len(orchestrator.get_containers_by_status('stopped'))} stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark: query plans and latency of the hot queries before and after the
+index migration (alembic revision 0002).
+
+Migrates a scratch database to the baseline revision, seeds a large fleet
+(fleet_generator) plus a job history, then runs EXPLAIN and times each query,
+migrates to head, ANALYZEs and repeats, reporting whether each query now uses
+the index it was added for. tests/test_query_plans.py asserts the plans.
+
+    python -m benchmarks.bench_query_plans --users 1000 --images 20000 --jobs 100000
+
+Set DATABASE_URL to run against PostgreSQL (the database must be empty).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def hot_queries(user_id: int):
+    """(name, statement, index expected after the migration)"""
+    from sqlalchemy import select
+    from app.lifecycle import IN_FLIGHT_STATUSES
+    from app.models import DockerImage, Job
+
+    now = datetime.utcnow()
+    return [
+        (
+            "per-user image list",
+            select(
+                DockerImage.id, DockerImage.user_id, DockerImage.name, DockerImage.inner_port,
+                DockerImage.payment_limit, DockerImage.items_per_container, DockerImage.status,
+            ).where(DockerImage.user_id == user_id).order_by(DockerImage.id),
+            "ix_docker_images_user_list",
+        ),
+        (
+            "lifecycle recovery",
+            select(DockerImage.id).where(DockerImage.status.in_(IN_FLIGHT_STATUSES)),
+            "ix_docker_images_status",
+        ),
+        (
+            "job claim",
+            select(Job.id)
+            .where(Job.status == "queued", Job.run_at <= now)
+            .order_by(Job.priority, Job.run_at, Job.id)
+            .limit(5),
+            "ix_jobs_claim",
+        ),
+        (
+            "user job list",
+            select(Job).where(Job.user_id == user_id).order_by(Job.id.desc()).limit(50),
+            "ix_jobs_user_id",
+        ),
+    ]
+
+
+def explain(conn, statement) -> str:
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    args = tuple(params[key] for key in compiled.positiontup) if compiled.positional else params
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", args).all()
+        return "; ".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}", args).all()
+    return " / ".join(row[0].strip() for row in rows)
+
+
+def measure(engine, queries, repeat: int):
+    results = {}
+    with engine.connect() as conn:
+        for name, statement, _ in queries:
+            plan = explain(conn, statement)
+            conn.execute(statement).all()  # warm the cache
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(statement).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (plan, statistics.median(timings))
+    return results
+
+
+def seed_jobs(seed: int, count: int):
+    """A job history: mostly finished jobs, a small queued backlog and a few running ones"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import DockerImage, Job
+    from fleet_generator import BATCH_SIZE
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    try:
+        owners = db.query(DockerImage.id, DockerImage.user_id).all()
+        now = datetime.utcnow()
+        rows = []
+        for _ in range(count):
+            image_id, user_id = rng.choice(owners)
+            status = rng.choices(["succeeded", "failed", "queued", "running"], weights=[0.95, 0.03, 0.015, 0.005])[0]
+            rows.append({
+                "kind": rng.choice(["image.register", "containers.bulk"]),
+                "payload": "{}",
+                "status": status,
+                "priority": rng.choice([10, 50, 100]),
+                "attempts": 1,
+                "max_attempts": 5,
+                "run_at": now - timedelta(seconds=rng.randint(0, 30 * 86400)),
+                "image_id": image_id,
+                "user_id": user_id,
+            })
+            if len(rows) == BATCH_SIZE:
+                db.execute(insert(Job), rows)
+                rows = []
+        if rows:
+            db.execute(insert(Job), rows)
+        # A handful of images interrupted mid start/stop
+        in_flight = [image_id for image_id, _ in rng.sample(owners, min(20, len(owners)))]
+        db.query(DockerImage).filter(DockerImage.id.in_(in_flight)).update(
+            {DockerImage.status: "starting"}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(args) -> int:
+    from sqlalchemy import func, select, text
+    from app.database import SessionLocal, engine
+    from app.migrations import upgrade
+    from app.models import DockerImage
+    from fleet_generator import seed_database
+
+    upgrade("0001")
+    started = time.perf_counter()
+    seed_database(args.seed, args.users, args.images)
+    seed_jobs(args.seed, args.jobs)
+    print(f"seeded {args.users} users, {args.images} images, {args.jobs} jobs in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    try:
+        # The busiest owner: the worst case for the per-user queries
+        user_id = db.execute(
+            select(DockerImage.user_id).group_by(DockerImage.user_id).order_by(func.count().desc()).limit(1)
+        ).scalar()
+    finally:
+        db.close()
+    queries = hot_queries(user_id)
+
+    before = measure(engine, queries, args.repeat)
+    upgrade("head")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = measure(engine, queries, args.repeat)
+
+    for name, _, expected_index in queries:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        uses_index = expected_index in plan_after
+        print(f"\n{name}: {ms_before:.2f} ms -> {ms_after:.2f} ms ({ms_before / max(ms_after, 1e-6):.1f}x)")
+        print(f"  before: {plan_before}")
+        print(f"  after:  {plan_after}")
+        print(f"  {expected_index} {'used' if uses_index else 'NOT used'}")
+    return 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=20000)
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Scratch directory, so the SQLite file and logs stay out of the source tree
+    workdir = tempfile.mkdtemp(prefix="query-plan-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "bench.log"))
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
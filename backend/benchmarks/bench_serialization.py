@@ -0,0 +1,112 @@
+"""
+Benchmark: JSON serialization and compression of the admin image list.
+
+Compares the default FastAPI response path (model_dump to Python objects,
+then json.dumps in JSONResponse) with Pydantic's model_dump_json, which the
+dashboard endpoints now use, and reports bytes on the wire and compression
+time for each encoding CompressionMiddleware can pick.
+
+    python -m benchmarks.bench_serialization --sizes 1000 5000 10000
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+
+from app.compression import brotli
+from app.schemas import DockerImageListItem, DockerImagesResponse
+
+
+def make_response(n: int, seed: int) -> DockerImagesResponse:
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        total_containers = rng.randint(0, 20)
+        items.append(DockerImageListItem(
+            id=i + 1,
+            user_id=rng.randint(1, max(1, n // 10)),
+            user_email=f"user{rng.randint(1, 5000)}@fleet.example",
+            image_name=f"service-{i}",
+            image_tag="latest",
+            internal_port=rng.choice([80, 3000, 8000, 8080]),
+            running_containers=rng.randint(0, total_containers),
+            total_containers=total_containers,
+            requests_per_second=rng.lognormvariate(3, 1.2),
+            total_requests=rng.randint(0, 10_000_000),
+            total_cost=round(rng.uniform(0, 2000), 2),
+            cost_breakdown={
+                "cpu": round(rng.uniform(0, 500), 2),
+                "memory": round(rng.uniform(0, 250), 2),
+                "storage": round(rng.uniform(0, 100), 2),
+                "requests": round(rng.uniform(0, 50), 2),
+            },
+            healthy_containers=rng.randint(0, total_containers),
+            total_errors=rng.randint(0, 3),
+            payment_limit=rng.choice([50.0, 100.0, 500.0, 1000.0]),
+            items_per_container=rng.choice([10, 50, 100]),
+            status=rng.choice(["running", "stopped", "ready"]),
+        ))
+    return DockerImagesResponse(images=items)
+
+
+def default_path(model: DockerImagesResponse) -> bytes:
+    # What JSONResponse does with a response_model result
+    content = model.model_dump(mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(model: DockerImagesResponse) -> bytes:
+    return model.model_dump_json(by_alias=True).encode()
+
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    encoders = [
+        ("gzip-1", lambda body: gzip.compress(body, compresslevel=1, mtime=0)),
+        ("gzip-5", lambda body: gzip.compress(body, compresslevel=5, mtime=0)),
+        ("gzip-9", lambda body: gzip.compress(body, compresslevel=9, mtime=0)),
+    ]
+    if brotli is not None:
+        encoders += [
+            ("br-4", lambda body: brotli.compress(body, quality=4)),
+            ("br-11", lambda body: brotli.compress(body, quality=11)),
+        ]
+    else:
+        print("brotli not installed; gzip only\n")
+
+    print(f"{'rows':>6} {'default ms':>10} {'dump_json ms':>12} {'speedup':>8} {'identity KB':>11}")
+    bodies = {}
+    for n in args.sizes:
+        model = make_response(n, args.seed)
+        default_s, default_body = best_of(args.repeat, lambda: default_path(model))
+        fast_s, fast_body = best_of(args.repeat, lambda: fast_path(model))
+        assert json.loads(default_body) == json.loads(fast_body), "serializers disagree"
+        bodies[n] = fast_body
+        print(f"{n:>6} {default_s * 1000:>10.2f} {fast_s * 1000:>12.2f} {default_s / fast_s:>7.1f}x {len(fast_body) / 1024:>11.1f}")
+
+    print(f"\n{'rows':>6} {'encoding':>8} {'KB on wire':>10} {'ratio':>6} {'compress ms':>11}")
+    for n, body in bodies.items():
+        for name, encode in encoders:
+            encode_s, encoded = best_of(args.repeat, lambda: encode(body))
+            print(f"{n:>6} {name:>8} {len(encoded) / 1024:>10.1f} {len(body) / len(encoded):>5.1f}x {encode_s * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
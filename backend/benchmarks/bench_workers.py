@@ -0,0 +1,152 @@
+"""
+Benchmark: throughput of one worker process vs. several (serve.py).
+
+Seeds a scratch SQLite fleet, starts mock_server.py (the in-process mocks
+cannot be shared between workers), then for each worker count launches
+serve.py on a local port and drives the api_bench scenarios against it over
+real HTTP. Reports the api_bench columns per run and the speedup over the
+first worker count. The default scenarios stay inside the backend: the full
+image_list fans out to mock_server.py, a single process, which then bounds
+every worker count alike.
+
+    python -m benchmarks.bench_workers --workers 1 4 --concurrency 32 --requests 1000
+    python -m benchmarks.bench_workers --scenarios signin_burst --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_ready(base_url: str, proc: subprocess.Popen, workers: int, timeout: float = 120.0):
+    """Until every worker has answered, so no run starts while some are still booting"""
+    import httpx
+
+    seen = set()
+    deadline = time.perf_counter() + timeout
+    # A new connection per probe, so the kernel hands probes to different workers
+    async with httpx.AsyncClient(base_url=base_url, timeout=2, limits=httpx.Limits(max_keepalive_connections=0)) as client:
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"serve.py exited with {proc.returncode}")
+            try:
+                r = await client.get("/registry/status")
+                if r.status_code == 200:
+                    seen.add(r.json()["worker"]["pid"])
+                    if len(seen) >= workers:
+                        return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{len(seen)} of {workers} serve.py workers ready after {timeout}s")
+
+
+async def drive(args, base_url: str, seeded: Dict[str, Any], workers: int) -> List[Dict[str, Any]]:
+    import httpx
+    from benchmarks.api_bench import BenchContext, format_row, run_scenario
+    from fleet_generator import FLEET_PASSWORD
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        r = await client.post("/auth/signin", json={"email": "admin@gmail.com", "password": "admin"})
+        r.raise_for_status()
+        admin_token = r.json()["access_token"]
+        user_tokens = []
+        for email in seeded["emails"][:10]:
+            r = await client.post("/auth/signin", json={"email": email, "password": FLEET_PASSWORD})
+            r.raise_for_status()
+            user_tokens.append(r.json()["access_token"])
+        ctx = BenchContext(client, admin_token, user_tokens, seeded["emails"], seeded["image_ids"], args.seed)
+        results = []
+        for name in args.scenarios:
+            result = await run_scenario(name, ctx, args.concurrency, args.requests, args.warmup, track_allocations=False)
+            result["workers"] = workers
+            results.append(result)
+            print(f"{workers:>7}  {format_row(result)}", flush=True)
+        return results
+
+
+def run(args) -> int:
+    from benchmarks.api_bench import HEADER
+    from app.migrations import upgrade
+    from fleet_generator import fleet_prefix, generate_fleet
+
+    upgrade()
+    seeded = generate_fleet(args.seed, args.users, args.images, args.containers, with_mocks=False)
+    seeded["emails"] = [f"{fleet_prefix(args.seed)}user-{i}@example.com" for i in range(args.users)]
+    mock_proc = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "mock_server.py"),
+         "--fleet-seed", str(args.seed), "--fleet-containers", str(args.containers)],
+        cwd=BACKEND_DIR,
+    )
+    time.sleep(2.0)
+
+    print(f"{'workers':>7}  {HEADER}")
+    print("-" * (len(HEADER) + 9))
+    runs: Dict[int, List[Dict[str, Any]]] = {}
+    try:
+        for workers in args.workers:
+            env = dict(os.environ, WEB_WORKERS=str(workers), WEB_PORT=str(args.port), WEB_HOST="127.0.0.1",
+                       WEB_LOG_LEVEL="warning")
+            server = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, "serve.py")], env=env)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                asyncio.run(wait_ready(base_url, server, workers))
+                runs[workers] = asyncio.run(drive(args, base_url, seeded, workers))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        mock_proc.terminate()
+        mock_proc.wait(timeout=10)
+
+    first = args.workers[0]
+    print(f"\nThroughput relative to {first} worker{'s' if first != 1 else ''}:")
+    for i, name in enumerate(args.scenarios):
+        base_rps = runs[first][i]["throughput_rps"] or 1e-9
+        speedups = ", ".join(f"{w} workers {runs[w][i]['throughput_rps'] / base_rps:.2f}x" for w in args.workers[1:])
+        print(f"  {name:<18} {speedups}")
+    return 0
+
+
+def main_cli():
+    from benchmarks.api_bench import SCENARIOS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, min(4, os.cpu_count() or 1)])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS),
+                        default=["image_list_core", "signin_burst", "health_poll"])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--containers", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and worker count")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Scratch directory, so the SQLite file, uploads and logs stay out of the source tree
+    workdir = tempfile.mkdtemp(prefix="workers-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "bench.log"))
+    os.environ["USE_MOCK_SERVICES"] = "false"
+    os.environ["WORKER_LEADER_LOCK"] = os.path.join(workdir, "leader.lock")
+    os.environ.setdefault("AUTOSCALER_ENABLED", "false")
+    os.environ.setdefault("REGISTRY_ENABLED", "false")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,261 @@
+"""
+Deterministic fleet generator for benchmarks and profiling.
+
+Given a seed and a size, inserts users and images into the database with
+bulk statements and fills the four mocks (orchestrator containers, service
+discovery registrations, load balancer traffic profiles and billing records)
+to match. The same seed always produces the same fleet, so performance
+results can be reproduced.
+
+    python fleet_generator.py --seed 1 --users 2000 --images 50000 --containers 150000
+
+The mocks live in the process that serves them, so a separate process (for
+example `python mock_server.py --fleet-seed 1`) rebuilds its half of the fleet
+from the seeded database rows with populate_mocks().
+"""
+
+import argparse
+import math
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+FLEET_PASSWORD = "fleet-password"
+BATCH_SIZE = 5000
+
+# name: (median requests/second, spread) — lognormal traffic per image
+TRAFFIC_PROFILES = {
+    "idle": (0.5, 0.5),
+    "steady": (40.0, 0.4),
+    "diurnal": (120.0, 0.8),
+    "bursty": (300.0, 1.2),
+}
+PROFILE_WEIGHTS = [0.35, 0.35, 0.2, 0.1]
+
+
+def fleet_prefix(seed: int) -> str:
+    return f"fleet-{seed}-"
+
+
+def _batches(rows: List[Dict[str, Any]], size: int = BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def reset_database(seed: int):
+    """Remove a previously generated fleet for this seed"""
+    from app.database import SessionLocal
+    from app.models import DockerImage, User
+
+    prefix = fleet_prefix(seed)
+    db = SessionLocal()
+    try:
+        db.query(DockerImage).filter(DockerImage.name.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.query(User).filter(User.email.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def seed_database(seed: int, users: int, images: int) -> List[Dict[str, Any]]:
+    """Bulk-insert the fleet's users and images; returns the image rows in a stable order"""
+    from sqlalchemy import insert
+    from app.auth import get_password_hash
+    from app.database import SessionLocal
+    from app.models import DockerImage, User
+
+    rng = random.Random(seed)
+    prefix = fleet_prefix(seed)
+    # One bcrypt hash shared by every fleet user; hashing per row would dominate seeding
+    hashed = get_password_hash(FLEET_PASSWORD)
+
+    db = SessionLocal()
+    try:
+        emails = [f"{prefix}user-{i}@example.com" for i in range(users)]
+        for batch in _batches([
+            {"email": e, "first_name": "Fleet", "last_name": f"User {i}", "hashed_password": hashed,
+             "is_admin": False, "is_active": True}
+            for i, e in enumerate(emails)
+        ]):
+            db.execute(insert(User), batch)
+        db.commit()
+        user_ids = [row.id for row in db.query(User.id).filter(User.email.like(f"{prefix}%")).order_by(User.id)]
+
+        # Heavy-tailed ownership: a few customers own most of the images
+        weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(user_ids))]
+        owners = rng.choices(user_ids, weights=weights, k=images) if user_ids else []
+        image_rows = []
+        for i in range(images):
+            scaling_type = rng.choices(["minimal", "maximal", "static"], weights=[0.5, 0.3, 0.2])[0]
+            min_containers = rng.randint(1, 3)
+            image_rows.append({
+                "user_id": owners[i],
+                "name": f"{prefix}img-{i}",
+                "image_file_path": f"uploads/{prefix}img-{i}.tar",
+                "inner_port": rng.choice([80, 3000, 5000, 8000, 8080]),
+                "scaling_type": scaling_type,
+                "min_containers": min_containers,
+                "max_containers": min_containers + rng.randint(2, 20),
+                "static_containers": rng.randint(1, 5) if scaling_type == "static" else 0,
+                "items_per_container": rng.choice([25, 50, 100, 250, 500]),
+                "payment_limit": round(rng.uniform(50, 5000), 2),
+                "description": None,
+                "status": "running",
+            })
+        for batch in _batches(image_rows):
+            db.execute(insert(DockerImage), batch)
+        db.commit()
+    finally:
+        db.close()
+    return load_fleet_images(seed)
+
+
+def load_fleet_images(seed: int) -> List[Dict[str, Any]]:
+    """Image rows of an already generated fleet, in generation order"""
+    from app.database import SessionLocal
+    from app.models import DockerImage
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                DockerImage.id, DockerImage.user_id, DockerImage.scaling_type, DockerImage.min_containers,
+                DockerImage.max_containers, DockerImage.static_containers, DockerImage.items_per_container,
+                DockerImage.payment_limit,
+            )
+            .filter(DockerImage.name.like(f"{fleet_prefix(seed)}%"))
+            .order_by(DockerImage.id)
+            .all()
+        )
+    finally:
+        db.close()
+    return [dict(row._mapping) for row in rows]
+
+
+def populate_mocks(seed: int, images: List[Dict[str, Any]], containers: int, mocks=None) -> Dict[str, int]:
+    """Fill the mocks for the given image rows; deterministic for the same seed and rows"""
+    import numpy as np
+
+    if mocks is None:
+        import mock_services as mocks
+    from mock_services import BillingRecord, ContainerRecord
+
+    rng = random.Random(seed * 7919 + 17)
+    lb, sd, orch, billing = mocks.load_balancer, mocks.service_discovery, mocks.orchestrator, mocks.billing
+    now = time.time()
+    iso_now = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    # Traffic first: container counts are spread in proportion to demand
+    profiles = rng.choices(list(TRAFFIC_PROFILES), weights=PROFILE_WEIGHTS, k=len(images))
+    rps: List[float] = []
+    for image, profile in zip(images, profiles):
+        median, spread = TRAFFIC_PROFILES[profile]
+        value = round(rng.lognormvariate(math.log(median), spread), 3)
+        rps.append(value)
+        lb.traffic_data[str(image["id"])] = {
+            "requests_per_second": value,
+            "total_requests": int(value * rng.uniform(3600, 30 * 86400)),
+            "geographic_distribution": {
+                "US": rng.randint(30, 60),
+                "EU": rng.randint(20, 40),
+                "Asia": rng.randint(10, 30),
+            },
+            "profile": profile,
+            "last_updated": iso_now,
+        }
+
+    total_rps = sum(rps) or 1.0
+    counts = [max(1, int(containers * r / total_rps)) for r in rps] if images else []
+    created = 0
+    for image, count in zip(images, counts):
+        key = str(image["id"])
+        for _ in range(count):
+            container_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            running = rng.random() < 0.9
+            record = ContainerRecord.create(
+                id=container_id,
+                image_id=key,
+                status="running" if running else "stopped",
+                resources={"cpu_limit": "1.0", "memory_limit": "512MB", "disk_limit": "10GB"},
+                health={
+                    "cpu_usage": rng.uniform(10, 80) if running else 0.0,
+                    "memory_usage": rng.uniform(20, 90) if running else 0.0,
+                    "disk_usage": rng.uniform(5, 60),
+                    "status": "healthy" if running else "stopped",
+                },
+                created_at=now,
+                endpoint=f"http://10.{(created >> 16) & 255}.{(created >> 8) & 255}.{created & 255}:8080",
+            )
+            orch._add(record)
+            sd.register_container(container_id, key, record.endpoint, "healthy" if running else "stopped")
+            created += 1
+
+    # Billing: price one hour of each image's usage in a single vectorized pass, then
+    # pick the hours billed so far so that spend lands at a drawn fraction of the
+    # payment limit (a few percent past the alert threshold, a handful over the limit)
+    cpu = np.array([rng.uniform(10, 80) for _ in images])
+    memory = np.array([rng.choice([0.25, 0.5, 1.0, 2.0]) for _ in images])
+    storage = np.array([rng.choice([5.0, 10.0, 20.0]) for _ in images])
+    spend_ratio = np.array([rng.betavariate(2, 5) * 1.2 for _ in images])
+    replicas = np.maximum(np.array(counts, dtype=float), 1.0)
+    ones = np.ones(len(images))
+    hourly = billing.calculate_container_costs_batch(ones, cpu, memory, storage, np.array(rps) * 3600 / replicas) * replicas
+    limits = np.array([image["payment_limit"] or 0.0 for image in images], dtype=float)
+    hours = np.clip(np.divide(spend_ratio * limits, hourly, out=np.full(len(images), 720.0), where=hourly > 0), 1.0, 720.0)
+    costs = hourly * hours
+    requests = np.array(rps) * hours * 3600
+    for i, image in enumerate(images):
+        total = round(float(costs[i]), 2)
+        billing.put_record(str(image["id"]), BillingRecord(
+            image_id=str(image["id"]),
+            user_id=str(image["user_id"]),
+            total_cost=total,
+            containers_count=counts[i],
+            total_hours=float(hours[i]),
+            total_requests=int(requests[i]),
+            avg_cpu_usage=round(float(cpu[i]), 2),
+            memory_gb=float(memory[i]),
+            storage_gb=float(storage[i]),
+            payment_limit=image["payment_limit"],
+            last_updated=now,
+        ))
+
+    return {"images": len(images), "containers": created, "elapsed_ms": int((time.time() - now) * 1000)}
+
+
+def generate_fleet(seed: int, users: int, images: int, containers: int, reset: bool = True,
+                   mocks=None, with_mocks: bool = True) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if reset:
+        reset_database(seed)
+    rows = seed_database(seed, users, images)
+    db_s = time.perf_counter() - started
+    summary: Dict[str, Any] = {"seed": seed, "users": users, "images": len(rows), "db_seconds": round(db_s, 2)}
+    if with_mocks:
+        started = time.perf_counter()
+        summary.update(populate_mocks(seed, rows, containers, mocks))
+        summary["mock_seconds"] = round(time.perf_counter() - started, 2)
+    summary["image_ids"] = [row["id"] for row in rows]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=10000)
+    parser.add_argument("--containers", type=int, default=30000)
+    parser.add_argument("--no-reset", action="store_true", help="Keep an existing fleet for this seed")
+    args = parser.parse_args()
+
+    from app.migrations import upgrade
+
+    upgrade()
+    summary = generate_fleet(args.seed, args.users, args.images, args.containers, reset=not args.no_reset)
+    summary.pop("image_ids")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
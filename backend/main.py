@@ -1,38 +1,62 @@
-from fastapi import FastAPI, Response, status
+from app.startup import startup_profiler
+
+from fastapi import FastAPI, Depends, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import os
-import time
 import asyncio
-import httpx
 
 from app.logger import logger
 
-from app.routers import auth, docker, health
-from app.database import engine, SessionLocal
-from app.models import Base, User
-from app.auth import get_password_hash
+from app.routers import auth, docker, health, jobs, billing
+from app.database import SessionLocal, read_replicas
+from app.models import User
+from app.migrations import check_schema, SchemaOutOfDate
+from app.auth import get_password_hash, get_current_admin_user
+from app.jobs import job_queue
+from app.autoscaler import autoscaler
+from app.payment_limits import payment_enforcer
+from app.external_services import external_client, USE_MOCKS
+from app.registry import registry_heartbeat
+from app.metrics import MetricsMiddleware, request_metrics
+from app.rate_limit import rate_limiter
+from app.admission import AdmissionMiddleware, admission
+from app.conditional import response_cache
+from app.compression import CompressionMiddleware
+from app.lifecycle import image_lifecycle
+from app.loop_monitor import loop_monitor
+from app.leader import worker_leader
+from app.shutdown import graceful_shutdown
+from app.worker_board import worker_board
+from app import job_handlers  # noqa: F401  (registers background job handlers)
 
 # Load environment variables
 load_dotenv()
 
-def create_tables():
-    """Create database tables with retry logic for PostgreSQL"""
+# Set by serve.py, which runs the once-per-instance startup jobs before starting its workers
+STARTUP_JOBS_DONE = os.getenv("STARTUP_JOBS_DONE", "").lower() in ("1", "true", "yes")
+
+async def check_database_schema():
+    """Check the database is migrated to the head revision, with retry logic for PostgreSQL"""
     max_retries = 5
     retry_delay = 2
-    
+
     for attempt in range(max_retries):
         try:
-            Base.metadata.create_all(bind=engine)
-            logger.info("Database tables created successfully")
+            await asyncio.to_thread(check_schema)
+            logger.info("Database schema is up to date")
             break
+        except SchemaOutOfDate as e:
+            # Startup runs no DDL; migrations are a deployment step
+            logger.error(str(e))
+            raise
         except Exception as e:
             if attempt < max_retries - 1:
                 logger.error(f"Database connection failed (attempt {attempt + 1}/{max_retries}): {e}")
                 print(f"Database connection failed (attempt {attempt + 1}/{max_retries}): {e}")
                 print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
+                await asyncio.sleep(retry_delay)
             else:
                 logger.error(f"Failed to connect to database after {max_retries} attempts: {e}")
                 print(f"Failed to connect to database after {max_retries} attempts: {e}")
@@ -62,16 +86,75 @@ def ensure_admin_user():
     finally:
         db.close()
 
-# Initialize database
-create_tables()
-ensure_admin_user()
+def run_startup_jobs():
+    """Startup work that must run once per instance, not once per worker (serve.py)"""
+    ensure_admin_user()
+    image_lifecycle.recover()
+
+def start_leader_tasks():
+    """Background work of the one leader worker"""
+    registry_heartbeat.start()
+    autoscaler.start()
+
+def follow_instance_drain(draining: bool):
+    """Drain or resume along with the other workers; a worker that is shutting down keeps draining"""
+    registry_heartbeat.set_draining(draining or graceful_shutdown.stopping)
+
+def build_mock_services():
+    import mock_services
+
+    mock_services.get_mocks()
+
+startup_profiler.checkpoint("imports")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: schedule service registry registration
-    asyncio.create_task(register_with_registry())
+    # Startup: nothing heavy runs at import time. The schema check and the mock services are
+    # independent, so they run concurrently; everything that reads the database waits for
+    # the schema check and then starts together. Under serve.py the admin user and lifecycle
+    # recovery already ran before the workers started, and only the leader worker runs the
+    # registry heartbeat and the autoscaler.
+    # A previous lifespan in this process (tests, benchmarks) leaves drain mode on
+    admission.stop_draining()
+    loop_monitor.start()
+    profile = startup_profiler
+    schema_and_mocks = [profile.run("database schema", check_database_schema())]
+    if USE_MOCKS:
+        schema_and_mocks.append(profile.run("mock services", asyncio.to_thread(build_mock_services)))
+    await asyncio.gather(*schema_and_mocks)
+    once_per_instance = [] if STARTUP_JOBS_DONE else [
+        profile.run("admin user", asyncio.to_thread(ensure_admin_user)),
+        profile.run("lifecycle recovery", asyncio.to_thread(image_lifecycle.recover)),
+    ]
+    await asyncio.gather(
+        *once_per_instance,
+        profile.run("job queue", job_queue.start()),
+        profile.run("payment limits", payment_enforcer.start()),
+        profile.run("read replicas", read_replicas.start()),
+    )
+    worker_leader.start(start_leader_tasks)
+    worker_board.start(follow_instance_drain)
+    # Drain on SIGTERM/SIGINT before uvicorn closes the listener (app/shutdown.py)
+    graceful_shutdown.install()
+    profile.mark_ready()
     yield
-    # Shutdown: nothing to clean up
+    graceful_shutdown.uninstall()
+    # Shutdown: after an exit signal the drain already ran; otherwise report DRAINING and shed
+    # new requests while in-flight ones (uploads included) finish. Then deregister and stop the
+    # autoscaler and job workers (in-flight jobs are requeued). A worker that serve.py recycles
+    # exits without a signal while the others keep serving: it neither drains nor deregisters
+    instance_stopping = graceful_shutdown.stopping or not worker_board.shared
+    if instance_stopping:
+        registry_heartbeat.set_draining(True)
+        await admission.wait_idle()
+    await registry_heartbeat.stop(deregister=instance_stopping)
+    await worker_board.stop()
+    await autoscaler.stop()
+    await worker_leader.stop()
+    await job_queue.stop()
+    await read_replicas.stop()
+    await external_client.aclose()
+    await loop_monitor.stop()
 
 app = FastAPI(
     title="ScaleUp-Nvidia UI Backend",
@@ -80,6 +163,12 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# gzip/brotli for large JSON responses; innermost, so compression runs inside an admission slot
+app.add_middleware(CompressionMiddleware)
+
+# Admission control and drain mode; inside CORS so shed responses stay readable by the browser
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -89,10 +178,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request load metrics (reported with every registry heartbeat)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(docker.router, prefix="/docker", tags=["Docker Management"])
 app.include_router(health.router, prefix="/health", tags=["Health & Monitoring"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Background Jobs"])
+app.include_router(billing.router, prefix="/billing", tags=["Billing"])
 
 @app.get("/")
 async def root():
@@ -134,48 +228,47 @@ async def root():
     """
     return Response(content=html, media_type="text/html", status_code=status.HTTP_200_OK)
 
-# Service registry registration on startup
-REGISTRY_BASE_URL = os.getenv("REGISTRY_BASE_URL", "http://localhost:7000")
-PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
-SERVICE_ID = os.getenv("SERVICE_ID", "ui-1")
-
-async def register_with_registry():
-    logger.info("Starting service registry registration")
-    payload = {
-        "id": SERVICE_ID,
-        "kind": "ui",
-        "url": f"{PUBLIC_BASE_URL}/health",
-        "status": "UP",
-    }
-
-    max_attempts = int(os.getenv("REGISTRY_RETRY_ATTEMPTS", "5"))
-    retry_delay_seconds = float(os.getenv("REGISTRY_RETRY_DELAY", "2"))
-
-    for attempt in range(max_attempts):
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    f"{REGISTRY_BASE_URL}/registry/parts",
-                    json=payload,
-                    timeout=10,
-                )
-                resp.raise_for_status()
-                logger.info(f"Registered UI service with registry: {payload}")
-                print("Registered UI service with registry:", payload)
-                break
-        except Exception as e:
-            if attempt < max_attempts - 1:
-                logger.error(f"Registry registration failed (attempt {attempt + 1}/{max_attempts}): {e}")
-                print(
-                    f"Registry registration failed (attempt {attempt + 1}/{max_attempts}): {e}. "
-                    f"Retrying in {retry_delay_seconds} seconds..."
-                )
-                await asyncio.sleep(retry_delay_seconds)
-            else:
-                logger.error(f"Failed to register UI service with registry: {e}")
-                print("Failed to register UI service with registry:", e)
-
+# Service registry heartbeat
 @app.post("/registry/register")
 async def trigger_registry_registration():
-    await register_with_registry()
+    """Send a registry heartbeat now; does not wait for the registry to answer"""
+    if not worker_leader.is_leader:
+        # Only the leader worker talks to the registry
+        return {"status": "not_leader", "worker": worker_leader.state()}
+    registry_heartbeat.start()
+    registry_heartbeat.trigger()
     return {"status": "triggered"}
+
+@app.get("/registry/status")
+async def get_registry_status():
+    return {**registry_heartbeat.state(), "worker": worker_leader.state(), "workers": worker_board.state()}
+
+@app.get("/metrics")
+async def get_metrics(current_user: User = Depends(get_current_admin_user)):
+    """Load, event loop, admission control, rate limit, response cache, lifecycle and read replica counters of this worker (admin only)"""
+    return {
+        "requests": request_metrics.snapshot(),
+        "event_loop": loop_monitor.stats(),
+        "admission": admission.state(),
+        "rate_limits": rate_limiter.stats(),
+        "response_cache": response_cache.stats(),
+        "lifecycle": image_lifecycle.stats,
+        "read_replicas": read_replicas.stats(),
+    }
+
+@app.post("/registry/drain")
+async def drain_instance(current_user: User = Depends(get_current_admin_user)):
+    """Stop admitting new requests and report DRAINING (admin only); in-flight requests finish"""
+    logger.info(f"POST /registry/drain - Drain requested by admin: {current_user.email}")
+    # The other workers follow the flag within WORKER_SYNC_INTERVAL
+    worker_board.publish_drain(True)
+    registry_heartbeat.set_draining(True)
+    return registry_heartbeat.state()
+
+@app.post("/registry/resume")
+async def resume_instance(current_user: User = Depends(get_current_admin_user)):
+    """Leave drain mode and accept new requests again (admin only)"""
+    logger.info(f"POST /registry/resume - Resume requested by admin: {current_user.email}")
+    worker_board.publish_drain(False)
+    registry_heartbeat.set_draining(False)
+    return registry_heartbeat.state()
@@ -0,0 +1,246 @@
+"""
+Standalone HTTP mode for the mock services.
+
+Serves the in-repo mocks (orchestrator, load balancer, service discovery and
+billing) as real local HTTP servers on the ports from ORCHESTRATOR_API_URL,
+LOAD_BALANCER_API_URL, SERVICE_DISCOVERY_API_URL and BILLING_API_URL, so the
+backend can run with USE_MOCK_SERVICES=false and exercise the real
+ExternalServiceClient path (serialization, pooling, timeouts) end to end.
+
+The mock follows the backend's orchestrator contract as it is: POST
+/start/container names the image by reference ("web:latest") and the image
+list asks for /containers/web/instances, so started containers are kept
+under the image name. Health, resources, scaling and bulk stop ask by
+database image id and see the containers kept under that id (scaled up by
+the autoscaler, or seeded by fleet_generator.py).
+
+Latency, jitter and error rates are configurable globally or per service:
+
+    MOCK_LATENCY_MS=20 MOCK_JITTER_MS=10 MOCK_ERROR_RATE=0.01 python mock_server.py
+    MOCK_BILLING_LATENCY_MS=150 python mock_server.py --services billing orchestrator
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import uvicorn
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+import mock_services
+
+SERVICE_URL_ENV = {
+    "orchestrator": ("ORCHESTRATOR_API_URL", "http://localhost:8001"),
+    "load_balancer": ("LOAD_BALANCER_API_URL", "http://localhost:8002"),
+    "service_discovery": ("SERVICE_DISCOVERY_API_URL", "http://localhost:8003"),
+    "billing": ("BILLING_API_URL", "http://localhost:8004"),
+}
+
+
+def _setting(service: str, name: str, default: str) -> float:
+    """Per-service override (MOCK_BILLING_LATENCY_MS) falling back to the global one (MOCK_LATENCY_MS)"""
+    return float(os.getenv(f"MOCK_{service.upper()}_{name}", os.getenv(f"MOCK_{name}", default)))
+
+
+class FaultInjection:
+    """Simulated network latency, jitter and failures for one mock service"""
+
+    def __init__(self, service: str):
+        self.latency_ms = _setting(service, "LATENCY_MS", "0")
+        self.jitter_ms = _setting(service, "JITTER_MS", "0")
+        self.error_rate = _setting(service, "ERROR_RATE", "0")
+        self.error_status = int(_setting(service, "ERROR_STATUS", "503"))
+
+    async def __call__(self, request: Request, call_next):
+        delay_ms = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            return JSONResponse({"detail": "Injected mock failure"}, status_code=self.error_status)
+        return await call_next(request)
+
+
+def _make_app(service: str) -> FastAPI:
+    app = FastAPI(title=f"Mock {service}", docs_url=None, redoc_url=None)
+    app.middleware("http")(FaultInjection(service))
+    return app
+
+
+def _image_name(reference: str) -> str:
+    """Image reference without its tag: registry:5000/web:latest -> registry:5000/web"""
+    name, sep, tag = reference.rpartition(":")
+    return name if sep and "/" not in tag else reference
+
+
+def create_orchestrator_app() -> FastAPI:
+    app = _make_app("orchestrator")
+    orch = mock_services.orchestrator
+
+    @app.get("/containers/{image_id}/instances")
+    async def instances(image_id: str):
+        return {"instances": orch.get_containers_by_image(image_id)}
+
+    @app.post("/api/images")
+    async def sync_image(body: Dict[str, Any] = Body(...)):
+        return {"success": True, "image": body.get("image"), "url": body.get("image_url")}
+
+    @app.post("/start/container")
+    async def start(body: Dict[str, Any] = Body(...)):
+        # Listed by image name (GET /docker/images asks for /containers/{name}/instances)
+        image_id = _image_name(body.get("image", ""))
+        count = int(body.get("count") or body.get("min_replicas") or 1)
+        resources = body.get("resources") or {}
+        started = [orch.create_container(image_id, {"cpu_limit": resources.get("cpu", "1.0")})["id"] for _ in range(count)]
+        return {"ok": True, "action": "created", "container_id": started[0] if started else None, "started": started}
+
+    @app.post("/containers/{image_id}/start")
+    async def start_instance(image_id: str, body: Dict[str, Any] = Body(...)):
+        return {"started": orch.start_container(body.get("instanceId", ""))}
+
+    @app.post("/containers/{image_id}/stop")
+    async def stop_instance(image_id: str, body: Dict[str, Any] = Body(...)):
+        return {"stopped": orch.stop_container(body.get("instanceId", ""))}
+
+    @app.get("/containers/{image_id}/health")
+    async def health(image_id: str):
+        containers = orch.get_containers_by_image(image_id)
+        return {"errors": [], "containers": [orch.get_container_health(c["id"]) for c in containers]}
+
+    @app.put("/containers/{image_id}/resources")
+    async def resources(image_id: str, body: Dict[str, Any] = Body(...)):
+        updated = [c["id"] for c in orch.get_containers_by_image(image_id) if orch.update_container_resources(c["id"], body)]
+        return {"updated": updated}
+
+    @app.put("/containers/{image_id}/instances/{instance_id}/resources")
+    async def instance_resources(image_id: str, instance_id: str, body: Dict[str, Any] = Body(...)):
+        return {"updated": orch.update_container_resources(instance_id, body)}
+
+    @app.post("/containers/{image_id}/scale")
+    async def scale(image_id: str, body: Dict[str, Any] = Body(...)):
+        replicas = int(body.get("replicas", 0))
+        return {"replicas": replicas, "changed": orch.scale_containers(image_id, replicas)}
+
+    return app
+
+
+def create_load_balancer_app() -> FastAPI:
+    app = _make_app("load_balancer")
+    lb = mock_services.load_balancer
+
+    @app.get("/traffic/{image_id}")
+    async def traffic(image_id: str):
+        return lb.get_traffic_stats(image_id)
+
+    @app.get("/geographic-stats")
+    async def geographic_stats():
+        totals: Dict[str, int] = {}
+        for stats in lb.get_all_traffic_stats().values():
+            for region, share in stats.get("geographic_distribution", {}).items():
+                totals[region] = totals.get(region, 0) + share
+        return {"regions": totals}
+
+    return app
+
+
+def create_service_discovery_app() -> FastAPI:
+    app = _make_app("service_discovery")
+    sd = mock_services.service_discovery
+
+    @app.get("/services")
+    async def services() -> List[Dict[str, Any]]:
+        return [{"id": k, "name": k, **v} for k, v in sd.get_system_services().items()]
+
+    @app.get("/health/{service_id}")
+    async def service_health(service_id: str):
+        data = sd.get_system_services().get(service_id, {"status": "unknown"})
+        return {"status": data.get("status", "unknown"), "response_time": 50, "uptime": "99.9%"}
+
+    return app
+
+
+def create_billing_app() -> FastAPI:
+    app = _make_app("billing")
+    billing = mock_services.billing
+
+    @app.get("/images/{image_id}/costs")
+    async def image_costs(image_id: str, user_id: str = mock_services.UNKNOWN_USER):
+        return billing.get_image_billing(image_id, user_id)
+
+    @app.get("/users/{user_id}/summary")
+    async def user_summary(user_id: str):
+        return billing.get_user_billing_summary(user_id)
+
+    @app.get("/payment-limits/{image_id}")
+    async def payment_limit(image_id: str):
+        status = billing.check_payment_limit(image_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Unknown image")
+        return status
+
+    @app.put("/payment-limits/{image_id}")
+    async def set_payment_limit(image_id: str, body: Dict[str, Any] = Body(...)):
+        return {"success": billing.set_payment_limit(image_id, float(body.get("limit", 0)))}
+
+    @app.get("/alerts")
+    async def alerts():
+        statuses = (billing.check_payment_limit(image_id) for image_id in billing.billing_data)
+        return [s for s in statuses if s and s["limit_reached"]]
+
+    @app.get("/bi/revenue")
+    async def revenue():
+        return billing.get_system_bi_data()
+
+    @app.get("/bi/usage")
+    async def usage():
+        return billing.get_system_bi_data()
+
+    return app
+
+
+APP_FACTORIES = {
+    "orchestrator": create_orchestrator_app,
+    "load_balancer": create_load_balancer_app,
+    "service_discovery": create_service_discovery_app,
+    "billing": create_billing_app,
+}
+
+
+def service_address(service: str, host: Optional[str] = None) -> tuple:
+    env_name, default = SERVICE_URL_ENV[service]
+    parsed = urlparse(os.getenv(env_name, default))
+    return host or parsed.hostname or "127.0.0.1", parsed.port or 80
+
+
+async def serve(services: List[str], host: Optional[str] = None, log_level: str = "warning"):
+    servers = []
+    for service in services:
+        bind_host, port = service_address(service, host)
+        config = uvicorn.Config(APP_FACTORIES[service](), host=bind_host, port=port, log_level=log_level)
+        servers.append(uvicorn.Server(config))
+        print(f"Mock {service} listening on http://{bind_host}:{port}")
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", choices=list(APP_FACTORIES), default=list(APP_FACTORIES))
+    parser.add_argument("--host", default=None, help="Bind address (defaults to the host in each service URL)")
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--fleet-seed", type=int, default=None,
+                        help="Rebuild the mock side of a fleet generated with fleet_generator.py (reads DATABASE_URL)")
+    parser.add_argument("--fleet-containers", type=int, default=30000)
+    args = parser.parse_args()
+    if args.fleet_seed is not None:
+        import fleet_generator
+
+        images = fleet_generator.load_fleet_images(args.fleet_seed)
+        print(f"Fleet {args.fleet_seed}: {fleet_generator.populate_mocks(args.fleet_seed, images, args.fleet_containers)}")
+    asyncio.run(serve(args.services, args.host, args.log_level))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,36 +2,67 @@
 Mock Services for Teams 2, 3, and 4
 This module provides mock implementations of all external team services
 that the UI team needs to interact with.
+
+Importing this module has no side effects: the shared service instances
+(load_balancer, service_discovery, orchestrator, billing) are built and
+seeded with sample data the first time one of them is accessed.
+
+Container, health and billing state is kept in flat __slots__ records with
+epoch timestamps and interned ids, so load tests can hold a 100k-container
+fleet; the API dicts (with ISO timestamps) are built only when returned.
 """
 
+from __future__ import annotations
+
 import json
+import os
+import sys
+import threading
 import time
 import random
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 import uuid
 
+if TYPE_CHECKING:
+    import numpy as np
+
+HOURS_PER_MONTH = 730
+RESOURCE_KEYS = ("cpu_limit", "memory_limit", "disk_limit")
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+def _intern(value: Any) -> Any:
+    # Ids and limit values repeat across thousands of records; share one string each
+    return sys.intern(value) if type(value) is str else value
+
 class MockLoadBalancer:
     """Mock for Team 2 - Load Balancer"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
         self.traffic_data = {}
         self.request_counts = {}
         self.geographic_routing = {}
+        # Bumped on every data change, so readers can tell cached results are still current
+        self.version = 0
         
     def get_traffic_stats(self, image_id: str) -> Dict[str, Any]:
         """Get traffic statistics for an image (RPS, geographic distribution)"""
         if image_id not in self.traffic_data:
             self.traffic_data[image_id] = {
-                "requests_per_second": random.uniform(10, 100),
-                "total_requests": random.randint(1000, 50000),
+                "requests_per_second": self.rng.uniform(10, 100),
+                "total_requests": self.rng.randint(1000, 50000),
                 "geographic_distribution": {
-                    "US": random.randint(30, 60),
-                    "EU": random.randint(20, 40),
-                    "Asia": random.randint(10, 30)
+                    "US": self.rng.randint(30, 60),
+                    "EU": self.rng.randint(20, 40),
+                    "Asia": self.rng.randint(10, 30)
                 },
                 "last_updated": datetime.now().isoformat()
             }
+            self.version += 1
         
         return self.traffic_data[image_id]
     
@@ -50,20 +81,57 @@ class MockLoadBalancer:
             }
         
         self.traffic_data[image_id]["total_requests"] += requests
-        self.traffic_data[image_id]["requests_per_second"] = random.uniform(10, 100)
+        self.traffic_data[image_id]["requests_per_second"] = self.rng.uniform(10, 100)
         self.traffic_data[image_id]["last_updated"] = datetime.now().isoformat()
+        self.version += 1
+
+@dataclass(slots=True)
+class RegisteredContainer:
+    """Service discovery entry for a customer container"""
+    image_id: str
+    endpoint: str
+    status: str
+    registered_at: float
+    last_updated: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "image_id": self.image_id,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "registered_at": _iso(self.registered_at),
+        }
+        if self.last_updated is not None:
+            data["last_updated"] = _iso(self.last_updated)
+        return data
+
+def _index_add(index: Dict[str, Dict[str, None]], key: str, container_id: str):
+    # dict-as-ordered-set keeps insertion order for deterministic listings
+    index.setdefault(key, {})[container_id] = None
+
+def _index_remove(index: Dict[str, Dict[str, None]], key: str, container_id: str):
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.pop(container_id, None)
+        if not bucket:
+            del index[key]
 
 class MockServiceDiscovery:
     """Mock for Team 2 - Service Discovery"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
         self.system_services = {
             "load_balancer": {"status": "healthy", "endpoint": "http://localhost:8001"},
             "orchestrator": {"status": "healthy", "endpoint": "http://localhost:8002"},
             "billing": {"status": "healthy", "endpoint": "http://localhost:8003"},
             "discovery": {"status": "healthy", "endpoint": "http://localhost:8004"}
         }
-        self.customer_containers = {}
+        self.customer_containers: Dict[str, RegisteredContainer] = {}
+        # Secondary indexes: image id / status -> container ids
+        self.containers_by_image: Dict[str, Dict[str, None]] = {}
+        self.containers_by_status: Dict[str, Dict[str, None]] = {}
+        self.version = 0
         
     def get_system_services(self) -> Dict[str, Dict[str, str]]:
         """Get all system services registry"""
@@ -72,36 +140,130 @@ class MockServiceDiscovery:
     def get_customer_containers(self, image_id: str = None) -> Dict[str, Dict[str, Any]]:
         """Get customer containers registry"""
         if image_id:
-            return {k: v for k, v in self.customer_containers.items() if v.get("image_id") == image_id}
-        return self.customer_containers
+            ids = self.containers_by_image.get(image_id, {})
+            return {k: self.customer_containers[k].to_dict() for k in ids}
+        return {k: v.to_dict() for k, v in self.customer_containers.items()}
+    
+    def get_containers_by_status(self, status: str) -> List[str]:
+        """Get ids of registered containers with the given status"""
+        return list(self.containers_by_status.get(status, {}))
     
     def register_container(self, container_id: str, image_id: str, endpoint: str, status: str = "healthy"):
         """Register a new container"""
-        self.customer_containers[container_id] = {
-            "image_id": image_id,
-            "endpoint": endpoint,
-            "status": status,
-            "registered_at": datetime.now().isoformat()
-        }
+        self.unregister_container(container_id)
+        image_id = _intern(image_id)
+        self.customer_containers[container_id] = RegisteredContainer(
+            image_id=image_id,
+            endpoint=endpoint,
+            status=_intern(status),
+            registered_at=time.time(),
+        )
+        _index_add(self.containers_by_image, image_id, container_id)
+        _index_add(self.containers_by_status, status, container_id)
+        self.version += 1
     
     def update_container_status(self, container_id: str, status: str):
         """Update container status"""
-        if container_id in self.customer_containers:
-            self.customer_containers[container_id]["status"] = status
-            self.customer_containers[container_id]["last_updated"] = datetime.now().isoformat()
+        entry = self.customer_containers.get(container_id)
+        if entry is not None:
+            _index_remove(self.containers_by_status, entry.status, container_id)
+            entry.status = _intern(status)
+            entry.last_updated = time.time()
+            _index_add(self.containers_by_status, status, container_id)
+            self.version += 1
     
     def unregister_container(self, container_id: str):
         """Unregister a container"""
-        if container_id in self.customer_containers:
-            del self.customer_containers[container_id]
+        entry = self.customer_containers.pop(container_id, None)
+        if entry is not None:
+            _index_remove(self.containers_by_image, entry.image_id, container_id)
+            _index_remove(self.containers_by_status, entry.status, container_id)
+            self.version += 1
+
+@dataclass(slots=True)
+class ContainerRecord:
+    """Orchestrator-side state of one container instance, its health and resource limits included"""
+    id: str
+    image_id: str
+    status: str
+    endpoint: str
+    created_at: float
+    cpu_limit: Any = "1.0"
+    memory_limit: Any = "512MB"
+    disk_limit: Any = "10GB"
+    cpu_usage: float = 0.0
+    memory_usage: float = 0.0
+    disk_usage: float = 0.0
+    health_status: str = "healthy"
+    # Limits other than RESOURCE_KEYS, rarely set
+    extra_resources: Optional[Dict[str, Any]] = None
+    
+    @classmethod
+    def create(cls, id: str, image_id: str, status: str, resources: Dict[str, Any], health: Dict[str, Any],
+               endpoint: str, created_at: Optional[float] = None) -> ContainerRecord:
+        record = cls(
+            id=id,
+            image_id=_intern(image_id),
+            status=_intern(status),
+            endpoint=endpoint,
+            created_at=time.time() if created_at is None else created_at,
+            cpu_usage=health["cpu_usage"],
+            memory_usage=health["memory_usage"],
+            disk_usage=health["disk_usage"],
+            health_status=_intern(health["status"]),
+        )
+        record.update_resources(resources)
+        return record
+    
+    @property
+    def resources(self) -> Dict[str, Any]:
+        resources = {"cpu_limit": self.cpu_limit, "memory_limit": self.memory_limit, "disk_limit": self.disk_limit}
+        if self.extra_resources:
+            resources.update(self.extra_resources)
+        return resources
+    
+    @property
+    def health(self) -> Dict[str, Any]:
+        return {
+            "cpu_usage": self.cpu_usage,
+            "memory_usage": self.memory_usage,
+            "disk_usage": self.disk_usage,
+            "status": self.health_status,
+        }
+    
+    def update_resources(self, resources: Dict[str, Any]):
+        for key, value in resources.items():
+            value = _intern(value)
+            if key in RESOURCE_KEYS:
+                setattr(self, key, value)
+            else:
+                if self.extra_resources is None:
+                    self.extra_resources = {}
+                self.extra_resources[key] = value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "image_id": self.image_id,
+            "status": self.status,
+            "resources": self.resources,
+            "health": self.health,
+            "created_at": _iso(self.created_at),
+            "endpoint": self.endpoint,
+        }
 
 class MockOrchestrator:
     """Mock for Team 3 - Orchestrator"""
     
-    def __init__(self):
-        self.containers = {}
-        self.container_health = {}
-        self.resource_limits = {}
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        # Container id -> record (status, health and resource limits in one object)
+        self.containers: Dict[str, ContainerRecord] = {}
+        # Secondary indexes kept in step with create/delete/start/stop
+        self.containers_by_image: Dict[str, Dict[str, None]] = {}
+        self.containers_by_status: Dict[str, Dict[str, None]] = {}
+        # Health jitter is simulated noise and does not count as a change
+        self.version = 0
         
         # Add some sample containers for testing
         self._add_sample_containers()
@@ -115,7 +277,6 @@ class MockOrchestrator:
                 "status": "running",
                 "resources": {"cpu_limit": "1.0", "memory_limit": "512MB", "disk_limit": "10GB"},
                 "health": {"cpu_usage": 45.2, "memory_usage": 67.8, "disk_usage": 23.1, "status": "healthy"},
-                "created_at": datetime.now().isoformat(),
                 "endpoint": "http://localhost:9001"
             },
             {
@@ -124,7 +285,6 @@ class MockOrchestrator:
                 "status": "running",
                 "resources": {"cpu_limit": "1.0", "memory_limit": "512MB", "disk_limit": "10GB"},
                 "health": {"cpu_usage": 38.7, "memory_usage": 72.3, "disk_usage": 19.5, "status": "healthy"},
-                "created_at": datetime.now().isoformat(),
                 "endpoint": "http://localhost:9002"
             },
             {
@@ -133,104 +293,112 @@ class MockOrchestrator:
                 "status": "stopped",
                 "resources": {"cpu_limit": "0.5", "memory_limit": "256MB", "disk_limit": "5GB"},
                 "health": {"cpu_usage": 0.0, "memory_usage": 0.0, "disk_usage": 12.8, "status": "stopped"},
-                "created_at": datetime.now().isoformat(),
                 "endpoint": "http://localhost:9003"
             }
         ]
         
         for container in sample_containers:
-            self.containers[container["id"]] = container
-            self.container_health[container["id"]] = container["health"]
-            self.resource_limits[container["id"]] = container["resources"]
+            self._add(ContainerRecord.create(**container))
+    
+    def _add(self, record: ContainerRecord):
+        self.containers[record.id] = record
+        _index_add(self.containers_by_image, record.image_id, record.id)
+        _index_add(self.containers_by_status, record.status, record.id)
+        self.version += 1
+    
+    def _set_status(self, record: ContainerRecord, status: str):
+        if record.status != status:
+            _index_remove(self.containers_by_status, record.status, record.id)
+            record.status = _intern(status)
+            _index_add(self.containers_by_status, status, record.id)
+            self.version += 1
         
     def create_container(self, image_id: str, resources: Dict[str, Any] = None) -> Dict[str, Any]:
         """Create a new container instance"""
-        container_id = str(uuid.uuid4())
+        container_id = str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
         
-        default_resources = {
-            "cpu_limit": "1.0",
-            "memory_limit": "512MB",
-            "disk_limit": "10GB"
-        }
-        
-        if resources:
-            default_resources.update(resources)
-        
-        container = {
-            "id": container_id,
-            "image_id": image_id,
-            "status": "running",
-            "resources": default_resources,
-            "health": {
-                "cpu_usage": random.uniform(10, 80),
-                "memory_usage": random.uniform(20, 90),
-                "disk_usage": random.uniform(5, 60),
+        record = ContainerRecord.create(
+            id=container_id,
+            image_id=image_id,
+            status="running",
+            resources=resources or {},
+            health={
+                "cpu_usage": self.rng.uniform(10, 80),
+                "memory_usage": self.rng.uniform(20, 90),
+                "disk_usage": self.rng.uniform(5, 60),
                 "status": "healthy"
             },
-            "created_at": datetime.now().isoformat(),
-            "endpoint": f"http://localhost:{random.randint(9000, 9999)}"
-        }
-        
-        self.containers[container_id] = container
-        self.container_health[container_id] = container["health"]
-        self.resource_limits[container_id] = default_resources
+            endpoint=f"http://localhost:{self.rng.randint(9000, 9999)}",
+        )
+        self._add(record)
         
-        return container
+        return record.to_dict()
     
     def start_container(self, container_id: str) -> bool:
         """Start a container"""
-        if container_id in self.containers:
-            self.containers[container_id]["status"] = "running"
+        record = self.containers.get(container_id)
+        if record is not None:
+            self._set_status(record, "running")
             return True
         return False
     
     def stop_container(self, container_id: str) -> bool:
         """Stop a container"""
-        if container_id in self.containers:
-            self.containers[container_id]["status"] = "stopped"
+        record = self.containers.get(container_id)
+        if record is not None:
+            self._set_status(record, "stopped")
             return True
         return False
     
     def delete_container(self, container_id: str) -> bool:
         """Delete a container"""
-        if container_id in self.containers:
-            del self.containers[container_id]
-            if container_id in self.container_health:
-                del self.container_health[container_id]
-            if container_id in self.resource_limits:
-                del self.resource_limits[container_id]
+        record = self.containers.pop(container_id, None)
+        if record is not None:
+            _index_remove(self.containers_by_image, record.image_id, container_id)
+            _index_remove(self.containers_by_status, record.status, container_id)
+            self.version += 1
             return True
         return False
     
     def get_container_health(self, container_id: str) -> Dict[str, Any]:
         """Get container health metrics"""
-        if container_id in self.container_health:
+        record = self.containers.get(container_id)
+        if record is not None:
             # Simulate changing health metrics
-            health = self.container_health[container_id]
-            health["cpu_usage"] = max(0, min(100, health["cpu_usage"] + random.uniform(-5, 5)))
-            health["memory_usage"] = max(0, min(100, health["memory_usage"] + random.uniform(-3, 3)))
-            health["disk_usage"] = max(0, min(100, health["disk_usage"] + random.uniform(-1, 1)))
+            record.cpu_usage = max(0, min(100, record.cpu_usage + self.rng.uniform(-5, 5)))
+            record.memory_usage = max(0, min(100, record.memory_usage + self.rng.uniform(-3, 3)))
+            record.disk_usage = max(0, min(100, record.disk_usage + self.rng.uniform(-1, 1)))
             
             # Determine overall health status
-            if health["cpu_usage"] > 90 or health["memory_usage"] > 95:
-                health["status"] = "critical"
-            elif health["cpu_usage"] > 80 or health["memory_usage"] > 85:
-                health["status"] = "warning"
+            if record.cpu_usage > 90 or record.memory_usage > 95:
+                record.health_status = "critical"
+            elif record.cpu_usage > 80 or record.memory_usage > 85:
+                record.health_status = "warning"
             else:
-                health["status"] = "healthy"
+                record.health_status = "healthy"
                 
-            return health
+            return record.health
         return None
     
     def get_containers_by_image(self, image_id: str) -> List[Dict[str, Any]]:
         """Get all containers for a specific image"""
-        return [container for container in self.containers.values() if container["image_id"] == image_id]
+        ids = self.containers_by_image.get(image_id, {})
+        return [self.containers[container_id].to_dict() for container_id in ids]
+    
+    def get_containers_by_status(self, status: str) -> List[str]:
+        """Get ids of all containers with the given status"""
+        return list(self.containers_by_status.get(status, {}))
+    
+    def count_containers(self, image_id: str) -> int:
+        """Number of containers for an image"""
+        return len(self.containers_by_image.get(image_id, {}))
     
     def update_container_resources(self, container_id: str, resources: Dict[str, Any]) -> bool:
         """Update container resource limits"""
-        if container_id in self.containers:
-            self.containers[container_id]["resources"].update(resources)
-            self.resource_limits[container_id].update(resources)
+        record = self.containers.get(container_id)
+        if record is not None:
+            record.update_resources(resources)
+            self.version += 1
             return True
         return False
     
@@ -239,7 +407,7 @@ class MockOrchestrator:
         if container_id in self.containers:
             # Simulate random errors
             errors = []
-            if random.random() < 0.1:  # 10% chance of error
+            if self.rng.random() < 0.1:  # 10% chance of error
                 error_types = [
                     "Connection timeout",
                     "Memory allocation failed",
@@ -247,14 +415,14 @@ class MockOrchestrator:
                     "Process crashed",
                     "Network unreachable"
                 ]
-                errors.append(random.choice(error_types))
+                errors.append(self.rng.choice(error_types))
             return errors
         return []
     
     def scale_containers(self, image_id: str, target_count: int) -> List[str]:
         """Scale containers for an image"""
-        current_containers = self.get_containers_by_image(image_id)
-        current_count = len(current_containers)
+        current_ids = list(self.containers_by_image.get(image_id, {}))
+        current_count = len(current_ids)
         
         if target_count > current_count:
             # Scale up
@@ -265,20 +433,81 @@ class MockOrchestrator:
             return new_containers
         elif target_count < current_count:
             # Scale down
-            containers_to_remove = current_containers[:current_count - target_count]
-            removed_ids = []
-            for container in containers_to_remove:
-                self.delete_container(container["id"])
-                removed_ids.append(container["id"])
+            removed_ids = current_ids[:current_count - target_count]
+            for container_id in removed_ids:
+                self.delete_container(container_id)
             return removed_ids
         
         return []
 
+@dataclass(slots=True)
+class UserBillingTotals:
+    """Running per-user billing aggregate, kept in step with every billing record change"""
+    total_cost: float = 0.0
+    total_containers: int = 0
+    total_requests: int = 0
+    images_count: int = 0
+
+@dataclass(slots=True)
+class BillingRecord:
+    """Billing state of one image; to_dict renders the billing API's JSON"""
+    image_id: str
+    user_id: Optional[str]
+    total_cost: float
+    containers_count: int
+    total_hours: float
+    total_requests: int
+    avg_cpu_usage: float = 50.0
+    memory_gb: float = 0.5
+    storage_gb: float = 10.0
+    cpu_cost: float = 0.0
+    memory_cost: float = 0.0
+    storage_cost: float = 0.0
+    requests_cost: float = 0.0
+    payment_limit: Optional[float] = None
+    last_updated: float = field(default_factory=time.time)
+    
+    def __post_init__(self):
+        self.image_id = _intern(self.image_id)
+        self.user_id = _intern(self.user_id)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "image_id": self.image_id,
+            "user_id": self.user_id,
+            "total_cost": self.total_cost,
+            "containers_count": self.containers_count,
+            "total_hours": self.total_hours,
+            "total_requests": self.total_requests,
+            "cost_breakdown": {
+                "cpu": self.cpu_cost,
+                "memory": self.memory_cost,
+                "storage": self.storage_cost,
+                "requests": self.requests_cost,
+            },
+            "billing_period": "monthly",
+            "avg_cpu_usage": self.avg_cpu_usage,
+            "memory_gb": self.memory_gb,
+            "storage_gb": self.storage_gb,
+        }
+        if self.payment_limit is not None:
+            data["payment_limit"] = self.payment_limit
+        data["last_updated"] = _iso(self.last_updated)
+        return data
+
+# Owner of records created before anyone told billing whose image it is
+UNKNOWN_USER = "unknown-user"
+
 class MockBilling:
     """Mock for Team 4 - Billing"""
     
-    def __init__(self):
-        self.billing_data = {}
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.billing_data: Dict[str, BillingRecord] = {}
+        # Secondary index: user id -> totals over that user's records
+        self.user_totals: Dict[str, UserBillingTotals] = {}
+        self.usage_listeners = []
+        self.version = 0
         self.pricing = {
             "cpu_per_hour": 0.05,  # $0.05 per CPU hour
             "memory_per_gb_hour": 0.02,  # $0.02 per GB hour
@@ -298,59 +527,160 @@ class MockBilling:
         total_cost = cpu_cost + memory_cost + storage_cost + request_cost
         return round(total_cost, 4)
     
+    def calculate_container_costs_batch(self, duration_hours, cpu_usage, memory_gb, storage_gb, requests) -> np.ndarray:
+        """Vectorized calculate_container_cost: price many containers in one NumPy pass.
+        
+        Each argument is an array-like column (or scalar, broadcast) with one entry per
+        container; returns the cost vector rounded like the scalar path.
+        """
+        import numpy as np
+
+        duration_hours = np.asarray(duration_hours, dtype=np.float64)
+        cpu_usage = np.asarray(cpu_usage, dtype=np.float64)
+        memory_gb = np.asarray(memory_gb, dtype=np.float64)
+        storage_gb = np.asarray(storage_gb, dtype=np.float64)
+        requests = np.asarray(requests, dtype=np.float64)
+        
+        hourly = (
+            cpu_usage * (self.pricing["cpu_per_hour"] / 100)
+            + memory_gb * self.pricing["memory_per_gb_hour"]
+            + storage_gb * self.pricing["storage_per_gb_hour"]
+        )
+        total = hourly * duration_hours + requests * (self.pricing["requests_per_1000"] / 1000)
+        return np.round(total, 4)
+    
+    def _usage_columns(self) -> Dict[str, np.ndarray]:
+        """Per-image usage profile of every billed image as columns"""
+        import numpy as np
+
+        records = list(self.billing_data.values())
+        return {
+            "total_cost": np.fromiter((r.total_cost for r in records), dtype=np.float64, count=len(records)),
+            "containers": np.fromiter((r.containers_count for r in records), dtype=np.float64, count=len(records)),
+            "hours": np.fromiter((r.total_hours for r in records), dtype=np.float64, count=len(records)),
+            "requests": np.fromiter((r.total_requests for r in records), dtype=np.float64, count=len(records)),
+            "cpu_usage": np.fromiter((r.avg_cpu_usage for r in records), dtype=np.float64, count=len(records)),
+            "memory_gb": np.fromiter((r.memory_gb for r in records), dtype=np.float64, count=len(records)),
+            "storage_gb": np.fromiter((r.storage_gb for r in records), dtype=np.float64, count=len(records)),
+        }
+    
+    def _monthly_run_rate(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Projected cost of one more month at each image's current usage"""
+        import numpy as np
+
+        hours = np.maximum(columns["hours"], 1.0)
+        requests_per_month = columns["requests"] / hours * HOURS_PER_MONTH
+        per_container = self.calculate_container_costs_batch(
+            HOURS_PER_MONTH, columns["cpu_usage"], columns["memory_gb"], columns["storage_gb"],
+            requests_per_month / np.maximum(columns["containers"], 1.0),
+        )
+        return per_container * columns["containers"]
+    
+    def _add_totals(self, record: BillingRecord, sign: int = 1):
+        totals = self.user_totals.setdefault(str(record.user_id), UserBillingTotals())
+        totals.total_cost += sign * record.total_cost
+        totals.total_containers += sign * record.containers_count
+        totals.total_requests += sign * record.total_requests
+        totals.images_count += sign
+        if totals.images_count == 0:
+            del self.user_totals[str(record.user_id)]
+    
+    def put_record(self, image_id: str, record: BillingRecord):
+        """Store (or replace) an image's billing record and keep the per-user totals in step"""
+        previous = self.billing_data.get(image_id)
+        if previous is not None:
+            self._add_totals(previous, -1)
+        self.billing_data[_intern(image_id)] = record
+        self._add_totals(record)
+        self.version += 1
+    
+    def _claim(self, record: BillingRecord, user_id: str):
+        # Records first seen without an owner move to the owner once it is known
+        if record.user_id in (None, UNKNOWN_USER) and user_id not in (None, UNKNOWN_USER):
+            self._add_totals(record, -1)
+            record.user_id = _intern(user_id)
+            self._add_totals(record)
+            self.version += 1
+    
     def get_image_billing(self, image_id: str, user_id: str) -> Dict[str, Any]:
         """Get billing information for an image"""
-        if image_id not in self.billing_data:
+        return self._record(image_id, user_id).to_dict()
+    
+    def _record(self, image_id: str, user_id: str) -> BillingRecord:
+        record = self.billing_data.get(image_id)
+        if record is not None:
+            self._claim(record, user_id)
+        else:
             # Generate mock billing data
-            containers = random.randint(1, 5)
-            total_hours = random.uniform(10, 720)  # 10 hours to 30 days
-            total_requests = random.randint(1000, 100000)
+            containers = self.rng.randint(1, 5)
+            total_hours = self.rng.uniform(10, 720)  # 10 hours to 30 days
+            total_requests = self.rng.randint(1000, 100000)
             
-            billing_info = {
-                "image_id": image_id,
-                "user_id": user_id,
-                "total_cost": round(random.uniform(5, 500), 2),
-                "containers_count": containers,
-                "total_hours": total_hours,
-                "total_requests": total_requests,
-                "cost_breakdown": {
-                    "cpu": round(random.uniform(1, 100), 2),
-                    "memory": round(random.uniform(1, 50), 2),
-                    "storage": round(random.uniform(1, 25), 2),
-                    "requests": round(random.uniform(0.1, 10), 2)
-                },
-                "billing_period": "monthly",
-                "last_updated": datetime.now().isoformat()
-            }
+            record = BillingRecord(
+                image_id=image_id,
+                user_id=user_id,
+                total_cost=round(self.rng.uniform(5, 500), 2),
+                containers_count=containers,
+                total_hours=total_hours,
+                total_requests=total_requests,
+                cpu_cost=round(self.rng.uniform(1, 100), 2),
+                memory_cost=round(self.rng.uniform(1, 50), 2),
+                storage_cost=round(self.rng.uniform(1, 25), 2),
+                requests_cost=round(self.rng.uniform(0.1, 10), 2),
+                avg_cpu_usage=round(self.rng.uniform(10, 80), 2),
+                memory_gb=self.rng.choice([0.25, 0.5, 1.0, 2.0]),
+                storage_gb=self.rng.choice([5.0, 10.0, 20.0]),
+            )
             
-            self.billing_data[image_id] = billing_info
+            self.put_record(image_id, record)
+            self._notify_usage(image_id, user_id, record.total_cost)
         
-        return self.billing_data[image_id]
+        return record
+    
+    def subscribe(self, listener):
+        """Register a callback(image_id, user_id, cost_delta) fired whenever spend changes"""
+        self.usage_listeners.append(listener)
+    
+    def _notify_usage(self, image_id: str, user_id: str, cost_delta: float):
+        for listener in self.usage_listeners:
+            listener(image_id, user_id, cost_delta)
+    
+    def record_usage(self, image_id: str, user_id: str, cost: float, requests: int = 0, hours: float = 0.0) -> Dict[str, Any]:
+        """Apply an incremental usage/billing delta to an image"""
+        record = self._record(image_id, user_id)
+        totals = self.user_totals[str(record.user_id)]
+        new_cost = round(record.total_cost + cost, 4)
+        totals.total_cost += new_cost - record.total_cost
+        totals.total_requests += requests
+        record.total_cost = new_cost
+        record.total_requests += requests
+        record.total_hours += hours
+        record.last_updated = time.time()
+        self.version += 1
+        self._notify_usage(image_id, record.user_id, cost)
+        return record.to_dict()
     
     def get_user_billing_summary(self, user_id: str) -> Dict[str, Any]:
-        """Get billing summary for a user"""
-        user_images = [data for data in self.billing_data.values() if data["user_id"] == user_id]
-        
-        total_cost = sum(img["total_cost"] for img in user_images)
-        total_containers = sum(img["containers_count"] for img in user_images)
-        total_requests = sum(img["total_requests"] for img in user_images)
+        """Get billing summary for a user (constant time, from the per-user index)"""
+        totals = self.user_totals.get(str(user_id)) or UserBillingTotals()
         
         return {
             "user_id": user_id,
-            "total_cost": round(total_cost, 2),
-            "total_containers": total_containers,
-            "total_requests": total_requests,
-            "images_count": len(user_images),
+            "total_cost": round(totals.total_cost, 2),
+            "total_containers": totals.total_containers,
+            "total_requests": totals.total_requests,
+            "images_count": totals.images_count,
             "billing_period": "monthly",
             "last_updated": datetime.now().isoformat()
         }
     
     def get_system_bi_data(self) -> Dict[str, Any]:
         """Get system-wide BI data for admin dashboard"""
-        total_revenue = sum(data["total_cost"] for data in self.billing_data.values())
-        total_users = len(set(data["user_id"] for data in self.billing_data.values()))
+        columns = self._usage_columns()
+        total_revenue = float(columns["total_cost"].sum())
+        total_users = len(set(record.user_id for record in self.billing_data.values()))
         total_images = len(self.billing_data)
-        total_containers = sum(data["containers_count"] for data in self.billing_data.values())
+        total_containers = int(columns["containers"].sum())
         
         # Generate historical data for charts
         historical_data = []
@@ -358,9 +688,9 @@ class MockBilling:
             date = datetime.now() - timedelta(days=i)
             historical_data.append({
                 "date": date.strftime("%Y-%m-%d"),
-                "revenue": round(random.uniform(50, 200), 2),
-                "active_containers": random.randint(10, 50),
-                "total_requests": random.randint(10000, 100000)
+                "revenue": round(self.rng.uniform(50, 200), 2),
+                "active_containers": self.rng.randint(10, 50),
+                "total_requests": self.rng.randint(10000, 100000)
             })
         
         return {
@@ -368,47 +698,52 @@ class MockBilling:
             "total_users": total_users,
             "total_images": total_images,
             "total_containers": total_containers,
-            "monthly_growth": round(random.uniform(5, 25), 1),  # Percentage
+            "monthly_growth": round(self.rng.uniform(5, 25), 1),  # Percentage
             "historical_data": historical_data,
             "top_performing_images": self._get_top_performing_images(),
-            "revenue_forecast": self._get_revenue_forecast(),
+            "revenue_forecast": self._get_revenue_forecast(columns),
             "last_updated": datetime.now().isoformat()
         }
     
     def _get_top_performing_images(self) -> List[Dict[str, Any]]:
         """Get top performing images by revenue"""
         sorted_images = sorted(self.billing_data.values(), 
-                             key=lambda x: x["total_cost"], reverse=True)[:5]
+                             key=lambda x: x.total_cost, reverse=True)[:5]
         
         return [{
-            "image_id": img["image_id"],
-            "revenue": img["total_cost"],
-            "containers": img["containers_count"],
-            "requests": img["total_requests"]
+            "image_id": img.image_id,
+            "revenue": img.total_cost,
+            "containers": img.containers_count,
+            "requests": img.total_requests
         } for img in sorted_images]
     
-    def _get_revenue_forecast(self) -> Dict[str, float]:
-        """Get revenue forecast for next 3 months"""
-        current_revenue = sum(data["total_cost"] for data in self.billing_data.values())
+    def _get_revenue_forecast(self, columns: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, float]:
+        """Get revenue forecast for next 3 months from every image's current run rate"""
+        columns = columns if columns is not None else self._usage_columns()
+        current_revenue = float(columns["total_cost"].sum())
+        monthly = float(self._monthly_run_rate(columns).sum())
         
         return {
-            "next_month": round(current_revenue * random.uniform(1.1, 1.3), 2),
-            "next_2_months": round(current_revenue * random.uniform(1.2, 1.5), 2),
-            "next_3_months": round(current_revenue * random.uniform(1.3, 1.8), 2)
+            "next_month": round(current_revenue + monthly, 2),
+            "next_2_months": round(current_revenue + 2 * monthly, 2),
+            "next_3_months": round(current_revenue + 3 * monthly, 2)
         }
     
     def set_payment_limit(self, image_id: str, limit: float) -> bool:
         """Set payment limit for an image"""
-        if image_id in self.billing_data:
-            self.billing_data[image_id]["payment_limit"] = limit
+        record = self.billing_data.get(image_id)
+        if record is not None:
+            record.payment_limit = limit
+            self.version += 1
             return True
         return False
     
     def check_payment_limit(self, image_id: str) -> Dict[str, Any]:
         """Check if image has reached payment limit"""
-        if image_id in self.billing_data:
-            current_cost = self.billing_data[image_id]["total_cost"]
-            limit = self.billing_data[image_id].get("payment_limit", float('inf'))
+        record = self.billing_data.get(image_id)
+        if record is not None:
+            current_cost = record.total_cost
+            limit = record.payment_limit if record.payment_limit is not None else float('inf')
             
             return {
                 "image_id": image_id,
@@ -420,13 +755,19 @@ class MockBilling:
         return None
 
 # Global instances
-load_balancer = MockLoadBalancer()
-service_discovery = MockServiceDiscovery()
-orchestrator = MockOrchestrator()
-billing = MockBilling()
+# MOCK_SEED makes every mock value reproducible; each service gets its own stream
+MOCK_SEED = int(os.environ["MOCK_SEED"]) if os.getenv("MOCK_SEED") else None
+SERVICE_NAMES = ("load_balancer", "service_discovery", "orchestrator", "billing")
+
+_instances: Optional[Dict[str, Any]] = None
+_instances_lock = threading.Lock()
+
+def _derive_seed(seed: Optional[int], offset: int) -> Optional[int]:
+    return None if seed is None else seed * 1000 + offset
 
 # Initialize with some mock data
-def initialize_mock_data():
+def initialize_mock_data(load_balancer: MockLoadBalancer, service_discovery: MockServiceDiscovery,
+                         orchestrator: MockOrchestrator, billing: MockBilling):
     """Initialize mock data for testing"""
     # Generate billing data for sample images
     sample_images = ["nginx:latest", "nodejs:16", "python:3.9", "redis:6"]
@@ -436,16 +777,35 @@ def initialize_mock_data():
         billing.get_image_billing(image, f"user_{i % 3 + 1}")
         
         # Generate traffic data
-        load_balancer.update_traffic_data(image, random.randint(1000, 10000))
+        load_balancer.update_traffic_data(image, load_balancer.rng.randint(1000, 10000))
     
     # Register our sample containers in service discovery
     for container_id, container in orchestrator.containers.items():
         service_discovery.register_container(
             container_id,
-            container["image_id"],
-            container["endpoint"],
-            container["status"]
+            container.image_id,
+            container.endpoint,
+            container.status
         )
 
-# Initialize mock data when module is imported
-initialize_mock_data()
+def get_mocks() -> Dict[str, Any]:
+    """Build the shared mock instances on first use (thread-safe) and return them by name"""
+    global _instances
+    if _instances is None:
+        with _instances_lock:
+            if _instances is None:
+                instances = {
+                    "load_balancer": MockLoadBalancer(_derive_seed(MOCK_SEED, 1)),
+                    "service_discovery": MockServiceDiscovery(_derive_seed(MOCK_SEED, 2)),
+                    "orchestrator": MockOrchestrator(_derive_seed(MOCK_SEED, 3)),
+                    "billing": MockBilling(_derive_seed(MOCK_SEED, 4)),
+                }
+                initialize_mock_data(**instances)
+                _instances = instances
+    return _instances
+
+def __getattr__(name: str):
+    # `mock_services.orchestrator` / `from mock_services import billing` build the mocks lazily
+    if name in SERVICE_NAMES:
+        return get_mocks()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
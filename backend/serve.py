@@ -0,0 +1,146 @@
+"""
+Production entry point: serves main:app with several uvicorn worker processes.
+
+    python serve.py
+    WEB_WORKERS=4 WEB_MAX_REQUESTS=50000 python serve.py
+
+Before any worker starts, it runs the once-per-instance startup jobs: database
+migrations, the admin user and lifecycle recovery. The workers skip them
+(STARTUP_JOBS_DONE) and elect a leader for the registry heartbeat and the
+autoscaler (app/leader.py). All workers accept connections on one shared socket,
+report their load to the leader's heartbeat and follow POST /registry/drain and
+/registry/resume together (app/worker_board.py). SIGTERM drains every worker
+before the instance deregisters; a recycled worker leaves the registration alone.
+
+uvloop and httptools are used when installed (uvicorn[standard]); WEB_LOOP and
+WEB_HTTP pick one explicitly. With WEB_MAX_REQUESTS set and more than one
+worker, a worker exits after that many requests and uvicorn starts a fresh
+one, which bounds slow memory growth.
+
+The in-process mock services keep their state in the worker that built them,
+so with USE_MOCK_SERVICES=true a single worker is started. For several
+workers, run mock_server.py and set USE_MOCK_SERVICES=false.
+
+Other state still lives in each worker, and with several workers a request
+only sees the state of the worker that serves it:
+
+- rate limits: with RATE_LIMIT_BACKEND=memory every worker has its own
+  buckets, so a user gets up to WEB_WORKERS times the budget. Set
+  RATE_LIMIT_BACKEND=database to share them.
+- read replicas: read-your-writes only routes a user to the primary on the
+  worker that served their write; reads on other workers may lag by up to
+  REPLICA_MAX_LAG.
+- ETags and the response cache: a worker only notices writes it committed
+  itself, so its lists and ETags can be up to ETAG_CACHE_MAX_AGE seconds stale
+  after a write through another worker.
+- bulk operations: per-instance progress of a running operation is only
+  known to the worker running it; other workers answer from its job row
+  (queued, running, then the final results).
+- payment limits: the alert history (GET /billing/alerts) lists the alerts
+  raised by the worker that serves it. Spend totals, enforcement and the
+  refusal of starts at the limit are shared through the database.
+
+serve.py logs which of these apply when it starts several workers.
+"""
+
+import importlib.util
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+# auto: uvloop / httptools when installed, else asyncio / h11
+WEB_LOOP = os.getenv("WEB_LOOP", "auto")
+WEB_HTTP = os.getenv("WEB_HTTP", "auto")
+# Pending connections the kernel queues for accept() before refusing new ones
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "2048"))
+# Idle keep-alive connections are closed after this many seconds; keep it above the proxy's idle timeout
+WEB_KEEP_ALIVE = int(os.getenv("WEB_KEEP_ALIVE", "75"))
+# Recycle a worker after this many requests (0: never)
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+WEB_LOG_LEVEL = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+def resolve(choice: str, fast: str, fallback: str) -> str:
+    if choice != "auto":
+        return choice
+    return fast if importlib.util.find_spec(fast) is not None else fallback
+
+
+def per_process_limitations() -> list:
+    """The state of the list above that is not shared between workers under the current settings"""
+    from app.conditional import ETAG_CACHE_MAX_AGE
+    from app.database import read_replicas
+    from app.rate_limit import RATE_LIMIT_BACKEND, RATE_LIMIT_ENABLED
+
+    limitations = []
+    if RATE_LIMIT_ENABLED and RATE_LIMIT_BACKEND != "database":
+        limitations.append("rate limits per worker (N times the budget, set RATE_LIMIT_BACKEND=database)")
+    if read_replicas.enabled:
+        limitations.append("read-your-writes per worker")
+    if ETAG_CACHE_MAX_AGE > 0:
+        limitations.append(f"ETags and cached lists up to {ETAG_CACHE_MAX_AGE:g}s stale across workers")
+    limitations.append("bulk operation progress on the running worker only")
+    limitations.append("payment alert history per worker")
+    return limitations
+
+
+def main():
+    # Before anything from app/ is imported: main.py reads these at import time, in the
+    # workers and in this process when it serves as the only worker
+    os.environ["STARTUP_JOBS_DONE"] = "true"
+    os.environ.setdefault("WORKER_LEADER_LOCK", os.path.join(tempfile.gettempdir(), f"scaleup-ui-{WEB_PORT}.leader"))
+    state_dir = os.environ.setdefault("WORKER_STATE_DIR", os.path.join(tempfile.gettempdir(), f"scaleup-ui-{WEB_PORT}.workers"))
+    # No load or drain flag of a previous run
+    shutil.rmtree(state_dir, ignore_errors=True)
+    os.makedirs(state_dir)
+
+    from app.external_services import USE_MOCKS
+    from app.logger import logger
+    from app.migrations import upgrade
+
+    workers = max(1, WEB_WORKERS)
+    if USE_MOCKS and workers > 1:
+        logger.warning("serve: USE_MOCK_SERVICES=true keeps mock state per process, starting a single worker")
+        workers = 1
+
+    if workers > 1:
+        logger.warning(f"serve: state kept per worker with {workers} workers: {'; '.join(per_process_limitations())}")
+
+    max_requests = WEB_MAX_REQUESTS
+    if max_requests and workers == 1:
+        # uvicorn only replaces recycled workers when it supervises several; alone, the server would exit
+        logger.warning("serve: WEB_MAX_REQUESTS needs more than one worker, not recycling")
+        max_requests = 0
+
+    upgrade()
+    import main as app_main
+
+    app_main.run_startup_jobs()
+
+    loop = resolve(WEB_LOOP, "uvloop", "asyncio")
+    http = resolve(WEB_HTTP, "httptools", "h11")
+    logger.info(
+        f"serve: main:app on {WEB_HOST}:{WEB_PORT} with {workers} workers, loop={loop}, http={http}, "
+        f"backlog={WEB_BACKLOG}, keep-alive={WEB_KEEP_ALIVE}s, max requests={max_requests or 'unlimited'}"
+    )
+    uvicorn.run(
+        "main:app",
+        host=WEB_HOST,
+        port=WEB_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=WEB_BACKLOG,
+        timeout_keep_alive=WEB_KEEP_ALIVE,
+        limit_max_requests=max_requests or None,
+        log_level=WEB_LOG_LEVEL,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Shared test setup.
+
+The app reads its configuration at import time, so the environment is set
+here, before any app module is imported: a scratch SQLite database, uploads
+and logs in a temporary directory, the in-process mocks, and no registry,
+autoscaler or rate limits. One app and one lifespan serve the whole session;
+tests create their own users and images so they do not depend on each other.
+
+    python -m pytest -q            (from the backend directory)
+"""
+
+import io
+import itertools
+import os
+import tarfile
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="scaleup-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    LOG_FILE=os.path.join(WORKDIR, "test.log"),
+    USE_MOCK_SERVICES="true",
+    MOCK_SEED="1",
+    REGISTRY_ENABLED="false",
+    AUTOSCALER_ENABLED="false",
+    RATE_LIMIT_ENABLED="false",
+    PROFILING_ENABLED="false",
+)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ.pop("STARTUP_JOBS_DONE", None)
+os.environ.pop("WORKER_LEADER_LOCK", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+_user_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.migrations import upgrade
+
+    # uploads/ is relative to the working directory
+    os.chdir(WORKDIR)
+    upgrade()
+    import main
+
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def scratch_engine(tmp_path):
+    """An empty SQLite database of its own, for migration tests"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'scratch.db'}")
+    yield engine
+    engine.dispose()
+
+
+def signin(client, email: str, password: str) -> dict:
+    r = client.post("/auth/signin", json={"email": email, "password": password})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return signin(client, "admin@gmail.com", "admin")
+
+
+@pytest.fixture
+def user_headers(client):
+    """Auth headers of a fresh user"""
+    email = f"user-{next(_user_ids)}@example.com"
+    r = client.post("/auth/signup", json={"email": email, "password": "secret", "firstName": "Test", "lastName": "User"})
+    assert r.status_code == 201, r.text
+    return signin(client, email, "secret")
+
+
+def image_archive() -> bytes:
+    """A minimal valid image tarball"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo("manifest.json")
+        info.size = 2
+        tar.addfile(info, io.BytesIO(b"{}"))
+    return buffer.getvalue()
+
+
+def upload_image(client, headers: dict, name: str, payment_limit: float = 100.0) -> int:
+    """Upload an image and return its id"""
+    r = client.post(
+        "/docker/upload",
+        headers=headers,
+        files={"image": (f"{name}.tar", image_archive())},
+        data={
+            "imageName": name,
+            "innerPort": "80",
+            "scalingType": "static",
+            "itemsPerContainer": "10",
+            "paymentLimit": str(payment_limit),
+        },
+    )
+    assert r.status_code == 201, r.text
+    images = client.get("/docker/images", headers=headers, params={"fields": "core"}).json()["images"]
+    return next(image["id"] for image in images if image["image_name"] == name)
+
+
+def image_status(image_id: int) -> str:
+    from app.database import SessionLocal
+    from app.models import DockerImage
+
+    db = SessionLocal()
+    try:
+        return db.query(DockerImage.status).filter(DockerImage.id == image_id).scalar()
+    finally:
+        db.close()
+
+
+def wait_for_status(image_id: int, status: str, timeout: float = 5.0):
+    """Until the background jobs (or enforcement) have moved the image to `status`"""
+    deadline = time.monotonic() + timeout
+    while image_status(image_id) != status and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert image_status(image_id) == status
@@ -0,0 +1,56 @@
+"""Autoscaler decisions: replica bounds, hysteresis and the per-direction cooldowns"""
+
+from types import SimpleNamespace
+
+from app.autoscaler import Autoscaler
+
+
+def image(scaling_type="minimal", **settings):
+    values = {"id": 1, "min_containers": 1, "max_containers": 10, "static_containers": 0, "items_per_container": 10}
+    return SimpleNamespace(scaling_type=scaling_type, **{**values, **settings})
+
+
+def autoscaler():
+    return Autoscaler(client=None, scale_up_cooldown=30, scale_down_cooldown=120, hysteresis=0.2, maximal_headroom=1.5)
+
+
+def test_desired_replicas_follow_demand_within_the_bounds():
+    scaler = autoscaler()
+    assert scaler.desired_replicas(image(), 45) == 5
+    assert scaler.desired_replicas(image(), 0) == 1
+    assert scaler.desired_replicas(image(), 1000) == 10
+    # Bounds left at 0 on upload fall back to 1..5
+    assert scaler.desired_replicas(image(min_containers=0, max_containers=0), 1000) == 5
+    assert scaler.desired_replicas(image("maximal"), 40) == 6
+    assert scaler.desired_replicas(image("static", static_containers=3), 1000) == 3
+
+
+def test_scale_up_waits_out_its_cooldown():
+    scaler = autoscaler()
+    assert scaler.decide(image(), 45, current=1, now=0) == 5
+    assert scaler.decide(image(), 65, current=5, now=10) is None
+    assert scaler.decide(image(), 65, current=5, now=40) == 7
+
+
+def test_scale_down_needs_the_hysteresis_margin_and_its_cooldown():
+    scaler = autoscaler()
+    assert scaler.decide(image(), 65, current=1, now=0) == 7
+    # Would fit in 6 replicas at full load, but not with 20% of them kept free
+    assert scaler.decide(image(), 55, current=7, now=500) is None
+    assert scaler.decide(image(), 45, current=7, now=500) == 6
+    assert scaler.decide(image(), 20, current=6, now=550) is None
+    assert scaler.decide(image(), 20, current=6, now=620) == 3
+
+
+def test_no_scale_down_right_after_a_scale_up():
+    scaler = autoscaler()
+    assert scaler.decide(image(), 45, current=1, now=0) == 5
+    assert scaler.decide(image(), 5, current=5, now=60) is None
+    assert scaler.decide(image(), 5, current=5, now=120) == 1
+
+
+def test_static_images_are_held_at_their_count():
+    scaler = autoscaler()
+    static = image("static", static_containers=3)
+    assert scaler.decide(static, 500, current=1, now=0) == 3
+    assert scaler.decide(static, 0, current=3, now=1) is None
@@ -0,0 +1,88 @@
+"""Bulk registration from a manifest: all-or-nothing by default, per item with atomic=false"""
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Job
+
+from conftest import image_archive, image_status, signin
+
+
+def upload_blob(client, headers, name: str) -> str:
+    r = client.post("/docker/blobs", headers=headers, files={"image": (f"{name}.tar", image_archive())})
+    assert r.status_code == 201, r.text
+    return r.json()["blob"]
+
+
+def manifest_item(name: str, blob: str, **overrides) -> dict:
+    return {
+        "imageName": name, "blob": blob, "innerPort": 80, "scalingType": "static",
+        "itemsPerContainer": 10, "paymentLimit": 100.0, **overrides,
+    }
+
+
+def image_names(client, headers) -> list:
+    return [i["image_name"] for i in client.get("/docker/images", headers=headers, params={"fields": "core"}).json()["images"]]
+
+
+@pytest.fixture
+def manifest(client, user_headers):
+    """Two valid items and one referencing a blob that was never uploaded"""
+    return [
+        manifest_item("batch-a", upload_blob(client, user_headers, "batch-a")),
+        manifest_item("batch-missing", "nope.tar"),
+        manifest_item("batch-b", upload_blob(client, user_headers, "batch-b")),
+    ]
+
+
+def test_atomic_manifest_with_an_invalid_item_registers_nothing(client, user_headers, manifest):
+    r = client.post("/docker/images/batch", headers=user_headers, json={"images": manifest})
+    assert r.status_code == 422
+    results = r.json()["detail"]["results"]
+    assert [result["status"] for result in results] == ["skipped", "invalid", "skipped"]
+    assert "Blob" in results[1]["error"]
+    assert image_names(client, user_headers) == []
+
+
+def test_partial_manifest_registers_the_valid_items(client, user_headers, manifest):
+    r = client.post("/docker/images/batch", headers=user_headers, json={"images": manifest, "atomic": False})
+    assert r.status_code == 201, r.text
+    body = r.json()
+    assert (body["created"], body["failed"]) == (2, 1)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert [result["status"] for result in body["results"]] == ["created", "invalid", "created"]
+    assert sorted(image_names(client, user_headers)) == ["batch-a", "batch-b"]
+
+    # Every created image got its post-processing job in the same transaction
+    created = [result["id"] for result in body["results"] if result["status"] == "created"]
+    db = SessionLocal()
+    try:
+        jobs = db.query(Job.image_id).filter(Job.kind == "image.post_process", Job.image_id.in_(created)).all()
+    finally:
+        db.close()
+    assert sorted(image_id for image_id, in jobs) == sorted(created)
+    assert all(image_status(image_id) is not None for image_id in created)
+
+
+def test_items_are_checked_against_each_other_and_the_caller(client, user_headers):
+    blob = upload_blob(client, user_headers, "batch-own")
+    r = client.post("/auth/signup", json={"email": "batch-other@example.com", "password": "secret",
+                                          "firstName": "O", "lastName": "U"})
+    assert r.status_code == 201, r.text
+    other_headers = signin(client, "batch-other@example.com", "secret")
+
+    r = client.post("/docker/images/batch", headers=other_headers, json={"images": [manifest_item("stolen", blob)]})
+    assert r.status_code == 422
+    assert r.json()["detail"]["results"][0]["error"] == "Blob belongs to another user"
+
+    r = client.post("/docker/images/batch", headers=user_headers, json={"atomic": False, "images": [
+        manifest_item("twice", blob),
+        manifest_item("twice", blob),
+        manifest_item("bounds", blob, minContainers=3, maxContainers=2),
+    ]})
+    assert r.status_code == 201, r.text
+    assert [(result["status"], result["error"]) for result in r.json()["results"]] == [
+        ("created", None),
+        ("invalid", "Duplicate imageName in manifest"),
+        ("invalid", "minContainers is greater than maxContainers"),
+    ]
@@ -0,0 +1,113 @@
+"""Bulk operations: bounded fan-out, idempotent replay and polling through the job row"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+from app.bulk_operations import BulkOperationEngine
+from app.database import SessionLocal
+from app.models import Job
+
+
+class Orchestrator:
+    """Instances of one image; the listing waits until released, and one instance refuses to start"""
+
+    def __init__(self, instances: int):
+        self.instances = [f"inst-{i}" for i in range(instances)]
+        self.listings = 0
+        self.listed = asyncio.Event()
+        self.started = []
+        self.concurrent = self.peak = 0
+
+    async def get_container_instances(self, image_id):
+        self.listings += 1
+        await self.listed.wait()
+        return {"instances": [{"id": instance_id} for instance_id in self.instances]}
+
+    async def start_container_instance(self, image_id, instance_id):
+        self.concurrent += 1
+        self.peak = max(self.peak, self.concurrent)
+        await asyncio.sleep(0.01)
+        self.concurrent -= 1
+        self.started.append(instance_id)
+        return {"started": instance_id != "inst-3"}
+
+
+def test_fan_out_is_bounded_and_records_each_instance():
+    async def scenario():
+        orchestrator = Orchestrator(10)
+        orchestrator.listed.set()
+        engine = BulkOperationEngine(client=orchestrator, max_parallelism=3)
+        return orchestrator, await engine.execute("7", "start", 1, run_async=False)
+
+    orchestrator, op = asyncio.run(scenario())
+    assert op.status == "completed"
+    assert sorted(orchestrator.started) == sorted(orchestrator.instances)
+    assert orchestrator.peak == 3
+    assert op.failed == ["inst-3"]
+    assert len(op.succeeded) == 9
+    assert op.to_dict()["results"][3] == {"instance_id": "inst-3", "ok": False, "error": "Orchestrator rejected the request"}
+
+
+def test_duplicate_during_setup_joins_the_same_operation():
+    async def scenario():
+        orchestrator = Orchestrator(4)
+        engine = BulkOperationEngine(client=orchestrator)
+        first = asyncio.create_task(engine.execute("7", "start", 1, idempotency_key="k", run_async=False))
+        await asyncio.sleep(0.01)
+        # Still listing the instances
+        duplicate = asyncio.create_task(engine.execute("7", "start", 1, idempotency_key="k", run_async=False))
+        await asyncio.sleep(0.01)
+        assert not duplicate.done()
+        orchestrator.listed.set()
+        ops = await asyncio.gather(first, duplicate)
+        replayed = await engine.execute("7", "start", 1, idempotency_key="k", run_async=False)
+        return orchestrator, ops, replayed
+
+    orchestrator, (first, duplicate), replayed = asyncio.run(scenario())
+    assert first is duplicate is replayed
+    assert duplicate.status == "completed"
+    assert len(duplicate.results) == 4
+    assert orchestrator.listings == 1
+    assert len(orchestrator.started) == 4
+
+
+def add_bulk_job(status: str, result=None, last_error=None) -> str:
+    operation_id = str(uuid.uuid4())
+    payload = {
+        "operation_id": operation_id, "image_id": "7", "action": "stop", "user_id": 1,
+        "resources": None, "instance_ids": ["inst-0", "inst-1"], "created_at": 1.0,
+    }
+    db = SessionLocal()
+    try:
+        db.add(Job(
+            kind="containers.bulk", payload=json.dumps(payload), status=status, priority=10, attempts=1,
+            max_attempts=3, run_at=datetime.utcnow(), reference=operation_id,
+            result=json.dumps(result) if result else None, last_error=last_error,
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return operation_id
+
+
+def test_other_workers_answer_from_the_job_row(client):
+    engine = BulkOperationEngine()
+    results = [{"instance_id": "inst-0", "ok": True, "error": None}, {"instance_id": "inst-1", "ok": True, "error": None}]
+    running = add_bulk_job("running")
+    succeeded = add_bulk_job("succeeded", result={"status": "completed", "results": results, "finished_at": 2.0})
+    failed = add_bulk_job("failed", last_error="RuntimeError: orchestrator unavailable")
+
+    db = SessionLocal()
+    try:
+        assert engine.get_operation(running) is None
+        op = engine.get_operation(running, db)
+        assert (op.status, op.instance_ids, op.action) == ("running", ["inst-0", "inst-1"], "stop")
+        op = engine.get_operation(succeeded, db)
+        assert (op.status, op.results, op.finished_at) == ("completed", results, 2.0)
+        op = engine.get_operation(failed, db)
+        assert (op.status, op.error) == ("failed", "RuntimeError: orchestrator unavailable")
+        assert engine.get_operation(str(uuid.uuid4()), db) is None
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+"""Compression of conditional responses: ETag strength and Vary, for 200s and 304s"""
+
+import pytest
+
+from app.compression import COMPRESSION_MIN_SIZE
+
+from conftest import upload_image, wait_for_status
+
+GZIP = {"Accept-Encoding": "gzip"}
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+def image_lists(client, user_headers):
+    """(headers, params) of an image list above the compression threshold"""
+    image_ids = [upload_image(client, user_headers, f"compress-{i}") for i in range(8)]
+    for image_id in image_ids:
+        wait_for_status(image_id, "running")
+    params = {"fields": "core"}
+    r = client.get("/docker/images", headers={**user_headers, **IDENTITY}, params=params)
+    assert len(r.content) >= COMPRESSION_MIN_SIZE
+    return user_headers, params
+
+
+def varies_on_encoding(response) -> bool:
+    return "accept-encoding" in [token.strip().lower() for token in response.headers.get("vary", "").split(",")]
+
+
+def revalidate(client, headers, params, etag, encoding):
+    return client.get("/docker/images", headers={**headers, **encoding, "If-None-Match": etag}, params=params)
+
+
+def test_compressed_list_has_a_weak_etag_and_so_does_its_304(client, image_lists):
+    headers, params = image_lists
+    r = client.get("/docker/images", headers={**headers, **GZIP}, params=params)
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["etag"].startswith("W/")
+    assert varies_on_encoding(r)
+
+    r304 = revalidate(client, headers, params, r.headers["etag"], GZIP)
+    assert r304.status_code == 304
+    assert r304.headers["etag"] == r.headers["etag"]
+    assert varies_on_encoding(r304)
+
+
+def test_identity_list_keeps_a_strong_etag_and_varies(client, image_lists):
+    headers, params = image_lists
+    r = client.get("/docker/images", headers={**headers, **IDENTITY}, params=params)
+    assert "content-encoding" not in r.headers
+    assert not r.headers["etag"].startswith("W/")
+    # Cacheable next to the gzip variant, not instead of it
+    assert varies_on_encoding(r)
+
+    r304 = revalidate(client, headers, params, r.headers["etag"], IDENTITY)
+    assert r304.status_code == 304
+    assert r304.headers["etag"] == r.headers["etag"]
+
+
+def test_small_response_is_not_encoded_and_keeps_a_strong_etag(client, user_headers):
+    wait_for_status(upload_image(client, user_headers, "compress-small"), "running")
+    r = client.get("/docker/images", headers={**user_headers, **GZIP}, params={"fields": "core"})
+    assert len(r.content) < COMPRESSION_MIN_SIZE
+    assert "content-encoding" not in r.headers
+    assert not r.headers["etag"].startswith("W/")
+    assert varies_on_encoding(r)
+
+    # The 304 stands for that uncompressed 200, so its ETag stays strong too
+    r304 = revalidate(client, user_headers, {"fields": "core"}, r.headers["etag"], GZIP)
+    assert r304.status_code == 304
+    assert r304.headers["etag"] == r.headers["etag"]
+    assert varies_on_encoding(r304)
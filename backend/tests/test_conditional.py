@@ -0,0 +1,71 @@
+"""ETags, 304s and the server-side response cache of the dashboard endpoints"""
+
+import asyncio
+
+import pytest
+from fastapi import Request, Response
+from pydantic import ValidationError
+
+from app.conditional import conditional_response, response_cache
+from app.external_services import external_client
+from app.schemas import SystemHealth
+
+from conftest import upload_image, wait_for_status
+
+
+def test_matching_etag_gets_an_empty_304(client, user_headers):
+    image_id = upload_image(client, user_headers, "etag-check")
+    wait_for_status(image_id, "running")
+    r = client.get("/docker/images", headers=user_headers, params={"fields": "core"})
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert not etag.startswith("W/")
+
+    r = client.get("/docker/images", headers={**user_headers, "If-None-Match": etag}, params={"fields": "core"})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+    # A committed change to the images makes the old ETag stale
+    r = client.put(f"/docker/images/{image_id}/restrictions", headers=user_headers, json={"paymentLimit": 7})
+    assert r.status_code == 200
+    r = client.get("/docker/images", headers={**user_headers, "If-None-Match": etag}, params={"fields": "core"})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert r.json()["images"][0]["payment_limit"] == 7
+
+
+def test_unversioned_external_data_is_rebuilt_every_time(client, user_headers, monkeypatch):
+    wait_for_status(upload_image(client, user_headers, "unversioned"), "running")
+    # Real services: the client can't tell when their data changes
+    monkeypatch.setattr(external_client, "data_version", lambda: None)
+
+    misses = response_cache.misses
+    for _ in range(2):
+        assert client.get("/docker/images", headers=user_headers, params={"fields": "traffic"}).status_code == 200
+    assert response_cache.misses == misses + 2
+
+    # Core columns come from the database alone and are still cached
+    hits = response_cache.hits
+    for _ in range(2):
+        assert client.get("/docker/images", headers=user_headers, params={"fields": "core"}).status_code == 200
+    assert response_cache.hits == hits + 1
+
+
+def call_conditional(build):
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+    return asyncio.run(conditional_response(request, Response(), "test:validate", None, build, SystemHealth))
+
+
+def test_built_value_is_validated_against_the_response_model():
+    async def extra_fields():
+        return {"components": [{"name": "db", "status": "healthy", "uptime": "99%", "response_time": 3}], "debug": 1}
+
+    async def wrong_type():
+        return {"components": [{"name": "db", "status": "healthy", "uptime": "99%", "response_time": "slow"}]}
+
+    body = call_conditional(extra_fields).body
+    assert b"debug" not in body
+    assert SystemHealth.model_validate_json(body).components[0].name == "db"
+    with pytest.raises(ValidationError):
+        call_conditional(wrong_type)
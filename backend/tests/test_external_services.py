@@ -0,0 +1,45 @@
+"""The pooled HTTP client and the mock services it talks to"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import mock_server
+from app.external_services import ExternalServiceClient
+
+
+def test_started_containers_are_listed_by_image_name(client):
+    with TestClient(mock_server.create_orchestrator_app()) as orchestrator:
+        # The start body the backend sends: the image by reference, no id
+        r = orchestrator.post("/start/container", json={"image": "web:latest", "min_replicas": 2})
+        started = r.json()["started"]
+        assert len(started) == 2
+
+        instances = orchestrator.get("/containers/web/instances").json()["instances"]
+        assert sorted(c["id"] for c in instances) == sorted(started)
+        assert orchestrator.post("/containers/web/stop", json={"instanceId": started[0]}).json()["stopped"]
+
+
+def test_image_name_drops_only_the_tag():
+    assert mock_server._image_name("web:latest") == "web"
+    assert mock_server._image_name("registry:5000/web:1.2") == "registry:5000/web"
+    assert mock_server._image_name("registry:5000/web") == "registry:5000/web"
+
+
+def test_client_of_a_finished_loop_is_closed_when_replaced():
+    external = ExternalServiceClient()
+
+    async def get_client():
+        return external.get_http_client()
+
+    async def replace_client():
+        current = external.get_http_client()
+        await asyncio.sleep(0)
+        return current
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(replace_client())
+    assert second is not first
+    assert first.is_closed
+    assert not second.is_closed
+    asyncio.run(second.aclose())
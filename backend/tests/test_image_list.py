@@ -0,0 +1,56 @@
+"""GET /docker/images column groups: parsing ?fields= and the fallback of a failing downstream service"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.external_services import external_client
+from app.schemas import IMAGE_FIELD_GROUPS
+
+from conftest import upload_image, wait_for_status
+
+
+def test_field_groups_are_parsed_in_canonical_order(app):
+    # Imported once the app fixture moved to the test directory: the router creates uploads/ on import
+    from app.routers.docker import parse_field_groups
+
+    assert parse_field_groups(None) == list(IMAGE_FIELD_GROUPS)
+    assert parse_field_groups("billing, traffic") == ["core", "traffic", "billing"]
+    assert parse_field_groups(" owner,,core ") == ["core", "owner"]
+    assert parse_field_groups("") == ["core"]
+    with pytest.raises(HTTPException) as unknown:
+        parse_field_groups("traffic,cpu,disk")
+    assert unknown.value.status_code == 400
+    assert "Unknown field groups: cpu, disk" in unknown.value.detail
+
+
+def test_unknown_group_is_rejected_and_known_ones_select_the_columns(client, user_headers):
+    wait_for_status(upload_image(client, user_headers, "columns"), "running")
+
+    r = client.get("/docker/images", headers=user_headers, params={"fields": "traffic,costs"})
+    assert r.status_code == 400
+    assert "costs" in r.json()["detail"]
+
+    r = client.get("/docker/images", headers=user_headers, params={"fields": "traffic"})
+    assert r.status_code == 200
+    [image] = r.json()["images"]
+    assert set(image) == set(IMAGE_FIELD_GROUPS["core"] + IMAGE_FIELD_GROUPS["traffic"])
+
+
+def test_failing_service_only_blanks_its_own_columns(client, user_headers, monkeypatch):
+    from app.routers.docker import EXTERNAL_FALLBACKS
+
+    image_id = upload_image(client, user_headers, "partial")
+    wait_for_status(image_id, "running")
+    user_id = client.get("/auth/me", headers=user_headers).json()["id"]
+    costs = client.portal.call(external_client.get_image_costs, str(image_id), str(user_id))
+    assert costs["total_cost"] > 0
+
+    async def traffic_down(image_id):
+        raise ConnectionError("traffic service unavailable")
+
+    monkeypatch.setattr(external_client, "get_traffic_stats", traffic_down)
+    r = client.get("/docker/images", headers=user_headers, params={"fields": "traffic,billing"})
+    assert r.status_code == 200
+    [image] = r.json()["images"]
+    assert {key: image[key] for key in EXTERNAL_FALLBACKS["traffic"]} == EXTERNAL_FALLBACKS["traffic"]
+    assert image["total_cost"] == costs["total_cost"]
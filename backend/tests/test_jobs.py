@@ -0,0 +1,134 @@
+"""Job queue: claiming, retries with backoff, failure hooks and lost locks, on a database of its own"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import jobs
+from app.jobs import JobQueue, PermanentJobError, backoff_delay
+from app.migrations import upgrade
+from app.models import Job
+
+
+@pytest.fixture
+def sessions(scratch_engine):
+    upgrade("head", bind=scratch_engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=scratch_engine)
+
+
+class Worker:
+    """A JobQueue of its own process, with a handler that fails as told"""
+
+    def __init__(self, sessions, name: str):
+        self.queue = JobQueue(session_factory=sessions)
+        self.queue.worker_id = name
+        self.failures = []
+        self.queue.handler("test.job", on_failure=self.on_failure)(self.handle)
+        self.error = None
+
+    async def handle(self, payload):
+        if self.error:
+            raise self.error
+        return {"done": payload["n"]}
+
+    async def on_failure(self, payload, error):
+        self.failures.append((payload, error))
+
+    def run_next(self):
+        job = self.queue._claim()
+        asyncio.run(self.queue._execute(job))
+        return job
+
+
+def job_row(sessions, job_id: int) -> Job:
+    db = sessions()
+    try:
+        return db.query(Job).filter(Job.id == job_id).one()
+    finally:
+        db.close()
+
+
+def make_due(sessions, job_id: int, locked_at=None):
+    db = sessions()
+    try:
+        values = {Job.run_at: datetime.utcnow()}
+        if locked_at is not None:
+            values[Job.locked_at] = locked_at
+        db.query(Job).filter(Job.id == job_id).update(values)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_claim_takes_the_most_urgent_due_job_once(sessions):
+    first, second = Worker(sessions, "a"), Worker(sessions, "b")
+    low = first.queue.enqueue("test.job", {"n": 1}, priority=jobs.PRIORITY_LOW)
+    high = first.queue.enqueue("test.job", {"n": 2}, priority=jobs.PRIORITY_HIGH)
+    first.queue.enqueue("test.job", {"n": 3}, priority=jobs.PRIORITY_HIGH, delay_seconds=60)
+
+    assert first.queue._claim()["id"] == high.id
+    claimed = second.queue._claim()
+    assert claimed["id"] == low.id
+    assert claimed["attempts"] == 1
+    # The delayed job is not due yet
+    assert first.queue._claim() is None
+    assert job_row(sessions, low.id).locked_by == "b"
+
+
+def test_failed_attempts_back_off_until_the_failure_hook_runs(sessions):
+    worker = Worker(sessions, "a")
+    worker.error = RuntimeError("orchestrator unavailable")
+    job = worker.queue.enqueue("test.job", {"n": 1}, max_attempts=2)
+
+    worker.run_next()
+    row = job_row(sessions, job.id)
+    assert (row.status, row.attempts, row.last_error) == ("queued", 1, "RuntimeError: orchestrator unavailable")
+    assert row.run_at >= datetime.utcnow() + timedelta(seconds=jobs.JOB_RETRY_BASE_DELAY * 0.9)
+    assert row.locked_by is None
+    assert worker.failures == []
+
+    make_due(sessions, job.id)
+    worker.run_next()
+    assert job_row(sessions, job.id).status == "failed"
+    assert worker.failures == [({"n": 1}, "RuntimeError: orchestrator unavailable")]
+
+
+def test_permanent_error_fails_without_retrying(sessions):
+    worker = Worker(sessions, "a")
+    worker.error = PermanentJobError("image archive is corrupt")
+    job = worker.queue.enqueue("test.job", {"n": 1})
+
+    worker.run_next()
+    row = job_row(sessions, job.id)
+    assert (row.status, row.attempts) == ("failed", 1)
+    assert worker.failures == [({"n": 1}, "image archive is corrupt")]
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    for attempts in (1, 2, 3):
+        expected = jobs.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+        assert expected <= backoff_delay(attempts) <= expected * 1.1
+    assert backoff_delay(100) <= jobs.JOB_RETRY_MAX_DELAY * 1.1
+
+
+def test_outcome_of_a_lost_claim_is_discarded(sessions):
+    hung, other = Worker(sessions, "a"), Worker(sessions, "b")
+    job = hung.queue.enqueue("test.job", {"n": 1})
+    claim = hung.queue._claim()
+    assert hung.queue._touch(claim)
+
+    # The worker stops refreshing its lock; any process requeues the job and another one claims it
+    make_due(sessions, job.id, locked_at=datetime.utcnow() - timedelta(seconds=jobs.JOB_LOCK_TIMEOUT + 1))
+    assert other.queue.recover_stale_jobs() == 1
+    reclaimed = other.queue._claim()
+    assert reclaimed["attempts"] == 2
+
+    assert not hung.queue._touch(claim)
+    asyncio.run(hung.queue._execute(claim))
+    row = job_row(sessions, job.id)
+    assert (row.status, row.locked_by, row.result) == ("running", "b", None)
+
+    asyncio.run(other.queue._execute(reclaimed))
+    assert job_row(sessions, job.id).status == "succeeded"
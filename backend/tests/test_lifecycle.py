@@ -0,0 +1,159 @@
+"""Single-flight start/stop: concurrent requests per image share one orchestrator call"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import SessionLocal
+from app.lifecycle import LIFECYCLE_CLAIM_TIMEOUT, ImageLifecycle, _claim_image, _release_image
+from app.models import DockerImage
+
+from conftest import image_status, upload_image, wait_for_status
+
+
+@pytest.fixture
+def image_id(client, user_headers):
+    image_id = upload_image(client, user_headers, "lifecycle")
+    wait_for_status(image_id, "running")
+    return image_id
+
+
+class Orchestrator:
+    """Counts calls and holds each one until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def start(self):
+        self.calls += 1
+        await self.release.wait()
+        return {"started": [f"container-{self.calls}"]}
+
+
+def test_concurrent_starts_share_one_call(image_id):
+    lifecycle = ImageLifecycle()
+
+    async def scenario():
+        orchestrator = Orchestrator()
+        requests = [asyncio.create_task(lifecycle.run(image_id, "start", 1, orchestrator.start)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        assert image_status(image_id) == "starting"
+        orchestrator.release.set()
+        results = await asyncio.gather(*requests)
+        return orchestrator.calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{"started": ["container-1"]}] * 3
+    assert lifecycle.stats["executed"] == 1
+    assert lifecycle.stats["coalesced"] == 2
+    assert image_status(image_id) == "running"
+
+
+def test_conflicting_stop_is_refused_while_a_start_is_pending(image_id):
+    lifecycle = ImageLifecycle()
+
+    async def scenario():
+        orchestrator = Orchestrator()
+        start = asyncio.create_task(lifecycle.run(image_id, "start", 1, orchestrator.start))
+        await asyncio.sleep(0.1)
+        with pytest.raises(HTTPException) as refused:
+            await lifecycle.run(image_id, "stop", 1, orchestrator.start)
+        orchestrator.release.set()
+        await start
+        return refused.value
+
+    refused = asyncio.run(scenario())
+    assert refused.status_code == 409
+    assert lifecycle.stats["conflicts"] == 1
+
+
+def test_idempotency_key_replays_the_result(image_id):
+    lifecycle = ImageLifecycle()
+
+    async def scenario():
+        orchestrator = Orchestrator()
+        orchestrator.release.set()
+        first = await lifecycle.run(image_id, "start", 1, orchestrator.start, idempotency_key="k1")
+        again = await lifecycle.run(image_id, "start", 1, orchestrator.start, idempotency_key="k1")
+        with pytest.raises(HTTPException) as reused:
+            await lifecycle.run(image_id, "stop", 1, orchestrator.start, idempotency_key="k1")
+        return orchestrator.calls, first, again, reused.value
+
+    calls, first, again, reused = asyncio.run(scenario())
+    assert calls == 1
+    assert again == first
+    assert lifecycle.stats["replayed"] == 1
+    assert reused.status_code == 409
+
+
+def test_failed_start_restores_the_status_and_frees_its_key(image_id):
+    lifecycle = ImageLifecycle()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("orchestrator unavailable")
+        return {"started": ["c"]}
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await lifecycle.run(image_id, "start", 1, flaky, idempotency_key="retry")
+        assert image_status(image_id) == "running"
+        return await lifecycle.run(image_id, "start", 1, flaky, idempotency_key="retry")
+
+    assert asyncio.run(scenario()) == {"started": ["c"]}
+    assert len(attempts) == 2
+
+
+def test_operation_held_by_another_worker_is_refused(image_id):
+    # Another worker's start shows up only as the in-flight status in the database
+    _release_image(image_id, "starting")
+    lifecycle = ImageLifecycle()
+    calls = []
+
+    async def start():
+        calls.append(1)
+
+    try:
+        with pytest.raises(HTTPException) as refused:
+            asyncio.run(lifecycle.run(image_id, "start", 1, start))
+    finally:
+        _release_image(image_id, "running")
+    assert refused.value.status_code == 409
+    assert calls == []
+
+
+def claim_as(image_id: int, owner: str, age: float):
+    """An in-flight claim of another instance, taken `age` seconds ago"""
+    db = SessionLocal()
+    try:
+        db.query(DockerImage).filter(DockerImage.id == image_id).update({
+            DockerImage.status: "starting",
+            DockerImage.lifecycle_owner: owner,
+            DockerImage.lifecycle_claimed_at: time.time() - age,
+        })
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_recovery_leaves_other_instances_running_operations_alone(client, user_headers):
+    own, other, abandoned = (upload_image(client, user_headers, f"recover-{name}") for name in ("own", "other", "abandoned"))
+    for image_id in (own, other, abandoned):
+        wait_for_status(image_id, "running")
+    assert _claim_image(own, "stopping") == (True, "running")
+    claim_as(other, "ui-other", age=1)
+    claim_as(abandoned, "ui-other", age=LIFECYCLE_CLAIM_TIMEOUT + 1)
+
+    try:
+        ImageLifecycle().recover()
+        assert image_status(own) == "error"
+        assert image_status(other) == "starting"
+        assert image_status(abandoned) == "error"
+    finally:
+        _release_image(other, "running")
@@ -0,0 +1,27 @@
+"""Event loop blocks: summaries on /metrics, stacks on /health/loop-blocks, both admin only"""
+
+import time
+
+
+def block_the_loop(seconds: float):
+    time.sleep(seconds)
+
+
+def test_block_stacks_are_admin_only(client, user_headers, admin_headers):
+    client.portal.call(block_the_loop, 0.3)
+    # The watchdog records the block while it happens; the probe fills in its duration after
+    time.sleep(0.2)
+
+    assert client.get("/metrics").status_code in (401, 403)
+    assert client.get("/metrics", headers=user_headers).status_code == 403
+    blocks = client.get("/metrics", headers=admin_headers).json()["event_loop"]["recent_blocks"]
+    assert any(block["where"] and "block_the_loop" in block["where"] for block in blocks)
+    assert all(set(block) == {"at", "blocked_ms", "duration_ms", "route", "where"} for block in blocks)
+
+    assert client.get("/health/loop-blocks").status_code in (401, 403)
+    assert client.get("/health/loop-blocks", headers=user_headers).status_code == 403
+    r = client.get("/health/loop-blocks", headers=admin_headers, params={"limit": 50})
+    assert r.status_code == 200
+    block = next(b for b in r.json()["blocks"] if "block_the_loop" in (b["where"] or ""))
+    assert block["blocked_ms"] >= 100
+    assert any("block_the_loop" in frame for frame in block["stack"])
@@ -0,0 +1,48 @@
+"""Alembic revisions and the startup schema check"""
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.migrations import SchemaOutOfDate, check_schema, head_revision, upgrade
+
+
+def test_owner_foreign_key_migration_deletes_orphan_images(scratch_engine):
+    upgrade("0001", bind=scratch_engine)
+    with scratch_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, first_name, last_name, hashed_password, is_active, is_admin) "
+            "VALUES (1, 'owner@example.com', 'O', 'W', 'x', 1, 0)"
+        ))
+        for image_id, user_id in ((1, 1), (2, 42)):
+            conn.execute(text(
+                "INSERT INTO docker_images (id, user_id, name, image_file_path, inner_port, scaling_type, items_per_container) "
+                "VALUES (:id, :user_id, 'img', 'uploads/img.tar', 80, 'static', 1)"
+            ), {"id": image_id, "user_id": user_id})
+
+    upgrade("head", bind=scratch_engine)
+
+    with scratch_engine.connect() as conn:
+        assert conn.execute(text("SELECT id FROM docker_images")).scalars().all() == [1]
+    foreign_keys = inspect(scratch_engine).get_foreign_keys("docker_images")
+    assert [fk["name"] for fk in foreign_keys] == ["fk_docker_images_user_id_users"]
+
+
+def set_revision(engine, revision: str):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE alembic_version SET version_num = :revision"), {"revision": revision})
+
+
+def test_schema_check_accepts_head_and_newer_revisions(scratch_engine):
+    with pytest.raises(SchemaOutOfDate):
+        check_schema(scratch_engine)
+
+    upgrade("head", bind=scratch_engine)
+    check_schema(scratch_engine)
+
+    # Migrated by a newer release during a rolling deploy
+    set_revision(scratch_engine, "f00dfeed0099")
+    check_schema(scratch_engine)
+
+    set_revision(scratch_engine, "0001")
+    with pytest.raises(SchemaOutOfDate, match=head_revision()):
+        check_schema(scratch_engine)
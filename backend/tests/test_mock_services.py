@@ -0,0 +1,220 @@
+"""The in-process mock services: their indexes and running totals agree with a full recomputation"""
+
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+import mock_services
+from app import external_services
+from mock_services import (
+    UNKNOWN_USER, BillingRecord, MockBilling, MockLoadBalancer, MockOrchestrator, MockServiceDiscovery,
+)
+
+from conftest import upload_image, wait_for_status
+
+
+def recomputed_totals(billing: MockBilling) -> dict:
+    """Per-user totals the slow way, over every billing record"""
+    totals = {}
+    for record in billing.billing_data.values():
+        user = totals.setdefault(str(record.user_id), {"total_cost": 0.0, "total_containers": 0, "total_requests": 0, "images_count": 0})
+        user["total_cost"] += record.total_cost
+        user["total_containers"] += record.containers_count
+        user["total_requests"] += record.total_requests
+        user["images_count"] += 1
+    return totals
+
+
+def assert_summaries_match(billing: MockBilling):
+    expected = recomputed_totals(billing)
+    assert set(billing.user_totals) == set(expected)
+    for user_id, totals in expected.items():
+        summary = billing.get_user_billing_summary(user_id)
+        assert summary["total_cost"] == pytest.approx(totals["total_cost"], abs=0.01)
+        assert {key: summary[key] for key in ("total_containers", "total_requests", "images_count")} == {
+            key: totals[key] for key in ("total_containers", "total_requests", "images_count")
+        }
+
+
+def test_user_summary_totals_follow_every_record_change():
+    billing = MockBilling(seed=7)
+    for i in range(30):
+        billing.get_image_billing(f"img-{i}", f"user-{i % 4}")
+    # Seen before its owner is known, then claimed
+    billing.get_image_billing("orphan", UNKNOWN_USER)
+    assert_summaries_match(billing)
+    billing.get_image_billing("orphan", "user-1")
+    assert_summaries_match(billing)
+
+    for i in range(0, 30, 3):
+        billing.record_usage(f"img-{i}", f"user-{i % 4}", cost=1.25, requests=100, hours=0.5)
+    # A replaced record moves to another user
+    billing.put_record("img-1", BillingRecord("img-1", "user-9", total_cost=12.5, containers_count=2, total_hours=1.0, total_requests=10))
+    assert_summaries_match(billing)
+    assert billing.get_user_billing_summary("user-9")["images_count"] == 1
+
+    assert billing.get_user_billing_summary("nobody")["images_count"] == 0
+
+
+def test_summary_endpoint_matches_the_image_list(client, user_headers):
+    for name in ("summary-a", "summary-b"):
+        wait_for_status(upload_image(client, user_headers, name), "running")
+    images = client.get("/docker/images", headers=user_headers, params={"fields": "billing"}).json()["images"]
+
+    summary = client.get("/docker/summary", headers=user_headers).json()
+    assert summary["images_count"] == 2
+    assert summary["total_cost"] == pytest.approx(sum(image["total_cost"] for image in images), abs=0.01)
+
+
+def test_batch_pricing_matches_the_per_container_cost():
+    billing = MockBilling(seed=3)
+    rng = billing.rng
+    containers = [
+        (rng.uniform(0, 720), rng.uniform(0, 100), rng.uniform(0, 16), rng.uniform(0, 200), rng.randint(0, 10**7))
+        for _ in range(200)
+    ]
+    # Zero usage and round-number edges next to the random ones
+    containers += [(0.0, 0.0, 0.0, 0.0, 0), (1.0, 100.0, 1.0, 1.0, 1000)]
+    costs = billing.calculate_container_costs_batch(*zip(*containers))
+    expected = [billing.calculate_container_cost(f"c-{i}", *usage) for i, usage in enumerate(containers)]
+    assert costs.tolist() == pytest.approx(expected, abs=1e-4)
+
+    # Scalar arguments broadcast over the columns
+    assert billing.calculate_container_costs_batch(24.0, [10.0, 50.0], 2.0, 10.0, 0).tolist() == pytest.approx(
+        [billing.calculate_container_cost("c", 24.0, cpu, 2.0, 10.0, 0) for cpu in (10.0, 50.0)], abs=1e-4
+    )
+
+
+def assert_indexes_match(service, containers: dict):
+    """containers_by_image / containers_by_status hold exactly what a scan of the containers finds"""
+    by_image, by_status = {}, {}
+    for container_id, container in containers.items():
+        by_image.setdefault(container.image_id, set()).add(container_id)
+        by_status.setdefault(container.status, set()).add(container_id)
+    assert {key: set(ids) for key, ids in service.containers_by_image.items()} == by_image
+    assert {key: set(ids) for key, ids in service.containers_by_status.items()} == by_status
+
+
+def test_orchestrator_indexes_follow_every_container_change():
+    orchestrator = MockOrchestrator(seed=5)
+    assert_indexes_match(orchestrator, orchestrator.containers)
+    created = [orchestrator.create_container(f"img-{i % 3}")["id"] for i in range(12)]
+    assert_indexes_match(orchestrator, orchestrator.containers)
+
+    for container_id in created[::2]:
+        orchestrator.stop_container(container_id)
+    orchestrator.stop_container(created[0])
+    orchestrator.start_container(created[2])
+    assert_indexes_match(orchestrator, orchestrator.containers)
+    assert created[2] not in orchestrator.get_containers_by_status("stopped")
+
+    for container_id in created[:4]:
+        orchestrator.delete_container(container_id)
+    assert not orchestrator.delete_container(created[0])
+    orchestrator.scale_containers("img-1", 1)
+    orchestrator.scale_containers("img-2", 6)
+    assert_indexes_match(orchestrator, orchestrator.containers)
+    assert orchestrator.count_containers("img-1") == 1
+    assert len(orchestrator.get_containers_by_image("img-2")) == 6
+
+    # Emptied keys are dropped rather than left behind
+    orchestrator.scale_containers("img-0", 0)
+    assert "img-0" not in orchestrator.containers_by_image
+    assert_indexes_match(orchestrator, orchestrator.containers)
+
+
+def test_service_discovery_indexes_follow_every_registration():
+    discovery = MockServiceDiscovery(seed=5)
+    for i in range(6):
+        discovery.register_container(f"c-{i}", f"img-{i % 2}", f"http://localhost:{9000 + i}")
+    discovery.update_container_status("c-0", "unhealthy")
+    discovery.update_container_status("c-1", "unhealthy")
+    discovery.unregister_container("c-1")
+    discovery.unregister_container("c-3")
+    # Re-registering moves the container to its new image
+    discovery.register_container("c-4", "img-1", "http://localhost:9104")
+    assert_indexes_match(discovery, discovery.customer_containers)
+    assert discovery.get_containers_by_status("unhealthy") == ["c-0"]
+    assert set(discovery.get_customer_containers("img-1")) == {"c-5", "c-4"}
+
+
+def test_import_builds_nothing_until_first_use():
+    # A fresh interpreter: this session has long since built the shared mocks
+    script = textwrap.dedent("""
+        import sys
+        import mock_services
+
+        assert mock_services._instances is None
+        assert "numpy" not in sys.modules
+        orchestrator = mock_services.orchestrator
+        assert mock_services._instances is not None
+        assert orchestrator.containers
+        assert mock_services.get_mocks()["orchestrator"] is orchestrator
+    """)
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_module_attributes_are_the_shared_instances():
+    from mock_services import billing
+
+    mocks = mock_services.get_mocks()
+    assert mock_services.get_mocks() is mocks
+    assert billing is mocks["billing"]
+    for name in mock_services.SERVICE_NAMES:
+        assert getattr(mock_services, name) is mocks[name]
+    with pytest.raises(AttributeError):
+        mock_services.scheduler
+
+
+def changes(service, action) -> int:
+    before = service.version
+    action()
+    return service.version - before
+
+
+def test_versions_move_on_changes_and_hold_on_reads():
+    orchestrator = MockOrchestrator(seed=2)
+    container_id = orchestrator.create_container("img")["id"]
+    assert changes(orchestrator, lambda: orchestrator.stop_container(container_id)) == 1
+    assert changes(orchestrator, lambda: orchestrator.stop_container(container_id)) == 0
+    assert changes(orchestrator, lambda: orchestrator.update_container_resources(container_id, {"cpu_limit": "2.0"})) == 1
+    # Health jitter is noise, not a change
+    assert changes(orchestrator, lambda: orchestrator.get_container_health(container_id)) == 0
+    assert changes(orchestrator, lambda: orchestrator.get_containers_by_image("img")) == 0
+    assert changes(orchestrator, lambda: orchestrator.delete_container(container_id)) == 1
+    assert changes(orchestrator, lambda: orchestrator.delete_container(container_id)) == 0
+
+    billing = MockBilling(seed=2)
+    assert changes(billing, lambda: billing.get_image_billing("img", "user-1")) == 1
+    assert changes(billing, lambda: billing.get_image_billing("img", "user-1")) == 0
+    assert changes(billing, lambda: billing.record_usage("img", "user-1", cost=1.0)) == 1
+    assert changes(billing, lambda: billing.set_payment_limit("img", 50.0)) == 1
+    assert changes(billing, lambda: billing.set_payment_limit("missing", 50.0)) == 0
+
+    load_balancer = MockLoadBalancer(seed=2)
+    assert changes(load_balancer, lambda: load_balancer.get_traffic_stats("img")) == 1
+    assert changes(load_balancer, lambda: load_balancer.get_traffic_stats("img")) == 0
+    assert changes(load_balancer, lambda: load_balancer.update_traffic_data("img", 10)) == 1
+
+    discovery = MockServiceDiscovery(seed=2)
+    assert changes(discovery, lambda: discovery.register_container("c", "img", "http://localhost:9000")) == 1
+    assert changes(discovery, lambda: discovery.get_customer_containers("img")) == 0
+    assert changes(discovery, lambda: discovery.unregister_container("c")) == 1
+
+
+def test_data_version_tracks_the_shared_mocks(monkeypatch):
+    client = external_services.external_client
+    version = client.data_version()
+    assert version == client.data_version()
+    mock_services.get_mocks()["load_balancer"].update_traffic_data("data-version", 5)
+    assert client.data_version() != version
+
+    # The real services give no change token
+    monkeypatch.setattr(external_services, "USE_MOCKS", False)
+    assert client.data_version() is None
@@ -0,0 +1,67 @@
+"""Payment limit enforcement: an image stopped at its limit stays stopped until the limit is raised"""
+
+from app.database import SessionLocal
+from app.job_handlers import sync_image
+from app.models import DockerImage
+from app.payment_limits import PaymentLimitEnforcer, _set_image_status, payment_enforcer
+
+from conftest import image_status, upload_image, wait_for_status
+
+
+def test_limit_stop_is_sticky_until_the_limit_is_raised(client, user_headers, admin_headers):
+    image_id = upload_image(client, user_headers, "sticky-limit", payment_limit=10_000)
+    r = client.post("/billing/usage", headers=admin_headers, json={"events": [{"image_id": image_id, "amount": 20_000}]})
+    assert r.status_code == 200
+    assert r.json()["enforced_images"] == [str(image_id)]
+    wait_for_status(image_id, "stopped")
+
+    for request in (
+        lambda: client.post(f"/docker/images/{image_id}/start", headers=user_headers, json={}),
+        lambda: client.post(f"/docker/images/{image_id}/bulk", headers=user_headers, json={"action": "start"}),
+    ):
+        r = request()
+        assert r.status_code == 402, r.text
+        assert image_status(image_id) == "stopped"
+
+    # The orchestrator sync (re-run after an upload or a retry) leaves it stopped
+    client.portal.call(sync_image, {"image_id": image_id})
+    assert image_status(image_id) == "stopped"
+
+    r = client.put(f"/docker/images/{image_id}/restrictions", headers=user_headers, json={"paymentLimit": 1_000_000})
+    assert r.status_code == 200, r.text
+    r = client.post(f"/docker/images/{image_id}/start", headers=user_headers, json={})
+    assert r.status_code == 200, r.text
+    assert image_status(image_id) == "running"
+
+
+def load_image(image_id: int) -> DockerImage:
+    db = SessionLocal()
+    try:
+        return db.query(DockerImage).filter(DockerImage.id == image_id).one()
+    finally:
+        db.close()
+
+
+def test_spend_and_enforcement_are_shared_by_workers_and_restarts(client, user_headers):
+    image_id = upload_image(client, user_headers, "shared-spend", payment_limit=10_000)
+    # Two workers (or a worker before and after a restart), each with its own enforcer
+    first, second = PaymentLimitEnforcer(), PaymentLimitEnforcer()
+
+    assert client.portal.call(first.apply_deltas, {image_id: 8_500}) == []
+    assert client.portal.call(second.apply_deltas, {image_id: 2_000}) == [str(image_id)]
+    assert client.portal.call(first.apply_deltas, {image_id: 1}) == [str(image_id)]
+    wait_for_status(image_id, "stopped")
+
+    # Each alert is raised once, by the worker whose delta crossed the line
+    assert [a["type"] for a in first.alerts] == ["threshold_crossed"]
+    assert [a["type"] for a in second.alerts] == ["limit_reached"]
+    image = load_image(image_id)
+    assert image.spend == 10_501
+    restarted = PaymentLimitEnforcer()
+    assert restarted.blocks_start(image)
+    assert restarted.settle_status(image_id, "running") == "stopped"
+
+
+def test_keys_that_are_not_database_ids_are_skipped(client):
+    assert _set_image_status("fleet-image-7", "stopped") is False
+    assert client.portal.call(payment_enforcer.apply_deltas, {"fleet-image-7": 1e9}) == []
@@ -0,0 +1,35 @@
+"""Profiling is off by default: no startup steps recorded, no profiled requests, 404 from the endpoints"""
+
+import asyncio
+
+from app import profiling
+from app.startup import StartupProfiler, startup_profiler
+
+
+def test_disabled_startup_profiler_only_runs_the_steps():
+    profiler = StartupProfiler(enabled=False)
+
+    async def step():
+        return "done"
+
+    assert asyncio.run(profiler.run("schema", step())) == "done"
+    profiler.checkpoint("imports")
+    profiler.mark_ready()
+    assert profiler.report()["steps"] == []
+    assert profiler.report()["ready_ms"] is None
+
+
+def test_nothing_is_profiled_when_disabled(client, admin_headers):
+    assert not profiling.PROFILING_ENABLED
+    # The app's lifespan has run, and recorded nothing
+    assert startup_profiler.steps == []
+
+    r = client.get("/docker/images", headers={**admin_headers, "X-Profile": "cprofile"}, params={"fields": "core"})
+    assert r.status_code == 200
+    assert "X-Profile-Report" not in r.headers
+    assert profiling.request_profiles.report_ids() == []
+
+    for path in ("/health/startup", "/health/profile?seconds=1", "/health/profile/reports/abc"):
+        r = client.get(path, headers=admin_headers)
+        assert r.status_code == 404, path
+        assert r.json()["detail"] == "Profiling is disabled"
@@ -0,0 +1,73 @@
+"""
+The hot queries use the indexes of revision 0002, checked with EXPLAIN on a
+scratch database migrated from the baseline revision. benchmarks/bench_query_plans.py
+times the same queries at fleet scale.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import MetaData, insert, text
+
+from app.migrations import upgrade
+from benchmarks.bench_query_plans import explain, hot_queries
+
+USERS, IMAGES, JOBS = 50, 3000, 6000
+
+
+def seed(engine):
+    """A skewed fleet: most images settled, a few mid start/stop, a small queued job backlog"""
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    # The tables as the seeded revision has them; the models follow head
+    tables = MetaData()
+    tables.reflect(bind=engine, only=["users", "docker_images", "jobs"])
+    with engine.begin() as conn:
+        conn.execute(insert(tables.tables["users"]), [
+            {"id": i, "email": f"plans-{i}@example.com", "first_name": "P", "last_name": "Q",
+             "hashed_password": "x", "is_admin": False, "is_active": True}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(insert(tables.tables["docker_images"]), [
+            {"user_id": rng.randint(1, USERS), "name": f"img-{i}", "image_file_path": f"uploads/img-{i}.tar",
+             "inner_port": 80, "scaling_type": "static", "items_per_container": 10, "payment_limit": 100.0,
+             "status": rng.choices(["running", "stopped", "ready", "starting"], weights=[60, 30, 9.5, 0.5])[0]}
+            for i in range(IMAGES)
+        ])
+        conn.execute(insert(tables.tables["jobs"]), [
+            {"kind": "image.sync", "payload": "{}", "priority": rng.choice([10, 50, 100]), "attempts": 1,
+             "max_attempts": 5, "run_at": now - timedelta(seconds=rng.randint(0, 30 * 86400)),
+             "status": rng.choices(["succeeded", "failed", "queued"], weights=[95, 3, 2])[0],
+             "image_id": rng.randint(1, IMAGES), "user_id": rng.randint(1, USERS)}
+            for _ in range(JOBS)
+        ])
+
+
+@pytest.fixture
+def plans(scratch_engine):
+    """{query name: (plan at the baseline, plan at head, index expected at head)}"""
+    upgrade("0001", bind=scratch_engine)
+    seed(scratch_engine)
+    queries = hot_queries(user_id=1)
+    with scratch_engine.connect() as conn:
+        before = {name: explain(conn, statement) for name, statement, _ in queries}
+    upgrade("head", bind=scratch_engine)
+    with scratch_engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    with scratch_engine.connect() as conn:
+        return {name: (before[name], explain(conn, statement), index) for name, statement, index in queries}
+
+
+def test_hot_queries_use_their_indexes(plans):
+    assert set(plans) == {"per-user image list", "lifecycle recovery", "job claim", "user job list"}
+    for name, (before, after, index) in plans.items():
+        assert index not in before, name
+        assert index in after, f"{name}: {after}"
+
+
+def test_job_claim_walks_the_index_instead_of_sorting(plans):
+    before, after, _ = plans["job claim"]
+    assert "TEMP B-TREE" in before
+    assert "TEMP B-TREE" not in after
+
@@ -0,0 +1,92 @@
+"""Token buckets in memory and in the database, 429 + Retry-After per budget, and failing open"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app import rate_limit
+from app.rate_limit import DatabaseBucketStore, MemoryBucketStore, RateLimiter
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize("store_class", [MemoryBucketStore, DatabaseBucketStore])
+def test_bucket_empties_and_refills(client, monkeypatch, store_class):
+    clock = Clock()
+    # The module's clocks only, not the event loop's
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock, time=clock))
+    store, key = store_class(), f"test:{uuid.uuid4()}"
+
+    def take():
+        return asyncio.run(store.take(key, rate=2.0, burst=3.0))
+
+    assert [take()[:2] for _ in range(3)] == [(True, 2.0), (True, 1.0), (True, 0.0)]
+    assert take() == (False, 0.0, 0.5)
+
+    clock.now += 0.25
+    allowed, tokens, retry_after = take()
+    assert not allowed
+    assert retry_after == pytest.approx(0.25)
+
+    clock.now += 0.25
+    assert take()[0]
+    # Idle long enough to refill completely, but never past the burst
+    clock.now += 60
+    assert take()[:2] == (True, 2.0)
+
+
+class BrokenStore:
+    name = "broken"
+
+    async def take(self, key, rate, burst, cost=1.0):
+        raise ConnectionError("database is down")
+
+    def size(self):
+        return None
+
+
+def test_broken_store_fails_open():
+    limiter = RateLimiter(store=BrokenStore(), budgets={"cheap": (1.0, 5.0)})
+    assert asyncio.run(limiter.check(1, "cheap")) == (True, 5.0, 0.0)
+    assert limiter.store_errors == 1
+    assert limiter.stats()["budgets"]["cheap"]["allowed"] == 0
+
+
+@pytest.fixture
+def tight_limits(monkeypatch):
+    limiter = RateLimiter(store=MemoryBucketStore(), budgets={"expensive": (0.5, 1.0), "cheap": (0.5, 2.0)})
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    return limiter
+
+
+def test_each_budget_answers_429_with_retry_after(client, user_headers, tight_limits):
+    cheap = [client.get("/billing/alerts", headers=user_headers) for _ in range(3)]
+    assert [r.status_code for r in cheap] == [200, 200, 429]
+    assert cheap[0].headers["X-RateLimit-Limit"] == "2"
+    assert cheap[0].headers["X-RateLimit-Remaining"] == "1"
+    assert cheap[2].headers["Retry-After"] == "2"
+
+    # The expensive budget has its own bucket
+    expensive = [client.get("/docker/images", headers=user_headers, params={"fields": "core"}) for _ in range(2)]
+    assert [r.status_code for r in expensive] == [200, 429]
+    assert expensive[1].headers["X-RateLimit-Limit"] == "1"
+    assert tight_limits.stats()["budgets"] == {
+        "expensive": {"rate": 0.5, "burst": 1.0, "allowed": 1, "limited": 1},
+        "cheap": {"rate": 0.5, "burst": 2.0, "allowed": 2, "limited": 1},
+    }
+
+
+def test_requests_pass_when_the_store_fails(client, user_headers, tight_limits):
+    tight_limits.store = BrokenStore()
+    for _ in range(5):
+        assert client.get("/billing/alerts", headers=user_headers).status_code == 200
+    assert tight_limits.store_errors == 5
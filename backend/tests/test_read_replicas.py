@@ -0,0 +1,112 @@
+"""
+Read replica routing and read-your-writes, with the primary and one replica as
+two SQLite files kept in step by a copy (the SQLite backup API), as the
+ReadReplicas docstring describes.
+"""
+
+import asyncio
+import sqlite3
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import database
+from app.auth import create_access_token
+from app.database import ReadReplicas
+
+from conftest import upload_image
+
+
+class CopiedReplica:
+    """A replica that only changes when sync() copies the primary onto it"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.replicas = ReadReplicas([f"sqlite:///{self.path}"])
+        self.engine = self.replicas.replicas[0].engine
+        self.loop_checkouts = 0
+        event.listen(self.engine, "checkout", self._on_checkout)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # a threadpool thread
+        self.loop_checkouts += 1
+
+    def sync(self):
+        # The primary heartbeat goes first, so the copy carries it and measures as fresh
+        self.replicas.check()
+        primary, replica = sqlite3.connect(database.engine.url.database), sqlite3.connect(self.path)
+        try:
+            primary.backup(replica)
+        finally:
+            primary.close()
+            replica.close()
+        self.replicas.check()
+        assert self.replicas.replicas[0].lag is not None
+
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    copied = CopiedReplica(tmp_path / "replica.db")
+    monkeypatch.setattr(database, "read_replicas", copied.replicas)
+    yield copied
+    copied.engine.dispose()
+
+
+def job_images(client, headers, image_id=None):
+    params = {"image_id": image_id} if image_id is not None else {}
+    r = client.get("/jobs", headers=headers, params=params)
+    assert r.status_code == 200, r.text
+    return {job["image_id"] for job in r.json()["jobs"]}
+
+
+def test_reads_use_the_replica_and_writers_read_their_writes(client, user_headers, admin_headers, replica):
+    replica.sync()
+    counts = replica.replicas.counts
+
+    assert job_images(client, user_headers) == set()
+    assert counts["replica"] == 1
+
+    # The upload commits the image and its post-processing job on the primary only
+    image_id = upload_image(client, user_headers, "replica-check")
+    assert job_images(client, user_headers) == {image_id}
+    assert counts["read_your_writes"] >= 1
+
+    # Another client still reads the replica, which has not seen the write
+    served_by_replica = counts["replica"]
+    assert job_images(client, admin_headers, image_id) == set()
+    assert counts["replica"] == served_by_replica + 1
+
+    replica.sync()
+    assert job_images(client, admin_headers, image_id) == {image_id}
+
+
+def test_read_your_writes_follows_the_user_across_tokens(client, user_headers, replica):
+    replica.sync()
+    image_id = upload_image(client, user_headers, "replica-new-token")
+
+    # Another token (signed in again, or on another device) of the same user
+    email = client.get("/auth/me", headers=user_headers).json()["email"]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email}, timedelta(minutes=5))}"}
+    assert headers != user_headers
+    assert job_images(client, headers) == {image_id}
+
+
+def test_lagging_replica_falls_back_to_the_primary(client, user_headers, replica, monkeypatch):
+    replica.sync()
+    monkeypatch.setattr(database, "REPLICA_MAX_LAG", 0.0)
+    replica.replicas.replicas[0].lag = 1.0
+
+    assert job_images(client, user_headers) == set()
+    assert replica.replicas.counts == {"replica": 0, "lagging": 1, "read_your_writes": 0}
+
+
+def test_replica_connection_is_checked_out_off_the_event_loop(client, user_headers, replica):
+    replica.sync()
+    for path in ("/jobs", "/auth/me", "/docker/images"):
+        assert client.get(path, headers=user_headers).status_code == 200
+    assert replica.replicas.counts["replica"] == 3
+    assert replica.loop_checkouts == 0
@@ -0,0 +1,70 @@
+"""Exit signals drain the server before uvicorn gets to close its listener"""
+
+import asyncio
+import signal
+
+import pytest
+from uvicorn import Config, Server
+
+from app.admission import AdmissionController
+from app.shutdown import GracefulShutdown
+
+
+class Heartbeat:
+    def __init__(self, controller):
+        self.controller = controller
+
+    def set_draining(self, draining=True):
+        self.controller.start_draining()
+
+
+@pytest.fixture
+def server():
+    """A uvicorn server owning SIGTERM, as inside Server.serve()"""
+    server = Server(Config(app=None))
+    previous = signal.signal(signal.SIGTERM, server.handle_exit)
+    yield server
+    signal.signal(signal.SIGTERM, previous)
+
+
+def test_sigterm_drains_before_the_server_exits(server):
+    controller = AdmissionController()
+    shutdown = GracefulShutdown(controller, Heartbeat(controller))
+
+    async def scenario():
+        controller.bind_loop()
+        shutdown.install()
+        controller._begin()  # an upload still in flight
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.05)
+        assert shutdown.stopping
+        assert controller.draining
+        assert not server.should_exit
+
+        controller._end()
+        await asyncio.sleep(0.05)
+        assert server.should_exit
+        shutdown.uninstall()
+
+    asyncio.run(scenario())
+    assert signal.getsignal(signal.SIGTERM) == server.handle_exit
+
+
+def test_second_signal_goes_straight_to_the_server(server):
+    controller = AdmissionController()
+    shutdown = GracefulShutdown(controller, Heartbeat(controller))
+
+    async def scenario():
+        controller.bind_loop()
+        shutdown.install()
+        controller._begin()
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.05)
+        assert not server.should_exit
+        signal.raise_signal(signal.SIGTERM)
+        assert server.should_exit
+        controller._end()
+        await asyncio.sleep(0.05)
+        shutdown.uninstall()
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+"""Load and the drain flag shared between the workers of one instance"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.metrics import RequestMetrics
+from app.worker_board import WORKER_STALE_INTERVALS, WorkerBoard
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two workers of one instance: (board, metrics) each"""
+    pairs = []
+    for worker_id in ("101", "102"):
+        metrics = RequestMetrics()
+        pairs.append((WorkerBoard(str(tmp_path), interval=0.01, metrics=metrics, worker_id=worker_id), metrics))
+    return pairs
+
+
+def serve(metrics: RequestMetrics, requests: int, duration: float, in_flight: int = 0):
+    for _ in range(requests):
+        metrics.begin()
+        metrics.end(duration, failed=False)
+    for _ in range(in_flight):
+        metrics.begin()
+
+
+def test_heartbeat_load_covers_every_worker(workers):
+    (leader, leader_metrics), (other, other_metrics) = workers
+    serve(leader_metrics, 10, 0.010, in_flight=1)
+    serve(other_metrics, 30, 0.100, in_flight=3)
+    other.sync()
+    leader.sync()
+
+    load = leader.load
+    assert load.in_flight == 4
+    # Request-weighted, so the busier worker counts for more
+    assert leader_metrics.latency_ms < load.latency_ms < other_metrics.latency_ms
+    snapshot = load.snapshot()
+    assert snapshot["workers"] == 2
+    assert snapshot["requests_total"] == 40
+
+
+def test_stopped_workers_drop_out(workers):
+    (leader, _), (other, other_metrics) = workers
+    serve(other_metrics, 1, 0.01, in_flight=5)
+    other.sync()
+    stale = time.time() - (WORKER_STALE_INTERVALS + 1) * other.interval
+    os.utime(os.path.join(other.directory, "102.json"), (stale, stale))
+    leader.sync()
+    assert leader.load.in_flight == 0
+    assert leader.load.snapshot()["workers"] == 1
+
+
+def test_drain_and_resume_reach_the_other_workers(workers):
+    (receiver, _), (other, _) = workers
+    followed = []
+
+    async def scenario():
+        other.start(followed.append)
+        receiver.publish_drain(True)
+        await asyncio.sleep(0.1)
+        assert followed == [True]
+        receiver.publish_drain(False)
+        await asyncio.sleep(0.1)
+        assert followed == [True, False]
+        await other.stop()
+
+    asyncio.run(scenario())
+    assert not os.path.exists(os.path.join(other.directory, "102.json"))